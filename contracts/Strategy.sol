@@ -29,6 +29,14 @@ contract Strategy is BaseStrategy {
         _;
     }
 
+    // whoever cloned the strategy can list its rewards, until it renounces that or the vault adds the strategy
+    modifier isVaultManagerOrCreator {
+        if (msg.sender != creator || vault.strategies(address(this)).activation != 0) {
+            checkVaultManagers();
+        }
+        _;
+    }
+
     function checkVaultManagers() internal {
         require(msg.sender == vault.governance() || msg.sender == vault.management());
     }
@@ -41,12 +49,44 @@ contract Strategy is BaseStrategy {
     IERC20[] public rewardTokens;
     IAsset[] internal assets;
     SwapSteps[] internal swapSteps;
+    // where each of rewardTokens comes from, parallel to it and swapSteps
+    ClaimSource[] public claimSources;
+    SwapSteps internal ethToWantSteps;
     bytes32 public balancerPoolId;
-    uint8 public numTokens;
-    uint8 public tokenIndex;
-    Toggles public toggles;
-    address public keep;
-    uint256 public keepBips;
+    // what deposits, withdraws and tends read together, packed into one slot. Getters below keep the old uint256 ABI
+    Params internal params;
+    // what claims read together, one slot
+    KeepParams internal keepParams;
+    // 10 ** (bpt decimals - want decimals), fixed for the strategy's life so conversions don't ask either token
+    uint256 internal decimalScale;
+    // what keepers last priced each reward at, off-chain, for harvests to check the pool against
+    mapping(address => Quote) public quotes;
+    address public creator;
+
+    struct Params {
+        uint16 maxSlippageIn; // bips
+        uint16 maxSlippageOut; // bips
+        uint96 maxSingleDeposit;
+        uint32 minDepositPeriod; // seconds
+        uint32 lastDepositTime;
+        uint8 numTokens;
+        uint8 tokenIndex;
+        uint16 bufferBips; // of the position kept unstaked for withdraws
+        bool doSellRewards;
+        bool doClaimRewards;
+        bool doCollectTradingFees;
+    }
+
+    struct KeepParams {
+        address keep;
+        uint16 keepBips;
+        uint16 maxSlippageRewards; // bips, under the spot value of rewards sold
+    }
+
+    struct Quote {
+        uint224 wantPerToken; // want for 1e18 of the token
+        uint32 quotedAt;
+    }
 
     struct Toggles {
         bool doSellRewards;
@@ -54,11 +94,27 @@ contract Strategy is BaseStrategy {
         bool doCollectTradingFees;
     }
 
+    // Minter: BAL minted for the gauge. Gauge: claim_rewards, which pays out every gauge reward at once. None: airdrops
+    enum ClaimSource {None, Minter, Gauge}
+
     struct SwapSteps {
         bytes32[] poolIds;
         IAsset[] assets;
     }
 
+    struct Snapshot {
+        uint256 balanceOfWant;
+        uint256 balanceOfUnstakedBpt;
+        uint256 balanceOfStakedBpt;
+        uint256 balanceOfPooled;
+        uint256 estimatedTotalAssets;
+        uint256 bptRate;
+        IERC20[] rewardTokens;
+        uint256[] rewardBalances;
+        uint256 lastDepositTime;
+        Toggles toggles;
+    }
+
     uint256 internal constant max = type(uint256).max;
 
     //1	    0.01%
@@ -68,13 +124,9 @@ contract Strategy is BaseStrategy {
     //100	1%
     //1000	10%
     //10000	100%
-    uint256 public maxSlippageIn; // bips
-    uint256 public maxSlippageOut; // bips
-    uint256 public maxSingleDeposit;
-    uint256 public minDepositPeriod; // seconds
-    uint256 public lastDepositTime;
     uint256 internal constant basisOne = 10000;
-    IERC20 internal constant BAL = IERC20(0xba100000625a3754423978a60c9317c58a424e3D);
+    // quotes older than this aren't checked against
+    uint256 internal constant maxQuoteAge = 1 days;
 
     constructor(
         address _vault,
@@ -105,6 +157,7 @@ contract Strategy is BaseStrategy {
         uint256 _minDepositPeriod
     ) external {
         _initialize(_vault, _strategist, _rewards, _keeper);
+        creator = msg.sender;
         _initializeStrat(_vault, _balancerVault, _balancerPool, _gaugeFactory, _minter, _maxSlippageIn, _maxSlippageOut, _maxSingleDeposit, _minDepositPeriod);
     }
 
@@ -126,21 +179,22 @@ contract Strategy is BaseStrategy {
         balancerVault = IBalancerVault(_balancerVault);
         (IERC20[] memory tokens,,) = balancerVault.getPoolTokens(balancerPoolId);
         require(tokens.length > 0, "Empty Pool");
-        numTokens = uint8(tokens.length);
-        assets = new IAsset[](numTokens);
-        tokenIndex = type(uint8).max;
-        for (uint8 i = 0; i < numTokens; i++) {
+        params.numTokens = uint8(tokens.length);
+        assets = new IAsset[](tokens.length);
+        params.tokenIndex = type(uint8).max;
+        for (uint8 i = 0; i < tokens.length; i++) {
             if (tokens[i] == want) {
-                tokenIndex = i;
+                params.tokenIndex = i;
             }
             assets[i] = IAsset(address(tokens[i]));
         }
-        require(tokenIndex != type(uint8).max, "token not supported in pool!");
+        require(params.tokenIndex != type(uint8).max, "token not supported in pool!");
+
+        uint256 wantDecimals = ERC20(address(want)).decimals();
+        decimalScale = 10 ** uint256(ERC20(address(bpt)).decimals()).sub(wantDecimals);
 
-        maxSlippageIn = _maxSlippageIn;
-        maxSlippageOut = _maxSlippageOut;
-        maxSingleDeposit = _maxSingleDeposit.mul(10 ** uint256(ERC20(address(want)).decimals()));
-        minDepositPeriod = _minDepositPeriod;
+        // _maxSingleDeposit is in whole want tokens
+        _setParams(_maxSlippageIn, _maxSlippageOut, _maxSingleDeposit.mul(10 ** wantDecimals), _minDepositPeriod);
 
         require(_gaugeFactory != address(0));
         gaugeFactory = ILiquidityGaugeFactory(_gaugeFactory);
@@ -152,10 +206,12 @@ contract Strategy is BaseStrategy {
         want.safeApprove(address(balancerVault), max);
         IERC20(bpt).safeApprove(address(gauge), max);
 
-        toggles = Toggles({doSellRewards : true, doClaimRewards : true, doCollectTradingFees : true});
+        params.doSellRewards = true;
+        params.doClaimRewards = true;
+        params.doCollectTradingFees = true;
 
-        keepBips = 1000;
-        keep = governance();
+        // maxSlippageRewards allows for the swap fees and price impact spot values leave out
+        keepParams = KeepParams({keep : governance(), keepBips : 1000, maxSlippageRewards : 200});
     }
 
     // ******** OVERRIDE THESE METHODS FROM BASE CONTRACT ************
@@ -169,74 +225,90 @@ contract Strategy is BaseStrategy {
     }
 
     function prepareReturn(uint256 _debtOutstanding) internal override returns (uint256 _profit, uint256 _loss, uint256 _debtPayment){
-        if (_debtOutstanding > 0) {
-            (_debtPayment, _loss) = liquidatePosition(_debtOutstanding);
-        }
-
+        // one rate for the whole harvest, exits only nudge it up
+        uint256 rate = bpt.getRate();
+        Params memory _params = params;
         uint256 beforeWant = balanceOfWant();
-
-        // 2 forms of profit. Incentivized rewards (BAL+other) and pool fees (want)
-        if (toggles.doCollectTradingFees) {
-            _collectTradingFees();
+        // what loose want doesn't cover of the debt payment
+        uint256 needed = _debtOutstanding > beforeWant ? _debtOutstanding - beforeWant : 0;
+
+        // 2 forms of profit. Incentivized rewards (BAL+other) and pool fees (want). Fees leave the pool in the same
+        // exit as the debt payment
+        uint256 toExit = _tokensToBpts(needed, rate);
+        if (_params.doCollectTradingFees) {
+            toExit = toExit.add(_tradingFeeBpts(rate));
         }
+        _exitBpts(toExit, rate);
         // this would allow finer control over harvesting to get credits in without selling
-        if (toggles.doClaimRewards) {
+        if (_params.doClaimRewards) {
             _claimRewards();
         }
-        if (toggles.doSellRewards) {
+        if (_params.doSellRewards) {
             _sellRewards();
         }
 
-        uint256 afterWant = balanceOfWant();
-
-        _profit = afterWant.sub(beforeWant);
-        if (_profit > _loss) {
-            _profit = _profit.sub(_loss);
-            _debtPayment = _debtPayment.add(_loss);
-            _loss = 0;
+        // fees and rewards make up for whatever the debt's exit fell short by, as they did when it was its own exit
+        uint256 raised = balanceOfWant().sub(beforeWant);
+        if (raised >= needed) {
+            _debtPayment = _debtOutstanding;
+            _profit = raised - needed;
         } else {
-            _loss = _loss.sub(_profit);
-            _debtPayment = _debtPayment.add(_profit);
-            _profit = 0;
+            _debtPayment = _debtOutstanding.sub(needed).add(raised);
+            _loss = needed - raised;
         }
     }
 
     function adjustPosition(uint256 _debtOutstanding) internal override {
-        if (now.sub(lastDepositTime) < minDepositPeriod) {
-            return;
+        Params memory _params = params;
+        uint256 amountIn = Math.min(_params.maxSingleDeposit, balanceOfWant());
+        if (now.sub(_params.lastDepositTime) >= _params.minDepositPeriod) {
+            if (amountIn > 0) {
+                uint256 expectedBptOut = tokensToBpts(amountIn).mul(basisOne.sub(_params.maxSlippageIn)).div(basisOne);
+                uint256[] memory maxAmountsIn = new uint256[](_params.numTokens);
+                maxAmountsIn[_params.tokenIndex] = amountIn;
+                bytes memory userData = abi.encode(IBalancerVault.JoinKind.EXACT_TOKENS_IN_FOR_BPT_OUT, maxAmountsIn, expectedBptOut);
+                IBalancerVault.JoinPoolRequest memory request = IBalancerVault.JoinPoolRequest(assets, maxAmountsIn, userData, false);
+                balancerVault.joinPool(balancerPoolId, address(this), address(this), request);
+                params.lastDepositTime = uint32(now);
+            }
+            // behind the same throttle as deposits, so harvests and tends between them don't churn the gauge
+            _rebalanceBuffer(_params.bufferBips);
         }
+    }
 
-        uint256 amountIn = Math.min(maxSingleDeposit, balanceOfWant());
-        uint256 expectedBptOut = tokensToBpts(amountIn).mul(basisOne.sub(maxSlippageIn)).div(basisOne);
-        uint256[] memory maxAmountsIn = new uint256[](numTokens);
-        maxAmountsIn[tokenIndex] = amountIn;
-
-        if (amountIn > 0) {
-            bytes memory userData = abi.encode(IBalancerVault.JoinKind.EXACT_TOKENS_IN_FOR_BPT_OUT, maxAmountsIn, expectedBptOut);
-            IBalancerVault.JoinPoolRequest memory request = IBalancerVault.JoinPoolRequest(assets, maxAmountsIn, userData, false);
-            balancerVault.joinPool(balancerPoolId, address(this), address(this), request);
-            lastDepositTime = now;
+    // keeps bufferBips of the position unstaked, so withdraws it covers exit without a gauge call
+    function _rebalanceBuffer(uint256 _bufferBips) internal {
+        uint256 _unstakedBpt = balanceOfUnstakedBpt();
+        uint256 target = _unstakedBpt.add(balanceOfStakedBpt()).mul(_bufferBips).div(basisOne);
+        if (_unstakedBpt > target) {
+            _stakeBpt(_unstakedBpt - target);
+        } else if (_unstakedBpt < target) {
+            _unstakeBpt(target - _unstakedBpt);
         }
+    }
 
+    // unstakes only what the buffer doesn't cover, and exits once
+    function _exitBpts(uint256 _amountBpts, uint256 _rate) internal {
+        if (_amountBpts == 0) {
+            return;
+        }
         uint256 _unstakedBpt = balanceOfUnstakedBpt();
-        if (_unstakedBpt > 0) {
-            _stakeBpt(_unstakedBpt);
+        if (_amountBpts > _unstakedBpt) {
+            _unstakeBpt(_amountBpts - _unstakedBpt);
         }
+        _sellBpt(_amountBpts, _rate);
     }
 
     // withdraws will realize losses if the pool is in bad conditions. This will heavily rely on _enforceSlippage to revert
     // and make sure we don't have to realize losses when not necessary
     function liquidatePosition(uint256 _amountNeeded) internal override returns (uint256 _liquidatedAmount, uint256 _loss){
+        return _liquidatePosition(_amountNeeded, bpt.getRate());
+    }
+
+    function _liquidatePosition(uint256 _amountNeeded, uint256 _rate) internal returns (uint256 _liquidatedAmount, uint256 _loss){
         uint256 looseAmount = balanceOfWant();
         if (_amountNeeded > looseAmount) {
-            uint256 toExitAmount = tokensToBpts(_amountNeeded.sub(looseAmount));
-
-            uint256 _unstakedBpt = balanceOfUnstakedBpt();
-
-            if (toExitAmount > _unstakedBpt) {
-                _unstakeBpt(toExitAmount.sub(_unstakedBpt));
-            }
-            _sellBpt(toExitAmount);
+            _exitBpts(_tokensToBpts(_amountNeeded.sub(looseAmount), _rate), _rate);
 
             _liquidatedAmount = Math.min(balanceOfWant(), _amountNeeded);
             _loss = _amountNeeded.sub(_liquidatedAmount);
@@ -248,7 +320,7 @@ contract Strategy is BaseStrategy {
 
     function liquidateAllPositions() internal override returns (uint256 liquidated) {
         _unstakeBpt(balanceOfStakedBpt());
-        _sellBpt(balanceOfUnstakedBpt());
+        _sellBpt(balanceOfUnstakedBpt(), bpt.getRate());
         liquidated = balanceOfWant();
         return liquidated;
     }
@@ -267,10 +339,41 @@ contract Strategy is BaseStrategy {
 
     function protectedTokens() internal view override returns (address[] memory){}
 
-    function ethToWant(uint256 _amtInWei) public view override returns (uint256){}
+    // spot price along ethToWantSteps, 0 until a route is set. Only prices gas for the triggers, never a trade
+    function ethToWant(uint256 _amtInWei) public view override returns (uint256){
+        return _spotAlong(ethToWantSteps, _amtInWei);
+    }
+
+    // what the reward's fresh quote values _amount at, or its spot value along its route without one
+    function rewardToWant(uint256 _index, uint256 _amount) public view returns (uint256){
+        uint256 quoted = _quotedValue(rewardTokens[_index], _amount);
+        return quoted > 0 ? quoted : _spotAlong(swapSteps[_index], _amount);
+    }
+
+    function _quotedValue(IERC20 _token, uint256 _amount) internal view returns (uint256){
+        Quote memory quote = quotes[address(_token)];
+        if (now.sub(quote.quotedAt) > maxQuoteAge) {
+            return 0;
+        }
+        return _amount.mul(quote.wantPerToken).div(1e18);
+    }
 
+    // worth a tend once what it would put to work, at the rate harvests are held to, pays for the call
     function tendTrigger(uint256 callCostInWei) public view override returns (bool) {
-        return now.sub(lastDepositTime) > minDepositPeriod && (balanceOfWant() > 0 || balanceOfUnstakedBpt() > 0);
+        Params memory _params = params;
+        if (now.sub(_params.lastDepositTime) <= _params.minDepositPeriod) {
+            return false;
+        }
+        // bpt the buffer is meant to hold isn't waiting to be staked
+        uint256 _unstakedBpt = balanceOfUnstakedBpt();
+        uint256 target = _unstakedBpt.add(balanceOfStakedBpt()).mul(_params.bufferBips).div(basisOne);
+        uint256 excessBpt = _unstakedBpt > target ? _unstakedBpt - target : 0;
+        uint256 looseWant = balanceOfWant();
+        if (looseWant == 0 && excessBpt == 0) {
+            return false;
+        }
+        uint256 backlog = Math.min(_params.maxSingleDeposit, looseWant).add(bptsToTokens(excessBpt));
+        return profitFactor.mul(ethToWant(callCostInWei)) <= backlog;
     }
 
     // HELPERS //
@@ -281,65 +384,129 @@ contract Strategy is BaseStrategy {
         }
     }
 
+    // sells every reward in one batchSwap. Routes keep their steps in order but share asset slots, so hops common to
+    // several routes (like WETH -> want) are settled once, and the want out is held to the routes' spot value less
+    // maxSlippageRewards. A reward whose spot value has fallen further than that under its keeper quote is held back
+    // for a later harvest, since that's what a pool pushed down in front of the sale looks like
     function _sellRewards() internal {
+        uint256 slippage = keepParams.maxSlippageRewards;
+        uint256[] memory amounts = new uint256[](rewardTokens.length);
+        uint256 numSteps;
+        uint256 expected;
         for (uint8 i = 0; i < rewardTokens.length; i++) {
             uint256 amount = balanceOfReward(i);
-            if (amount > 0) {
-                uint length = swapSteps[i].poolIds.length;
-                IBalancerVault.BatchSwapStep[] memory steps = new IBalancerVault.BatchSwapStep[](length);
-                int[] memory limits = new int[](length + 1);
-                limits[0] = int(amount);
-                for (uint j = 0; j < length; j++) {
-                    steps[j] = IBalancerVault.BatchSwapStep(swapSteps[i].poolIds[j],
-                        j,
-                        j + 1,
-                        j == 0 ? amount : 0,
-                        abi.encode(0)
-                    );
-                }
-                balancerVault.batchSwap(IBalancerVault.SwapKind.GIVEN_IN,
-                    steps,
-                    swapSteps[i].assets,
-                    IBalancerVault.FundManagement(address(this), false, address(this), false),
-                    limits,
-                    now + 10);
+            if (amount == 0) {
+                continue;
             }
+            uint256 spot = _spotAlong(swapSteps[i], amount);
+            if (spot == 0 || spot < _quotedValue(rewardTokens[i], amount).mul(basisOne.sub(slippage)).div(basisOne)) {
+                continue;
+            }
+            amounts[i] = amount;
+            numSteps = numSteps.add(swapSteps[i].poolIds.length);
+            expected = expected.add(spot);
+        }
+        if (numSteps > 0) {
+            _sellBatch(amounts, numSteps, expected.mul(basisOne.sub(slippage)).div(basisOne));
         }
     }
 
-    // this assumes that BAL is always index 0. If not, we can delist then whitelist again to make it at 0
+    function _sellBatch(uint256[] memory _amounts, uint256 _numSteps, uint256 _minOut) internal {
+        (IBalancerVault.BatchSwapStep[] memory steps, IAsset[] memory batchAssets, int[] memory limits) = _rewardBatch(_amounts, _numSteps);
+        limits[0] = -int(_minOut);
+        balancerVault.batchSwap(IBalancerVault.SwapKind.GIVEN_IN,
+            steps,
+            batchAssets,
+            IBalancerVault.FundManagement(address(this), false, address(this), false),
+            limits,
+            now + 10);
+    }
+
+    // steps, assets and limits of every route with an amount to sell, want first
+    function _rewardBatch(uint256[] memory _amounts, uint256 _numSteps) internal view returns (IBalancerVault.BatchSwapStep[] memory _steps, IAsset[] memory _assets, int[] memory _limits){
+        _steps = new IBalancerVault.BatchSwapStep[](_numSteps);
+        // at most one slot per step plus one per route, and want's
+        IAsset[] memory routeAssets = new IAsset[](_numSteps.add(_amounts.length).add(1));
+        int[] memory routeLimits = new int[](routeAssets.length);
+        routeAssets[0] = IAsset(address(want));
+        uint256 numAssets = 1;
+        uint256 step;
+        for (uint8 i = 0; i < _amounts.length; i++) {
+            if (_amounts[i] == 0) {
+                continue;
+            }
+            SwapSteps storage route = swapSteps[i];
+            uint256 assetIn = _assetIndex(routeAssets, numAssets, route.assets[0]);
+            if (assetIn == numAssets) numAssets++;
+            routeLimits[assetIn] += int(_amounts[i]);
+            for (uint j = 0; j < route.poolIds.length; j++) {
+                uint256 assetOut = _assetIndex(routeAssets, numAssets, route.assets[j + 1]);
+                if (assetOut == numAssets) numAssets++;
+                _steps[step++] = IBalancerVault.BatchSwapStep(route.poolIds[j],
+                    assetIn,
+                    assetOut,
+                    j == 0 ? _amounts[i] : 0,
+                    abi.encode(0)
+                );
+                assetIn = assetOut;
+            }
+        }
+
+        _assets = new IAsset[](numAssets);
+        _limits = new int[](numAssets);
+        for (uint k = 0; k < numAssets; k++) {
+            _assets[k] = routeAssets[k];
+            _limits[k] = routeLimits[k];
+        }
+    }
+
+    // index of `_asset` among the first `_count` of `_assets`, or `_count` after appending it
+    function _assetIndex(IAsset[] memory _assets, uint256 _count, IAsset _asset) internal pure returns (uint256){
+        for (uint i = 0; i < _count; i++) {
+            if (_assets[i] == _asset) {
+                return i;
+            }
+        }
+        _assets[_count] = _asset;
+        return _count;
+    }
+
+    // calls each claim source once, however many rewards it pays
     function _claimRewards() internal {
+        bool minted;
+        bool claimed;
         for (uint i = 0; i < rewardTokens.length; i++) {
-            IERC20 token = rewardTokens[i];
-            if (token == BAL) {
+            ClaimSource source = claimSources[i];
+            if (source == ClaimSource.Minter && !minted) {
+                IERC20 token = rewardTokens[i];
                 uint256 balanceBefore = balanceOfReward(i);
                 minter.mint(address(gauge));
-                uint256 keepAmount = balanceOfReward(i).sub(balanceBefore).mul(keepBips).div(basisOne);
+                minted = true;
+                KeepParams memory _keepParams = keepParams;
+                uint256 keepAmount = balanceOfReward(i).sub(balanceBefore).mul(_keepParams.keepBips).div(basisOne);
                 if (keepAmount > 0) {
-                    token.safeTransfer(keep, keepAmount);
+                    token.safeTransfer(_keepParams.keep, keepAmount);
                 }
-            } else {
+            } else if (source == ClaimSource.Gauge && !claimed) {
                 gauge.claim_rewards(address(this));
+                claimed = true;
             }
         }
     }
 
     function collectTradingFees() external isVaultManager {
-        _collectTradingFees();
+        _collectTradingFees(bpt.getRate());
+    }
+
+    function _collectTradingFees(uint256 _rate) internal {
+        _exitBpts(_tradingFeeBpts(_rate), _rate);
     }
 
-    function _collectTradingFees() internal {
-        uint256 total = estimatedTotalAssets();
+    // bpt worth what the position has grown past its debt
+    function _tradingFeeBpts(uint256 _rate) internal view returns (uint256){
+        uint256 total = balanceOfWant().add(_bptsToTokens(balanceOfStakedBpt().add(balanceOfUnstakedBpt()), _rate));
         uint256 debt = vault.strategies(address(this)).totalDebt;
-        if (total > debt) {
-            uint256 profit = tokensToBpts(total.sub(debt));
-            uint256 _unstakedBpt = balanceOfUnstakedBpt();
-            if (profit > _unstakedBpt) {
-                _unstakeBpt(profit.sub(_unstakedBpt));
-                _sellBpt(balanceOfUnstakedBpt());
-            }
-            _sellBpt(Math.min(profit, balanceOfUnstakedBpt()));
-        }
+        return total > debt ? _tokensToBpts(total - debt, _rate) : 0;
     }
 
     function balanceOfWant() public view returns (uint256 _amount){
@@ -365,14 +532,21 @@ contract Strategy is BaseStrategy {
 
     /// use bpt rate to estimate equivalent amount of want.
     function bptsToTokens(uint _amountBpt) public view returns (uint _amount){
-        uint unscaled = _amountBpt.mul(bpt.getRate()).div(1e18);
-        return _scaleDecimals(unscaled, ERC20(address(bpt)), ERC20(address(want)));
+        return _bptsToTokens(_amountBpt, bpt.getRate());
     }
 
 
     function tokensToBpts(uint _amountTokens) public view returns (uint _amount){
-        uint unscaled = _amountTokens.mul(1e18).div(bpt.getRate());
-        return _scaleDecimals(unscaled, ERC20(address(want)), ERC20(address(bpt)));
+        return _tokensToBpts(_amountTokens, bpt.getRate());
+    }
+
+    // the conversions at a rate read once by the caller
+    function _bptsToTokens(uint _amountBpt, uint _rate) internal view returns (uint _amount){
+        return _amountBpt.mul(_rate).div(1e18).div(decimalScale);
+    }
+
+    function _tokensToBpts(uint _amountTokens, uint _rate) internal view returns (uint _amount){
+        return _amountTokens.mul(1e18).div(_rate).mul(decimalScale);
     }
 
     function _scaleDecimals(uint _amount, ERC20 _fromToken, ERC20 _toToken) internal view returns (uint _scaled){
@@ -394,28 +568,99 @@ contract Strategy is BaseStrategy {
         );
     }
 
+    function _spotAlong(SwapSteps storage _steps, uint256 _amount) internal view returns (uint256){
+        uint256 length = _steps.poolIds.length;
+        if (length == 0) {
+            return 0;
+        }
+        for (uint i = 0; i < length; i++) {
+            _amount = _spotOut(_steps.poolIds[i], IERC20(address(_steps.assets[i])), IERC20(address(_steps.assets[i + 1])), _amount);
+        }
+        return _amount;
+    }
+
+    // what _amount of _tokenIn is worth in _tokenOut at the pool's spot price, no slippage or fees. Pools without
+    // weights are taken to trade 1:1, as stable pools of pegged tokens roughly do, so routes should only cross those
+    function _spotOut(bytes32 _poolId, IERC20 _tokenIn, IERC20 _tokenOut, uint256 _amount) internal view returns (uint256){
+        (address pool,) = balancerVault.getPool(_poolId);
+        (IERC20[] memory tokens, uint256[] memory balances,) = balancerVault.getPoolTokens(_poolId);
+        uint256 indexIn = tokens.length;
+        uint256 indexOut = tokens.length;
+        for (uint i = 0; i < tokens.length; i++) {
+            if (tokens[i] == _tokenIn) indexIn = i;
+            if (tokens[i] == _tokenOut) indexOut = i;
+        }
+        require(indexIn < tokens.length && indexOut < tokens.length, "!pool token");
+        try IWeightedPool(pool).getNormalizedWeights() returns (uint256[] memory weights) {
+            return _amount.mul(balances[indexOut]).mul(weights[indexIn]).div(balances[indexIn].mul(weights[indexOut]));
+        } catch {
+            return _scaleDecimals(_amount, ERC20(address(_tokenIn)), ERC20(address(_tokenOut)));
+        }
+    }
+
     function sellBpt(uint256 _amountBpts) external isVaultManager {
-        _sellBpt(_amountBpts);
+        _sellBpt(_amountBpts, bpt.getRate());
     }
 
-    // sell bpt for want at current bpt rate
-    function _sellBpt(uint256 _amountBpts) internal {
+    // sell bpt for want, held to `_rate` less maxSlippageOut
+    function _sellBpt(uint256 _amountBpts, uint256 _rate) internal {
         _amountBpts = Math.min(_amountBpts, balanceOfUnstakedBpt());
         if (_amountBpts > 0) {
-            uint256[] memory minAmountsOut = new uint256[](numTokens);
-            minAmountsOut[tokenIndex] = bptsToTokens(_amountBpts).mul(basisOne.sub(maxSlippageOut)).div(basisOne);
-            bytes memory userData = abi.encode(IBalancerVault.ExitKind.EXACT_BPT_IN_FOR_ONE_TOKEN_OUT, _amountBpts, tokenIndex);
+            Params memory _params = params;
+            uint256[] memory minAmountsOut = new uint256[](_params.numTokens);
+            minAmountsOut[_params.tokenIndex] = _bptsToTokens(_amountBpts, _rate).mul(basisOne.sub(_params.maxSlippageOut)).div(basisOne);
+            bytes memory userData = abi.encode(IBalancerVault.ExitKind.EXACT_BPT_IN_FOR_ONE_TOKEN_OUT, _amountBpts, _params.tokenIndex);
             IBalancerVault.ExitPoolRequest memory request = IBalancerVault.ExitPoolRequest(assets, minAmountsOut, userData, false);
             balancerVault.exitPool(balancerPoolId, address(this), address(this), request);
         }
     }
 
-    // for partnership rewards like Lido or airdrops
-    function whitelistRewards(address _rewardToken, SwapSteps memory _steps) public isVaultManager {
+    // BAL is minted, anything else is taken to be a gauge reward like Lido's
+    function whitelistRewards(address _rewardToken, SwapSteps memory _steps) public isVaultManagerOrCreator {
+        ClaimSource source = _rewardToken == address(minter.getBalancerToken()) ? ClaimSource.Minter : ClaimSource.Gauge;
+        registerReward(_rewardToken, _steps, source);
+    }
+
+    // the factory gives this up as soon as the clone is set up
+    function renounceCreator() external {
+        require(msg.sender == creator, "!creator");
+        creator = address(0);
+    }
+
+    // for rewards claimed from somewhere else, or airdrops with ClaimSource.None that only need selling
+    function registerReward(address _rewardToken, SwapSteps memory _steps, ClaimSource _source) public isVaultManagerOrCreator {
+        // routes are merged into one batchSwap that settles in want
+        uint256 hops = _steps.poolIds.length;
+        require(hops > 0 && address(_steps.assets[0]) == _rewardToken && address(_steps.assets[hops]) == address(want), "!route");
+        for (uint i = 0; i < rewardTokens.length; i++) {
+            require(address(rewardTokens[i]) != _rewardToken, "listed");
+        }
         IERC20 token = IERC20(_rewardToken);
         token.approve(address(balancerVault), max);
         rewardTokens.push(token);
         swapSteps.push(_steps);
+        claimSources.push(_source);
+    }
+
+    // the last reward takes the delisted one's place
+    function delistReward(address _rewardToken) public isVaultManager {
+        for (uint i = 0; i < rewardTokens.length; i++) {
+            if (address(rewardTokens[i]) == _rewardToken) {
+                uint256 last = rewardTokens.length - 1;
+                rewardTokens[i].approve(address(balancerVault), 0);
+                if (i < last) {
+                    rewardTokens[i] = rewardTokens[last];
+                    swapSteps[i].poolIds = swapSteps[last].poolIds;
+                    swapSteps[i].assets = swapSteps[last].assets;
+                    claimSources[i] = claimSources[last];
+                }
+                rewardTokens.pop();
+                swapSteps.pop();
+                claimSources.pop();
+                return;
+            }
+        }
+        revert("!listed");
     }
 
     function delistAllRewards() public isVaultManager {
@@ -425,6 +670,13 @@ contract Strategy is BaseStrategy {
         IERC20[] memory noRewardTokens;
         rewardTokens = noRewardTokens;
         delete swapSteps;
+        delete claimSources;
+    }
+
+    // route from WETH to want that ethToWant prices gas along, usually the tail of the BAL route
+    function setEthToWantSteps(SwapSteps memory _steps) external isVaultManager {
+        require(_steps.poolIds.length == 0 || address(_steps.assets[_steps.poolIds.length]) == address(want), "!want");
+        ethToWantSteps = _steps;
     }
 
     function numRewards() public view returns (uint256 _num){
@@ -432,26 +684,134 @@ contract Strategy is BaseStrategy {
     }
 
     function setParams(uint256 _maxSlippageIn, uint256 _maxSlippageOut, uint256 _maxSingleDeposit, uint256 _minDepositPeriod) public isVaultManager {
-        require(_maxSlippageIn <= basisOne, "maxSlippageIn too high");
-        maxSlippageIn = _maxSlippageIn;
+        _setParams(_maxSlippageIn, _maxSlippageOut, _maxSingleDeposit, _minDepositPeriod);
+    }
 
+    function _setParams(uint256 _maxSlippageIn, uint256 _maxSlippageOut, uint256 _maxSingleDeposit, uint256 _minDepositPeriod) internal {
+        require(_maxSlippageIn <= basisOne, "maxSlippageIn too high");
         require(_maxSlippageOut <= basisOne, "maxSlippageOut too high");
-        maxSlippageOut = _maxSlippageOut;
+        require(_maxSingleDeposit <= type(uint96).max, "maxSingleDeposit too high");
+        require(_minDepositPeriod <= type(uint32).max, "minDepositPeriod too high");
+        // written back whole, one SSTORE
+        Params memory _params = params;
+        _params.maxSlippageIn = uint16(_maxSlippageIn);
+        _params.maxSlippageOut = uint16(_maxSlippageOut);
+        _params.maxSingleDeposit = uint96(_maxSingleDeposit);
+        _params.minDepositPeriod = uint32(_minDepositPeriod);
+        params = _params;
+    }
+
+    function setBufferBips(uint256 _bufferBips) external isVaultManager {
+        require(_bufferBips <= basisOne, "bufferBips too high");
+        params.bufferBips = uint16(_bufferBips);
+        _rebalanceBuffer(_bufferBips);
+    }
+
+    // want per 1e18 of each reward, priced off-chain where a sale can't move it. Capped at spot plus
+    // maxSlippageRewards, so a quote can hold a reward back only while its pool is really below it
+    function setQuotes(address[] calldata _tokens, uint256[] calldata _wantPerToken) external onlyKeepers {
+        require(_tokens.length == _wantPerToken.length, "!length");
+        uint256 slippage = keepParams.maxSlippageRewards;
+        for (uint i = 0; i < _tokens.length; i++) {
+            uint256 spot = _spotAlong(swapSteps[_rewardIndex(_tokens[i])], 1e18);
+            require(_wantPerToken[i] <= spot.mul(basisOne.add(slippage)).div(basisOne), "quote over spot");
+            quotes[_tokens[i]] = Quote(uint224(_wantPerToken[i]), uint32(now));
+        }
+    }
 
-        maxSingleDeposit = _maxSingleDeposit;
-        minDepositPeriod = _minDepositPeriod;
+    function _rewardIndex(address _token) internal view returns (uint256){
+        for (uint i = 0; i < rewardTokens.length; i++) {
+            if (address(rewardTokens[i]) == _token) {
+                return i;
+            }
+        }
+        revert("!listed");
+    }
+
+    function setMaxSlippageRewards(uint256 _maxSlippageRewards) external isVaultManager {
+        require(_maxSlippageRewards <= basisOne, "maxSlippageRewards too high");
+        keepParams.maxSlippageRewards = uint16(_maxSlippageRewards);
     }
 
     function setToggles(bool _doSellRewards, bool _doClaimRewards, bool _doCollectTradingFees) external isVaultManager {
-        toggles.doSellRewards = _doSellRewards;
-        toggles.doClaimRewards = _doClaimRewards;
-        toggles.doCollectTradingFees = _doCollectTradingFees;
+        Params memory _params = params;
+        _params.doSellRewards = _doSellRewards;
+        _params.doClaimRewards = _doClaimRewards;
+        _params.doCollectTradingFees = _doCollectTradingFees;
+        params = _params;
+    }
+
+    function maxSlippageIn() public view returns (uint256){
+        return params.maxSlippageIn;
+    }
+
+    function maxSlippageOut() public view returns (uint256){
+        return params.maxSlippageOut;
+    }
+
+    function maxSingleDeposit() public view returns (uint256){
+        return params.maxSingleDeposit;
+    }
+
+    function minDepositPeriod() public view returns (uint256){
+        return params.minDepositPeriod;
+    }
+
+    function lastDepositTime() public view returns (uint256){
+        return params.lastDepositTime;
+    }
+
+    function numTokens() public view returns (uint8){
+        return params.numTokens;
+    }
+
+    function tokenIndex() public view returns (uint8){
+        return params.tokenIndex;
+    }
+
+    function bufferBips() public view returns (uint256){
+        return params.bufferBips;
+    }
+
+    function toggles() public view returns (bool doSellRewards, bool doClaimRewards, bool doCollectTradingFees){
+        Params memory _params = params;
+        return (_params.doSellRewards, _params.doClaimRewards, _params.doCollectTradingFees);
+    }
+
+    function keep() public view returns (address){
+        return keepParams.keep;
+    }
+
+    function keepBips() public view returns (uint256){
+        return keepParams.keepBips;
+    }
+
+    function maxSlippageRewards() public view returns (uint256){
+        return keepParams.maxSlippageRewards;
     }
 
     function getSwapSteps() public view returns (SwapSteps[] memory){
         return swapSteps;
     }
 
+    // whole position in one call, for monitoring
+    function getSnapshot() external view returns (Snapshot memory _snapshot){
+        _snapshot.balanceOfWant = balanceOfWant();
+        _snapshot.balanceOfUnstakedBpt = balanceOfUnstakedBpt();
+        _snapshot.balanceOfStakedBpt = balanceOfStakedBpt();
+        _snapshot.balanceOfPooled = bptsToTokens(_snapshot.balanceOfUnstakedBpt.add(_snapshot.balanceOfStakedBpt));
+        _snapshot.estimatedTotalAssets = _snapshot.balanceOfWant.add(_snapshot.balanceOfPooled);
+        _snapshot.bptRate = bpt.getRate();
+        _snapshot.rewardTokens = rewardTokens;
+        _snapshot.rewardBalances = new uint256[](rewardTokens.length);
+        for (uint i = 0; i < rewardTokens.length; i++) {
+            _snapshot.rewardBalances[i] = balanceOfReward(i);
+        }
+        Params memory _params = params;
+        _snapshot.lastDepositTime = _params.lastDepositTime;
+        _snapshot.toggles = Toggles(_params.doSellRewards, _params.doClaimRewards, _params.doCollectTradingFees);
+    }
+
     function stakeBpt(uint256 _amount) external isVaultManager {
         _stakeBpt(_amount);
     }
@@ -469,9 +829,9 @@ contract Strategy is BaseStrategy {
     }
 
     function setKeepParams(address _keep, uint256 _keepBips) external onlyGovernance {
-        require(keepBips <= basisOne);
-        keep = _keep;
-        keepBips = _keepBips;
+        require(_keepBips <= basisOne);
+        keepParams.keep = _keep;
+        keepParams.keepBips = uint16(_keepBips);
     }
 
     // Balancer requires this contract to be payable, so we add ability to sweep stuck ETH
@@ -6,6 +6,8 @@ import "./Strategy.sol";
 
 contract StrategyFactory {
     address public immutable original;
+    // in whole want tokens, as the constructor took it. Each clone scales it to its own want
+    uint256 public immutable maxSingleDeposit;
 
     event Cloned(address indexed clone);
     event Deployed(address indexed original);
@@ -25,6 +27,7 @@ contract StrategyFactory {
         emit Deployed(address(_original));
 
         original = address(_original);
+        maxSingleDeposit = _maxSingleDeposit;
         _original.setRewards(msg.sender);
         _original.setKeeper(msg.sender);
         _original.setStrategist(msg.sender);
@@ -41,6 +44,28 @@ contract StrategyFactory {
         );
     }
 
+    // a clone to deploy, with the rewards to list on it before it's added to its vault
+    struct CloneParams {
+        address vault;
+        address strategist;
+        address rewards;
+        address keeper;
+        address balancerPool;
+        address[] rewardTokens;
+        Strategy.SwapSteps[] rewardSteps;
+    }
+
+    // what every clone copies from original, read once per transaction
+    struct Template {
+        address balancerVault;
+        address gaugeFactory;
+        address minter;
+        uint256 maxSlippageIn;
+        uint256 maxSlippageOut;
+        uint256 maxSingleDeposit;
+        uint256 minDepositPeriod;
+    }
+
     function clone(
         address _vault,
         address _strategist,
@@ -48,6 +73,110 @@ contract StrategyFactory {
         address _keeper,
         address _balancerPool
     ) external returns (address payable newStrategy) {
+        newStrategy = _clone(_vault, _strategist, _rewards, _keeper, _balancerPool, _template());
+        Strategy(newStrategy).renounceCreator();
+    }
+
+    // at an address known before it's mined, see predictDeterministicAddress. Rewards are listed as cloneMany lists
+    // them, so the clone is ready in one transaction from any sender
+    function cloneDeterministic(
+        address _vault,
+        address _strategist,
+        address _rewards,
+        address _keeper,
+        address _balancerPool,
+        address[] memory _rewardTokens,
+        Strategy.SwapSteps[] memory _rewardSteps,
+        bytes32 _salt
+    ) external returns (address payable newStrategy) {
+        newStrategy = _deployDeterministic(_boundSalt(msg.sender, _salt));
+        _initializeClone(newStrategy, _vault, _strategist, _rewards, _keeper, _balancerPool, _template());
+        _whitelistRewards(newStrategy, _rewardTokens, _rewardSteps);
+        Strategy(newStrategy).renounceCreator();
+    }
+
+    // where `_deployer` cloning with `_salt` puts the clone. Salts are bound to the sender so no one can take another's address
+    function predictDeterministicAddress(address _deployer, bytes32 _salt) external view returns (address) {
+        bytes32 hash = keccak256(abi.encodePacked(bytes1(0xff), address(this), _boundSalt(_deployer, _salt), keccak256(_cloneCode())));
+        return address(uint160(uint256(hash)));
+    }
+
+    // every token of a pool, or many pools, in one transaction
+    function cloneMany(CloneParams[] memory _params) external returns (address payable[] memory newStrategies) {
+        Template memory template = _template();
+        newStrategies = new address payable[](_params.length);
+        for (uint256 i = 0; i < _params.length; i++) {
+            CloneParams memory p = _params[i];
+            newStrategies[i] = _clone(p.vault, p.strategist, p.rewards, p.keeper, p.balancerPool, template);
+            _whitelistRewards(newStrategies[i], p.rewardTokens, p.rewardSteps);
+            // listing rewards was all the factory needed the clone for
+            Strategy(newStrategies[i]).renounceCreator();
+        }
+    }
+
+    function _whitelistRewards(
+        address payable _strategy,
+        address[] memory _rewardTokens,
+        Strategy.SwapSteps[] memory _rewardSteps
+    ) internal {
+        require(_rewardTokens.length == _rewardSteps.length, "!rewards");
+        for (uint256 i = 0; i < _rewardTokens.length; i++) {
+            Strategy(_strategy).whitelistRewards(_rewardTokens[i], _rewardSteps[i]);
+        }
+    }
+
+    function _template() internal view returns (Template memory) {
+        Strategy o = Strategy(payable(original));
+        return Template(
+            address(o.balancerVault()),
+            address(o.gaugeFactory()),
+            address(o.minter()),
+            o.maxSlippageIn(),
+            o.maxSlippageOut(),
+            maxSingleDeposit,
+            o.minDepositPeriod()
+        );
+    }
+
+    function _clone(
+        address _vault,
+        address _strategist,
+        address _rewards,
+        address _keeper,
+        address _balancerPool,
+        Template memory _t
+    ) internal returns (address payable newStrategy) {
+        newStrategy = _deploy();
+        _initializeClone(newStrategy, _vault, _strategist, _rewards, _keeper, _balancerPool, _t);
+    }
+
+    function _initializeClone(
+        address payable _newStrategy,
+        address _vault,
+        address _strategist,
+        address _rewards,
+        address _keeper,
+        address _balancerPool,
+        Template memory _t
+    ) internal {
+        Strategy(_newStrategy).initialize(
+            _vault,
+            _strategist,
+            _rewards,
+            _keeper,
+            _t.balancerVault,
+            _balancerPool,
+            _t.gaugeFactory,
+            _t.minter,
+            _t.maxSlippageIn,
+            _t.maxSlippageOut,
+            _t.maxSingleDeposit,
+            _t.minDepositPeriod
+        );
+        emit Cloned(_newStrategy);
+    }
+
+    function _deploy() internal returns (address payable newStrategy) {
         // Copied from https://github.com/optionality/clone-factory/blob/master/contracts/CloneFactory.sol
         bytes20 addressBytes = bytes20(original);
         assembly {
@@ -64,21 +193,22 @@ contract StrategyFactory {
             )
             newStrategy := create(0, clone_code, 0x37)
         }
-        Strategy o = Strategy(payable(original));
-        Strategy(newStrategy).initialize(
-            _vault,
-            _strategist,
-            _rewards,
-            _keeper,
-            address(o.balancerVault()),
-            _balancerPool,
-            address(o.gaugeFactory()),
-            address(o.minter()),
-            o.maxSlippageIn(),
-            o.maxSlippageOut(),
-            o.maxSingleDeposit(),
-            o.minDepositPeriod()
-        );
-        emit Cloned(newStrategy);
+    }
+
+    function _deployDeterministic(bytes32 _salt) internal returns (address payable newStrategy) {
+        bytes memory code = _cloneCode();
+        assembly {
+            newStrategy := create2(0, add(code, 0x20), mload(code), _salt)
+        }
+        require(newStrategy != address(0), "salt used");
+    }
+
+    // the same EIP-1167 bytecode _deploy writes
+    function _cloneCode() internal view returns (bytes memory) {
+        return abi.encodePacked(hex"3d602d80600a3d3981f3363d3d373d3d3d363d73", original, hex"5af43d82803e903d91602b57fd5bf3");
+    }
+
+    function _boundSalt(address _deployer, bytes32 _salt) internal pure returns (bytes32) {
+        return keccak256(abi.encodePacked(_deployer, _salt));
     }
 }
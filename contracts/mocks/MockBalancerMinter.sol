@@ -0,0 +1,34 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import {SafeMath} from "@openzeppelin/contracts/math/SafeMath.sol";
+import "./MockERC20.sol";
+import "./MockGauge.sol";
+
+// Mints the difference between a gauge's integrate_fraction and what was already minted, like Balancer's minter.
+contract MockBalancerMinter {
+    using SafeMath for uint256;
+
+    MockERC20 internal balancerToken;
+    mapping(address => mapping(address => uint256)) public minted;
+
+    event Minted(address indexed recipient, address gauge, uint256 minted);
+
+    constructor(MockERC20 _balancerToken) public {
+        balancerToken = _balancerToken;
+    }
+
+    function getBalancerToken() external view returns (MockERC20) {
+        return balancerToken;
+    }
+
+    function mint(address _gauge) external returns (uint256 amount) {
+        uint256 total = MockGauge(_gauge).integrate_fraction(msg.sender);
+        amount = total.sub(minted[msg.sender][_gauge]);
+        if (amount > 0) {
+            minted[msg.sender][_gauge] = total;
+            balancerToken.mint(msg.sender, amount);
+            emit Minted(msg.sender, _gauge, amount);
+        }
+    }
+}
@@ -0,0 +1,44 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import {ERC20} from "@openzeppelin/contracts/token/ERC20/ERC20.sol";
+
+// BPT of a MockBalancerVault pool. Only the vault mints and burns it, and its rate can be set to simulate fees.
+contract MockBalancerPool is ERC20 {
+    address public vault;
+    bytes32 internal poolId;
+    uint256 internal rate = 1e18;
+
+    modifier onlyVault {
+        require(msg.sender == vault, "!vault");
+        _;
+    }
+
+    constructor(string memory _name, string memory _symbol) public ERC20(_name, _symbol) {
+        vault = msg.sender;
+    }
+
+    function initialize(bytes32 _poolId) external onlyVault {
+        poolId = _poolId;
+    }
+
+    function getPoolId() external view returns (bytes32) {
+        return poolId;
+    }
+
+    function getRate() external view returns (uint256) {
+        return rate;
+    }
+
+    function setRate(uint256 _rate) external {
+        rate = _rate;
+    }
+
+    function mint(address _to, uint256 _amount) external onlyVault {
+        _mint(_to, _amount);
+    }
+
+    function burn(address _from, uint256 _amount) external onlyVault {
+        _burn(_from, _amount);
+    }
+}
@@ -0,0 +1,193 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import {SafeERC20, SafeMath, IERC20} from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+import {ERC20} from "@openzeppelin/contracts/token/ERC20/ERC20.sol";
+import "../../interfaces/BalancerV2.sol";
+import "./MockBalancerPool.sol";
+
+// Local stand-in for Balancer's Vault. Every pool prices all of its tokens 1:1 (after decimals) and its BPT at the
+// pool's rate. Instead of a curve, joining with a token the pool holds more of than average, or exiting to one it
+// holds less of, is discounted by how far that token's balance ends up from the average, so unbalanced pools cause
+// slippage. Slippage limits revert with the same BAL# codes.
+contract MockBalancerVault {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+
+    struct Pool {
+        MockBalancerPool bpt;
+        IERC20[] tokens;
+        mapping(address => uint256) balances;
+    }
+
+    mapping(bytes32 => Pool) internal pools;
+    uint256 public numPools;
+
+    event PoolCreated(bytes32 indexed poolId, address pool);
+
+    function createPool(string memory _name, string memory _symbol, IERC20[] memory _tokens) external returns (bytes32 poolId) {
+        MockBalancerPool bpt = new MockBalancerPool(_name, _symbol);
+        poolId = bytes32((uint256(address(bpt)) << 96) | numPools++);
+        bpt.initialize(poolId);
+        pools[poolId].bpt = bpt;
+        pools[poolId].tokens = _tokens;
+        emit PoolCreated(poolId, address(bpt));
+    }
+
+    function getPool(bytes32 _poolId) external view returns (address, IBalancerVault.PoolSpecialization) {
+        return (address(pools[_poolId].bpt), IBalancerVault.PoolSpecialization.GENERAL);
+    }
+
+    function getPoolTokens(bytes32 _poolId) external view returns (IERC20[] memory tokens, uint256[] memory balances, uint256 lastChangeBlock) {
+        Pool storage pool = pools[_poolId];
+        tokens = pool.tokens;
+        balances = new uint256[](tokens.length);
+        for (uint256 i = 0; i < tokens.length; i++) {
+            balances[i] = pool.balances[address(tokens[i])];
+        }
+        lastChangeBlock = block.number;
+    }
+
+    function joinPool(bytes32 _poolId, address _sender, address _recipient, IBalancerVault.JoinPoolRequest memory _request) external payable {
+        Pool storage pool = pools[_poolId];
+        (IBalancerVault.JoinKind kind, uint256[] memory amountsIn, uint256 minBptOut) = abi.decode(_request.userData, (IBalancerVault.JoinKind, uint256[], uint256));
+        require(kind == IBalancerVault.JoinKind.EXACT_TOKENS_IN_FOR_BPT_OUT, "unsupported join");
+
+        for (uint256 i = 0; i < amountsIn.length; i++) {
+            if (amountsIn[i] > 0) {
+                require(amountsIn[i] <= _request.maxAmountsIn[i], "BAL#506");
+                IERC20 token = pool.tokens[i];
+                token.safeTransferFrom(_sender, address(this), amountsIn[i]);
+                pool.balances[address(token)] = pool.balances[address(token)].add(amountsIn[i]);
+            }
+        }
+
+        uint256 mean = _meanBalance(pool);
+        uint256 value;
+        for (uint256 i = 0; i < amountsIn.length; i++) {
+            if (amountsIn[i] > 0) {
+                uint256 balance = _scaledBalance(pool, pool.tokens[i]);
+                uint256 scaled = _scale(amountsIn[i], ERC20(address(pool.tokens[i])).decimals(), 18);
+                value = value.add(balance > mean ? scaled.mul(mean).div(balance) : scaled);
+            }
+        }
+        uint256 bptOut = value.mul(1e18).div(pool.bpt.getRate());
+        require(bptOut >= minBptOut, "BAL#208");
+        pool.bpt.mint(_recipient, bptOut);
+    }
+
+    function exitPool(bytes32 _poolId, address _sender, address payable _recipient, IBalancerVault.ExitPoolRequest memory _request) external {
+        Pool storage pool = pools[_poolId];
+        (IBalancerVault.ExitKind kind, uint256 bptIn, uint256 tokenIndex) = abi.decode(_request.userData, (IBalancerVault.ExitKind, uint256, uint256));
+        require(kind == IBalancerVault.ExitKind.EXACT_BPT_IN_FOR_ONE_TOKEN_OUT, "unsupported exit");
+
+        IERC20 token = pool.tokens[tokenIndex];
+        uint256 amountOut = _scale(bptIn.mul(pool.bpt.getRate()).div(1e18), 18, ERC20(address(token)).decimals());
+        pool.balances[address(token)] = pool.balances[address(token)].sub(amountOut, "BAL#001");
+        uint256 mean = _meanBalance(pool);
+        uint256 balance = _scaledBalance(pool, token);
+        if (balance < mean) {
+            uint256 discounted = amountOut.mul(balance).div(mean);
+            pool.balances[address(token)] = pool.balances[address(token)].add(amountOut.sub(discounted));
+            amountOut = discounted;
+        }
+        require(amountOut >= _request.minAmountsOut[tokenIndex], "BAL#505");
+        pool.bpt.burn(_sender, bptIn);
+        token.safeTransfer(_recipient, amountOut);
+    }
+
+    function swap(
+        IBalancerVault.SingleSwap memory _singleSwap,
+        IBalancerVault.FundManagement memory _funds,
+        uint256 _limit,
+        uint256 _deadline
+    ) external payable returns (uint256 amountCalculated) {
+        require(block.timestamp <= _deadline, "BAL#508");
+        IERC20 tokenIn = IERC20(address(_singleSwap.assetIn));
+        IERC20 tokenOut = IERC20(address(_singleSwap.assetOut));
+        uint256 amountIn;
+        uint256 amountOut;
+        if (_singleSwap.kind == IBalancerVault.SwapKind.GIVEN_IN) {
+            amountIn = _singleSwap.amount;
+            amountOut = _swap(pools[_singleSwap.poolId], tokenIn, tokenOut, amountIn);
+            require(amountOut >= _limit, "BAL#507");
+            amountCalculated = amountOut;
+        } else {
+            amountOut = _singleSwap.amount;
+            amountIn = _scale(amountOut, ERC20(address(tokenOut)).decimals(), ERC20(address(tokenIn)).decimals());
+            amountOut = _swap(pools[_singleSwap.poolId], tokenIn, tokenOut, amountIn);
+            require(amountIn <= _limit, "BAL#507");
+            amountCalculated = amountIn;
+        }
+        tokenIn.safeTransferFrom(_funds.sender, address(this), amountIn);
+        tokenOut.safeTransfer(_funds.recipient, amountOut);
+    }
+
+    function batchSwap(
+        IBalancerVault.SwapKind _kind,
+        IBalancerVault.BatchSwapStep[] memory _swaps,
+        IAsset[] memory _assets,
+        IBalancerVault.FundManagement memory _funds,
+        int256[] memory _limits,
+        uint256 _deadline
+    ) external payable returns (int256[] memory deltas) {
+        require(block.timestamp <= _deadline, "BAL#508");
+        deltas = _batchSwap(_kind, _swaps, _assets);
+        for (uint256 i = 0; i < _assets.length; i++) {
+            require(deltas[i] <= _limits[i], "BAL#507");
+            IERC20 token = IERC20(address(_assets[i]));
+            if (deltas[i] > 0) {
+                token.safeTransferFrom(_funds.sender, address(this), uint256(deltas[i]));
+            } else if (deltas[i] < 0) {
+                token.safeTransfer(_funds.recipient, uint256(-deltas[i]));
+            }
+        }
+    }
+
+    function queryBatchSwap(
+        IBalancerVault.SwapKind _kind,
+        IBalancerVault.BatchSwapStep[] memory _swaps,
+        IAsset[] memory _assets,
+        IBalancerVault.FundManagement memory
+    ) external returns (int256[] memory) {
+        return _batchSwap(_kind, _swaps, _assets);
+    }
+
+    function _batchSwap(IBalancerVault.SwapKind _kind, IBalancerVault.BatchSwapStep[] memory _swaps, IAsset[] memory _assets) internal returns (int256[] memory deltas) {
+        require(_kind == IBalancerVault.SwapKind.GIVEN_IN, "unsupported swap");
+        deltas = new int256[](_assets.length);
+        uint256 amount;
+        for (uint256 i = 0; i < _swaps.length; i++) {
+            IBalancerVault.BatchSwapStep memory step = _swaps[i];
+            if (step.amount > 0) {
+                amount = step.amount;
+            }
+            deltas[step.assetInIndex] += int256(amount);
+            amount = _swap(pools[step.poolId], IERC20(address(_assets[step.assetInIndex])), IERC20(address(_assets[step.assetOutIndex])), amount);
+            deltas[step.assetOutIndex] -= int256(amount);
+        }
+    }
+
+    function _swap(Pool storage _pool, IERC20 _tokenIn, IERC20 _tokenOut, uint256 _amountIn) internal returns (uint256 amountOut) {
+        amountOut = _scale(_amountIn, ERC20(address(_tokenIn)).decimals(), ERC20(address(_tokenOut)).decimals());
+        _pool.balances[address(_tokenIn)] = _pool.balances[address(_tokenIn)].add(_amountIn);
+        _pool.balances[address(_tokenOut)] = _pool.balances[address(_tokenOut)].sub(amountOut, "BAL#001");
+    }
+
+    // balance of `_token` in 18 decimals
+    function _scaledBalance(Pool storage _pool, IERC20 _token) internal view returns (uint256) {
+        return _scale(_pool.balances[address(_token)], ERC20(address(_token)).decimals(), 18);
+    }
+
+    function _meanBalance(Pool storage _pool) internal view returns (uint256 total) {
+        for (uint256 i = 0; i < _pool.tokens.length; i++) {
+            total = total.add(_scaledBalance(_pool, _pool.tokens[i]));
+        }
+        return total.div(_pool.tokens.length);
+    }
+
+    function _scale(uint256 _amount, uint256 _decimalsFrom, uint256 _decimalsTo) internal pure returns (uint256) {
+        return _decimalsTo > _decimalsFrom ? _amount.mul(10 ** (_decimalsTo - _decimalsFrom)) : _amount.div(10 ** (_decimalsFrom - _decimalsTo));
+    }
+}
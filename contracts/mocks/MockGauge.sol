@@ -0,0 +1,99 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import {SafeERC20, SafeMath, IERC20} from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+import "./MockERC20.sol";
+import "../../interfaces/BalancerMinter.sol";
+
+// Local stand-in for a Balancer liquidity gauge. Each reward token (a MockERC20, minted on claim) accrues to stakers
+// at a fixed rate per staked BPT per second, and tests can also set what's claimable outright. integrate_fraction
+// is set directly for MockBalancerMinter to mint against, and claimable_tokens is what the minter hasn't minted of it.
+contract MockGauge {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+
+    IERC20 public lp_token;
+    uint256 public totalSupply;
+    mapping(address => uint256) public balanceOf;
+    mapping(address => uint256) public integrate_fraction;
+    IBalancerMinter public minter;
+    address[] public rewardTokens;
+    // reward token wei per second per 1e18 staked
+    mapping(address => uint256) public rewardRates;
+    mapping(address => mapping(address => uint256)) internal accrued;
+    mapping(address => uint256) internal lastCheckpoint;
+
+    constructor(IERC20 _lpToken) public {
+        lp_token = _lpToken;
+    }
+
+    function deposit(uint256 _value, address _recipient) external {
+        _checkpoint(_recipient);
+        lp_token.safeTransferFrom(msg.sender, address(this), _value);
+        balanceOf[_recipient] = balanceOf[_recipient].add(_value);
+        totalSupply = totalSupply.add(_value);
+    }
+
+    function withdraw(uint256 _value) external {
+        _checkpoint(msg.sender);
+        balanceOf[msg.sender] = balanceOf[msg.sender].sub(_value);
+        totalSupply = totalSupply.sub(_value);
+        lp_token.safeTransfer(msg.sender, _value);
+    }
+
+    function claimable_rewards(address _user, address _token) public view returns (uint256) {
+        uint256 elapsed = block.timestamp.sub(lastCheckpoint[_user]);
+        return accrued[_user][_token].add(balanceOf[_user].mul(rewardRates[_token]).mul(elapsed).div(1e18));
+    }
+
+    function claimable_tokens(address _user) external view returns (uint256) {
+        return integrate_fraction[_user].sub(minter.minted(_user, address(this)));
+    }
+
+    function claim_rewards(address _user) external {
+        _checkpoint(_user);
+        for (uint256 i = 0; i < rewardTokens.length; i++) {
+            address token = rewardTokens[i];
+            uint256 amount = accrued[_user][token];
+            if (amount > 0) {
+                accrued[_user][token] = 0;
+                MockERC20(token).mint(_user, amount);
+            }
+        }
+    }
+
+    function setRewardRate(address _token, uint256 _rate) external {
+        _addReward(_token);
+        rewardRates[_token] = _rate;
+    }
+
+    function setClaimable(address _user, address _token, uint256 _amount) external {
+        _addReward(_token);
+        _checkpoint(_user);
+        accrued[_user][_token] = _amount;
+    }
+
+    function setIntegrateFraction(address _user, uint256 _amount) external {
+        integrate_fraction[_user] = _amount;
+    }
+
+    function setMinter(IBalancerMinter _minter) external {
+        minter = _minter;
+    }
+
+    function _addReward(address _token) internal {
+        for (uint256 i = 0; i < rewardTokens.length; i++) {
+            if (rewardTokens[i] == _token) {
+                return;
+            }
+        }
+        rewardTokens.push(_token);
+    }
+
+    function _checkpoint(address _user) internal {
+        for (uint256 i = 0; i < rewardTokens.length; i++) {
+            accrued[_user][rewardTokens[i]] = claimable_rewards(_user, rewardTokens[i]);
+        }
+        lastCheckpoint[_user] = block.timestamp;
+    }
+}
@@ -0,0 +1,19 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import {IERC20} from "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import "./MockGauge.sol";
+
+contract MockGaugeFactory {
+    mapping(address => address) public getPoolGauge;
+    mapping(address => bool) public isGaugeFromFactory;
+
+    event GaugeCreated(address indexed gauge, address indexed pool);
+
+    function create(address _pool) external returns (address gauge) {
+        gauge = address(new MockGauge(IERC20(_pool)));
+        getPoolGauge[_pool] = gauge;
+        isGaugeFromFactory[gauge] = true;
+        emit GaugeCreated(gauge, _pool);
+    }
+}
@@ -0,0 +1,10 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+// Passes every report, like health.ychad.eth does for the limits tests stay within. Holds no state, so its code can
+// be placed at health.ychad.eth's address on a local chain.
+contract MockHealthCheck {
+    function check(uint256, uint256, uint256, uint256, uint256) external pure returns (bool) {
+        return true;
+    }
+}
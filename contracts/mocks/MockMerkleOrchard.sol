@@ -0,0 +1,55 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import {IERC20} from "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+
+// Local stand-in for Balancer's MerkleOrchard. Proofs are not verified, claims are only recorded.
+contract MockMerkleOrchard {
+    struct Claim {
+        uint256 distributionId;
+        uint256 balance;
+        address distributor;
+        uint256 tokenIndex;
+        bytes32[] merkleProof;
+    }
+
+    event DistributionClaimed(address indexed distributor, IERC20 indexed token, uint256 distributionId, address indexed claimer, uint256 amount);
+
+    mapping(bytes32 => uint256) internal nextDistributionId;
+    mapping(bytes32 => bool) internal claimed;
+
+    function getNextDistributionId(IERC20 token, address distributor) external view returns (uint256) {
+        return nextDistributionId[_channelId(token, distributor)];
+    }
+
+    function setNextDistributionId(IERC20 token, address distributor, uint256 id) external {
+        nextDistributionId[_channelId(token, distributor)] = id;
+    }
+
+    function isClaimed(IERC20 token, address distributor, uint256 distributionId, address claimer) public view returns (bool) {
+        return claimed[_claimId(token, distributor, distributionId, claimer)];
+    }
+
+    function setClaimed(IERC20 token, address distributor, uint256 distributionId, address claimer) external {
+        claimed[_claimId(token, distributor, distributionId, claimer)] = true;
+    }
+
+    function claimDistributions(address claimer, Claim[] memory claims, IERC20[] memory tokens) external {
+        for (uint256 i = 0; i < claims.length; i++) {
+            Claim memory claim = claims[i];
+            IERC20 token = tokens[claim.tokenIndex];
+            require(!isClaimed(token, claim.distributor, claim.distributionId, claimer), "cannot claim twice");
+            claimed[_claimId(token, claim.distributor, claim.distributionId, claimer)] = true;
+            emit DistributionClaimed(claim.distributor, token, claim.distributionId, claimer, claim.balance);
+        }
+    }
+
+    function _channelId(IERC20 token, address distributor) internal pure returns (bytes32) {
+        return keccak256(abi.encodePacked(token, distributor));
+    }
+
+    function _claimId(IERC20 token, address distributor, uint256 distributionId, address claimer) internal pure returns (bytes32) {
+        return keccak256(abi.encodePacked(token, distributor, distributionId, claimer));
+    }
+}
@@ -35,6 +35,10 @@ interface IBalancerPool is IERC20 {
     ) external view returns (uint256 amount);
 }
 
+interface IWeightedPool is IBalancerPool {
+    function getNormalizedWeights() external view returns (uint256[] memory);
+}
+
 interface IBalancerVault {
     enum PoolSpecialization {GENERAL, MINIMAL_SWAP_INFO, TWO_TOKEN}
     enum JoinKind {INIT, EXACT_TOKENS_IN_FOR_BPT_OUT, TOKEN_IN_FOR_EXACT_BPT_OUT, ALL_TOKENS_IN_FOR_EXACT_BPT_OUT}
@@ -201,6 +205,14 @@ interface IBalancerVault {
         int256[] memory limits,
         uint256 deadline
     ) external payable returns (int256[] memory);
+
+    // batchSwap's deltas without settling them, meant to be called off-chain
+    function queryBatchSwap(
+        SwapKind kind,
+        BatchSwapStep[] memory swaps,
+        IAsset[] memory assets,
+        FundManagement memory funds
+    ) external returns (int256[] memory assetDeltas);
 }
 
 interface IAsset {
@@ -33,6 +33,10 @@ interface IStakingLiquidityGauge is ILiquidityGauge, IERC20 {
 
     function claimable_rewards(address user, address rewardToken) external view returns (uint256);
 
+    // BAL the minter would mint `user` now. The gauge checkpoints `user` first, so this writes state on chain: it's
+    // declared view only so scripts can batch it into aggregate eth_calls, contracts must not call it
+    function claimable_tokens(address user) external view returns (uint256);
+
     function claim_rewards(address user) external;
 
     function add_reward(address rewardToken, address distributor) external;
@@ -1,49 +1,60 @@
-import urllib.request, json
-from brownie import Contract, accounts, web3
+from brownie import Contract, accounts
 import click
-import json
-import os
+from scripts.claim_cache import ClaimCache
+from scripts.cli import flag
+from scripts.executor import PipelinedExecutor
+from scripts.metadata import default_resolver
+from scripts.merkle import (MERKLE_ORCHARD, REWARDS, SSB_STRATEGIES, DEFAULT_CLAIM_GAS_LIMIT, is_claimed_many,
+                            plan_claims)
+from scripts.reports import load_reports
 
 
-def main():
-    dev = accounts.load(click.prompt("Account", type=click.Choice(accounts.load())))
-    merkleOrchard = Contract("0xdAE7e32ADc5d490a43cCba1f0c736033F2b4eFca")
-    bal = "0xba100000625a3754423978a60c9317c58a424e3D"
-    ldo = "0x5A98FcBEA516Cf06857215779Fd812CA3beF1B32"
-    bal_distributor = "0xd2EB7Bd802A7CA68d9AcD209bEc4E664A9abDD7b"
-    ldo_distributor = "0x55c8de1ac17c1a937293416c9bce5789cbbf61d1"
-    rewards = [("homestead_", bal, bal_distributor, "BAL"), ("homestead-lido_", ldo, ldo_distributor, "LDO")]
-    ldo_rewards = ("homestead-lido", ldo, ldo_distributor, "LDO")
+# brownie run claim main [dry_run] [gas_limit]
+def main(dry_run=False, gas_limit=DEFAULT_CLAIM_GAS_LIMIT):
+    dry_run = flag(dry_run)
+    dev = None if dry_run else accounts.load(click.prompt("Account", type=click.Choice(accounts.load())))
+    merkleOrchard = Contract(MERKLE_ORCHARD)
+    cache = ClaimCache()
+    executor = None if dry_run else PipelinedExecutor(dev)
 
-    for reward in rewards:
-        for root, dirs, files in os.walk(f'./scripts'):
-            for name in files:
-                if name.startswith(reward[0]):
-                    fileName = os.path.join(root, name)
-                    f = open(fileName, )
-                    data = json.load(f)
-                    if not "config" in data:
-                        continue
-                    config = data["config"]
-                    tokens_data = data["tokens_data"]
-                    distributionId = config["week"] - config["offset"]
+    pending = []
+    symbols = {}
+    for prefix, token, distributor, symbol in REWARDS:
+        symbols[token] = symbol
+        for (week, claimer), entry in sorted(load_reports(prefix, claimers=SSB_STRATEGIES).items()):
+            pending.append((claimer, token, distributor, entry))
 
-                    print(f'Week: {config["week"]}')
-                    for token_data in tokens_data:
-                        name = ""
-                        try:
-                            name = Contract(token_data["address"]).name()
-                        except:
-                            name = token_data["address"]
-                        print(f'claiming {name}')
-                        claim = [(distributionId,
-                                  int(token_data["claim_amount"]),
-                                  reward[2],
-                                  0,
-                                  token_data["hex_proof"])]
-                        claimed = merkleOrchard.isClaimed(reward[1], reward[2], distributionId, token_data["address"])
-                        print(f"claimed: {claimed}")
-                        if not claimed:
-                            # merkleOrchard.claimDistributions(token_data["address"], claim, [reward[1]], {'from': dev, 'gas_price': '50 gwei'})
-                            merkleOrchard.claimDistributions(token_data["address"], claim, [reward[1]], {'from': dev})
-                            print(f'{name} claimed {int(token_data["claim_amount"]) / 1e18} {reward[3]} ')
+    claimed = is_claimed_many(merkleOrchard, [(claimer, token, distributor, entry.distribution_id)
+                                              for claimer, token, distributor, entry in pending], cache=cache)
+    unclaimed = [p for p in pending if not claimed[(p[0], p[1], p[3].distribution_id)]]
+
+    batches = plan_claims(unclaimed, int(gas_limit))
+    metadata = default_resolver().resolve_many({batch.claimer for batch in batches})
+    submitted = []
+    for batch in batches:
+        name = metadata[batch.claimer].name or batch.claimer
+        amount = sum(claim[1] for claim in batch.claims)
+        ids = [claim[0] for claim in batch.claims]
+        print(f'claiming {name} {amount / 1e18} {symbols[batch.token]} ids: {ids} projected gas: {batch.gas}')
+        if dry_run:
+            try:
+                estimate = merkleOrchard.claimDistributions.estimate_gas(batch.claimer, batch.claims, [batch.token],
+                                                                         {'from': batch.claimer})
+                print(f'estimated gas: {estimate}')
+            except Exception as e:
+                print(f'gas estimate failed: {e}')
+            continue
+        # executor.submit(merkleOrchard.claimDistributions, batch.claimer, batch.claims, [batch.token], tx_params={'gas_price': '50 gwei'})
+        submitted.append((name, batch, executor.submit(merkleOrchard.claimDistributions, batch.claimer, batch.claims,
+                                                       [batch.token])))
+
+    if executor is not None:
+        executor.wait()
+    for name, batch, submission in submitted:
+        amount = sum(claim[1] for claim in batch.claims)
+        if submission.status == 1:
+            cache.record_many([(batch.claimer, batch.token, batch.distributor, claim[0]) for claim in batch.claims],
+                              submission.tx.block_number)
+            print(f'{name} claimed {amount / 1e18} {symbols[batch.token]}')
+        else:
+            print(f'{name} failed to claim {amount / 1e18} {symbols[batch.token]}: {submission.tx}')
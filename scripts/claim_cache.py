@@ -0,0 +1,50 @@
+import json
+from pathlib import Path
+
+DEFAULT_PATH = Path(".cache") / "claims.jsonl"
+
+
+def _key(token, distributor, distribution_id, claimer):
+    return str(token).lower(), str(distributor).lower(), int(distribution_id), str(claimer).lower()
+
+
+class ClaimCache:
+    """
+    Append-only on-disk record of claimed (token, distributor, id, claimer) tuples and the block they
+    were seen claimed at. A claimed distribution can never become unclaimed again, so anything
+    recorded here never has to be asked of the chain again.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = Path(path)
+        self._claimed = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        key = _key(entry["token"], entry["distributor"], entry["id"], entry["claimer"])
+                        self._claimed[key] = entry["block"]
+
+    def __len__(self):
+        return len(self._claimed)
+
+    def is_claimed(self, token, distributor, distribution_id, claimer):
+        return _key(token, distributor, distribution_id, claimer) in self._claimed
+
+    def record(self, token, distributor, distribution_id, claimer, block):
+        self.record_many([(claimer, token, distributor, distribution_id)], block)
+
+    def record_many(self, keys, block):
+        """
+        Records (claimer, token, distributor, id) keys as claimed at `block`. Already known keys are ignored.
+        """
+        new = [key for key in keys if not self.is_claimed(key[1], key[2], key[3], key[0])]
+        if not new:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            for claimer, token, distributor, distribution_id in new:
+                self._claimed[_key(token, distributor, distribution_id, claimer)] = block
+                f.write(json.dumps({"token": str(token), "distributor": str(distributor), "id": int(distribution_id),
+                                    "claimer": str(claimer), "block": block}) + "\n")
@@ -0,0 +1,5 @@
+def flag(value):
+    """
+    Reads a yes/no `brownie run` argument, which arrives as a string.
+    """
+    return str(value).lower() in ("true", "1", "yes")
@@ -0,0 +1,132 @@
+from pathlib import Path
+import yaml
+from brownie import StrategyFactory, accounts
+from eth_utils import keccak, to_bytes, to_checksum_address
+import click
+from scripts.executor import PipelinedExecutor
+
+# clones per transaction, each costs around 600k gas with its rewards listed
+DEFAULT_BATCH_SIZE = 10
+# gas sent with rollout transactions, which can't be estimated against clones that aren't mined yet: a clone and
+# each reward listed on it
+DEFAULT_CLONE_GAS = 700_000
+DEFAULT_REWARD_GAS = 250_000
+# StrategyFactory._cloneCode around the template's address
+CLONE_CODE_PREFIX = bytes.fromhex("3d602d80600a3d3981f3363d3d373d3d3d363d73")
+CLONE_CODE_SUFFIX = bytes.fromhex("5af43d82803e903d91602b57fd5bf3")
+
+# A manifest lists the clones to deploy from one factory. `defaults` fill in whatever a clone leaves out:
+#
+# factory: "0x..."
+# defaults:
+#   strategist: "0x..."
+#   rewards: "0x..."
+#   keeper: "0x..."
+# clones:
+#   - vault: "0x..."
+#     pool: "0x..."
+#     salt: "dai-stabal3"    only for rollout, any label or a 32 byte hex string
+#     reward_routes:
+#       - token: "0xba100000625a3754423978a60c9317c58a424e3D"
+#         pool_ids: ["0x...", "0x..."]
+#         assets: ["0xba100000625a3754423978a60c9317c58a424e3D", "<weth>", "<want>"]
+CLONE_KEYS = ("vault", "strategist", "rewards", "keeper", "pool")
+
+
+def load_manifest(path):
+    return yaml.safe_load(Path(path).read_text())
+
+
+def clone_entries(manifest):
+    """
+    Every clone of `manifest` with its `defaults` filled in, in manifest order.
+    """
+    defaults = manifest.get("defaults") or {}
+    return [{**defaults, **entry} for entry in manifest["clones"]]
+
+
+def clone_params(manifest):
+    """
+    StrategyFactory.cloneMany's CloneParams for every clone of `manifest`.
+    """
+    params = []
+    for entry in clone_entries(manifest):
+        missing = [key for key in CLONE_KEYS if key not in entry]
+        if missing:
+            raise ValueError(f'clone of {entry.get("vault")} is missing {", ".join(missing)}')
+        routes = entry.get("reward_routes") or []
+        params.append((*(entry[key] for key in CLONE_KEYS), [r["token"] for r in routes],
+                       [(r["pool_ids"], r["assets"]) for r in routes]))
+    return params
+
+
+def salt_bytes(salt):
+    """
+    32 byte hex strings are taken as they are, anything else is hashed into a salt.
+    """
+    if isinstance(salt, str) and salt.startswith("0x") and len(salt) == 66:
+        return to_bytes(hexstr=salt)
+    return keccak(text=str(salt))
+
+
+def predict_clone(factory, original, deployer, salt):
+    """
+    StrategyFactory.predictDeterministicAddress, offline: where `deployer` calling cloneDeterministic with `salt`
+    on `factory` puts its clone of `original`.
+    """
+    init_code = CLONE_CODE_PREFIX + to_bytes(hexstr=str(original)) + CLONE_CODE_SUFFIX
+    bound_salt = keccak(to_bytes(hexstr=str(deployer)) + salt_bytes(salt))
+    return to_checksum_address(keccak(b"\xff" + to_bytes(hexstr=str(factory)) + bound_salt + keccak(init_code))[12:])
+
+
+def rollout(manifest, account, executor, original=None):
+    """
+    Submits a cloneDeterministic for every clone of `manifest`, each needing a `salt` and listing its own rewards, all
+    through `executor` without waiting on any of them. Returns the clones' predicted addresses in manifest order.
+    """
+    factory = StrategyFactory.at(manifest["factory"])
+    original = original or factory.original()
+    clones = []
+    for entry, params in zip(manifest["clones"], clone_params(manifest)):
+        if "salt" not in entry:
+            raise ValueError(f'clone of {entry["vault"]} has no salt')
+        executor.submit(factory.cloneDeterministic, *params, salt_bytes(entry["salt"]),
+                        tx_params={"gas_limit": DEFAULT_CLONE_GAS + DEFAULT_REWARD_GAS * len(params[5])})
+        clones.append(predict_clone(factory.address, original, account.address, entry["salt"]))
+    return clones
+
+
+def clone_many(manifest, account, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Deploys every clone of `manifest` from `account`, `batch_size` a transaction. Returns their addresses in
+    manifest order, from the Cloned events since return values need tracing on live networks.
+    """
+    factory = StrategyFactory.at(manifest["factory"])
+    params = clone_params(manifest)
+    clones = []
+    for start in range(0, len(params), batch_size):
+        tx = factory.cloneMany(params[start:start + batch_size], {"from": account})
+        clones += [event["clone"] for event in tx.events["Cloned"]]
+    return clones
+
+
+# brownie run clone_many main <manifest.yml> [batch_size]
+def main(manifest, batch_size=DEFAULT_BATCH_SIZE):
+    manifest = load_manifest(manifest)
+    account = accounts.load(click.prompt("Account", type=click.Choice(accounts.load())))
+    clones = clone_many(manifest, account, int(batch_size))
+    for entry, clone in zip(manifest["clones"], clones):
+        print(f'{entry["vault"]}: {clone}')
+    return clones
+
+
+# brownie run clone_many deterministic <manifest.yml>
+def deterministic(manifest):
+    manifest = load_manifest(manifest)
+    account = accounts.load(click.prompt("Account", type=click.Choice(accounts.load())))
+    executor = PipelinedExecutor(account)
+    clones = rollout(manifest, account, executor)
+    executor.wait()
+    for entry, clone in zip(manifest["clones"], clones):
+        print(f'{entry["vault"]}: {clone}')
+    return clones
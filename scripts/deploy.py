@@ -1,58 +1,170 @@
-from pathlib import Path
+import os
+from brownie import Contract, Strategy, StrategyFactory, accounts, multicall, network
+from scripts import clone_many
+from scripts.cli import flag
+from scripts.metadata import default_resolver, unwrap
 
-from brownie import Strategy, accounts, config, network, project, web3
-from eth_utils import is_checksum_address
-import click
+# A deploy config is a clone_many manifest plus what it takes to run it unattended:
+#
+# deployer: "0x..."          impersonated on the fork for dry runs without `send`, which impersonate `account`
+# account: "ssb-deployer"    brownie keystore sent from, its password in $DEPLOY_PASSWORD
+# factory: "0x..."           or a template to deploy a new factory from:
+# template:
+#   vault: "0x..."
+#   balancer_vault: "0xBA12222222228d8Ba445958a75a0704d566BF2C8"
+#   pool: "0x..."
+#   gauge_factory: "0x..."
+#   minter: "0x..."
+#   params: {max_slippage_in: 5, max_slippage_out: 5, max_single_deposit: 1000000, min_deposit_period: 7200}
+# defaults: {strategist: "0x...", rewards: "0x...", keeper: "0x..."}
+# clones:
+#   - vault: "0x..."
+#     pool: "0x..."
+#     reward_routes: [...]                            as in clone_many
+#     params: {...}                                   as in template, max_single_deposit in whole want tokens
+#     eth_to_want_route: {pool_ids: [...], assets: ["<weth>", ..., "<want>"]}
+#
+# Clone params and eth_to_want routes are set by the account, which has to be the vault's governance or management.
+PASSWORD_ENV = "DEPLOY_PASSWORD"
+DEFAULT_FORK = "mainnet-fork"
+PARAM_KEYS = ("max_slippage_in", "max_slippage_out", "max_single_deposit", "min_deposit_period")
 
-API_VERSION = config["dependencies"][0].split("@")[-1]
-Vault = project.load(
-    Path.home() / ".brownie" / "packages" / config["dependencies"][0]
-).Vault
+VAULT_ABI = [
+    {"name": name, "inputs": [], "outputs": [{"name": "", "type": kind}], "stateMutability": "view",
+     "type": "function"}
+    for name, kind in (("token", "address"), ("apiVersion", "string"))
+]
 
 
-def get_address(msg: str, default: str = None) -> str:
-    val = click.prompt(msg, default=default)
+def deploy_factory(template, account):
+    params = template["params"]
+    return StrategyFactory.deploy(template["vault"], template["balancer_vault"], template["pool"],
+                                  template["gauge_factory"], template["minter"],
+                                  *(params[key] for key in PARAM_KEYS), {"from": account})
 
-    # Keep asking user for click.prompt until it passes
-    while True:
 
-        if is_checksum_address(val):
-            return val
-        elif addr := web3.ens.address(val):
-            click.echo(f"Found ENS '{val}' [{addr}]")
-            return addr
+def raw_params(params, decimals):
+    """
+    setParams arguments for `params` from a config, max_single_deposit scaled to want's `decimals`.
+    """
+    return (params["max_slippage_in"], params["max_slippage_out"], int(params["max_single_deposit"] * 10 ** decimals),
+            params["min_deposit_period"])
 
-        click.echo(
-            f"I'm sorry, but '{val}' is not a checksummed address or valid ENS record"
-        )
-        # NOTE: Only display default once
-        val = click.prompt(msg)
 
+def configure(strategy, entry, account, resolver=None):
+    """
+    Sets the params and ethToWant route `entry` asks for on `strategy`, skipping what's already set.
+    """
+    decimals = (resolver or default_resolver()).resolve(strategy.want()).decimals
+    if "params" in entry:
+        wanted = raw_params(entry["params"], decimals)
+        current = (strategy.maxSlippageIn(), strategy.maxSlippageOut(), strategy.maxSingleDeposit(),
+                   strategy.minDepositPeriod())
+        if tuple(current) != wanted:
+            strategy.setParams(*wanted, {"from": account})
+    if "eth_to_want_route" in entry:
+        route = entry["eth_to_want_route"]
+        strategy.setEthToWantSteps((route["pool_ids"], route["assets"]), {"from": account})
 
-def main():
-    print(f"You are using the '{network.show_active()}' network")
-    dev = accounts.load(click.prompt("Account", type=click.Choice(accounts.load())))
-    print(f"You are using: 'dev' [{dev.address}]")
 
-    if input("Is there a Vault for this strategy already? y/[N]: ").lower() == "y":
-        vault = Vault.at(get_address("Deployed Vault: "))
-        assert vault.apiVersion() == API_VERSION
-    else:
-        print("You should deploy one vault using scripts from Vault project")
-        return  # TODO: Deploy one using scripts from Vault project
+def verify(strategies, entries, resolver=None):
+    """
+    Returns {strategy: [problem, ...]} for every strategy whose state doesn't match its clone entry, defaults filled
+    in as clone_many.clone_entries does, read in one aggregate call.
+    """
+    resolver = resolver or default_resolver()
+    with multicall:
+        rows = [(s.vault(), s.want(), s.apiVersion(), s.strategist(), s.rewards(), s.keeper(), s.bpt(),
+                 [s.rewardTokens(i) for i in range(len(entry.get("reward_routes") or []))], s.numRewards(),
+                 (s.maxSlippageIn(), s.maxSlippageOut(), s.maxSingleDeposit(), s.minDepositPeriod()))
+                for s, entry in zip(strategies, entries)]
+        vaults = [Contract.from_abi("Vault", entry["vault"], VAULT_ABI, persist=False) for entry in entries]
+        vault_rows = [(v.token(), v.apiVersion()) for v in vaults]
+
+    problems = {}
+    for strategy, entry, row, vault_row in zip(strategies, entries, rows, vault_rows):
+        vault, want, api_version, strategist, rewards, keeper, pool, reward_tokens, num_rewards, params = row
+        vault, want, api_version, strategist, rewards, keeper, pool, num_rewards = (
+            unwrap(value) for value in (vault, want, api_version, strategist, rewards, keeper, pool, num_rewards))
+        reward_tokens = [unwrap(t) for t in reward_tokens]
+        params = tuple(unwrap(p) for p in params)
+        token, vault_api_version = (unwrap(value) for value in vault_row)
+        found = []
+        expected = {"vault": entry["vault"], "strategist": entry["strategist"], "rewards": entry["rewards"],
+                    "keeper": entry["keeper"], "pool": entry["pool"], "want": token, "apiVersion": vault_api_version}
+        actual = {"vault": vault, "strategist": strategist, "rewards": rewards, "keeper": keeper, "pool": pool,
+                  "want": want, "apiVersion": api_version}
+        found += [f'{key} is {actual[key]}, expected {value}' for key, value in expected.items()
+                  if str(actual[key]).lower() != str(value).lower()]
+        routes = entry.get("reward_routes") or []
+        if num_rewards != len(routes) or [str(t).lower() for t in reward_tokens] != [
+                str(r["token"]).lower() for r in routes]:
+            found.append(f'rewards are {reward_tokens}, expected {[r["token"] for r in routes]}')
+        if "params" in entry:
+            wanted = raw_params(entry["params"], resolver.resolve(want).decimals)
+            if params != wanted:
+                found.append(f'params are {params}, expected {wanted}')
+        if found:
+            problems[strategy.address] = found
+    return problems
 
-    print(
-        f"""
-    Strategy Parameters
 
-       api: {API_VERSION}
-     token: {vault.token()}
-      name: '{vault.name()}'
-    symbol: '{vault.symbol()}'
+def run(config, account):
     """
-    )
-    publish_source = click.confirm("Verify source on etherscan?")
-    if input("Deploy Strategy? y/[N]: ").lower() != "y":
-        return
+    Deploys the factory if `config` has none, clones everything it lists, configures the clones and verifies them.
+    Returns the clones and what verification found.
+    """
+    factory = StrategyFactory.at(config["factory"]) if "factory" in config else deploy_factory(config["template"],
+                                                                                               account)
+    manifest = {**config, "factory": factory.address}
+    strategies = [Strategy.at(c) for c in clone_many.clone_many(manifest, account)]
+    entries = clone_many.clone_entries(manifest)
+    for strategy, entry in zip(strategies, entries):
+        configure(strategy, entry, account)
+    return strategies, verify(strategies, entries)
+
+
+def simulate(config, address):
+    """
+    Runs `config` on a fork as `address`, impersonated, and reports what verification found.
+    """
+    if not network.show_active().endswith("-fork"):
+        network.disconnect()
+        network.connect(config.get("fork", DEFAULT_FORK))
+    account = accounts.at(address, force=True)
+    print(f"Dry run on the '{network.show_active()}' network, as {address}")
+    strategies, problems = run(config, account)
+    report(config, strategies, problems)
+    return strategies, problems
+
+
+def report(config, strategies, problems):
+    for strategy, entry in zip(strategies, config["clones"]):
+        status = "ok" if strategy.address not in problems else "; ".join(problems[strategy.address])
+        print(f'{entry["vault"]}: {strategy.address} {status}')
+    if problems:
+        raise SystemExit(f"{len(problems)} of {len(strategies)} strategies don't match the config")
+
+
+# brownie run deploy main <config.yml> [send]
+# Without `send` everything runs on a fork, impersonating `deployer`. With it, the same run is first simulated on a fork
+# as `account`, and only sent on the connected network once that passes.
+def main(config, send=False):
+    config = clone_many.load_manifest(config)
+    if not flag(send):
+        return simulate(config, config["deployer"])[0]
+
+    live = network.show_active()
+    if live.endswith("-fork"):
+        raise SystemExit(f"'{live}' is a fork, connect to the network to send on")
+    address = accounts.load(config["account"], password=os.environ.get(PASSWORD_ENV)).address
+    simulate(config, address)
 
-    strategy = Strategy.deploy(vault, {"from": dev}, publish_source=publish_source)
+    network.disconnect()
+    network.connect(live)
+    # loaded again, switching networks drops loaded accounts
+    account = accounts.load(config["account"], password=os.environ.get(PASSWORD_ENV))
+    print(f"Dry run passed, sending on the '{live}' network from {account.address}")
+    strategies, problems = run(config, account)
+    report(config, strategies, problems)
+    return strategies
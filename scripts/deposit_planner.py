@@ -0,0 +1,148 @@
+import math
+from collections import namedtuple
+import numpy as np
+from brownie import Contract, accounts, web3
+import click
+from scripts.cli import flag
+from scripts.metadata import default_resolver
+from scripts.stable_math import BASIS_ONE, StablePool, bpt_out_given_exact_tokens_in, invariant, tokens_to_bpts
+
+YEAR = 365 * 24 * 60 * 60
+# roughly what a tend costs, see tests/gas_baseline.json
+DEFAULT_TEND_GAS = 400_000
+# how long arbitrage takes to win back most of the imbalance a join leaves in the pool
+DEFAULT_RECOVERY_TIME = 30 * 60
+DEFAULT_MAX_CHUNKS = 200
+DEFAULT_PERIODS = np.geomspace(10 * 60, 2 * 24 * 60 * 60, 25)
+
+# maxSingleDeposit and minDepositPeriod to set, and what the schedule is expected to cost in want
+Plan = namedtuple("Plan", ["max_single_deposit", "min_deposit_period", "chunks", "duration", "slippage", "gas", "idle",
+                           "cost"])
+
+
+def candidates(backlog, max_chunks=DEFAULT_MAX_CHUNKS, periods=DEFAULT_PERIODS):
+    """
+    Every (chunk, period) pair splitting `backlog` into 1 to `max_chunks` equal joins, `periods` seconds apart.
+    """
+    counts, periods = np.meshgrid(np.arange(1, max_chunks + 1), np.asarray(periods, dtype=np.float64))
+    return np.ceil(backlog / counts.ravel()), periods.ravel()
+
+
+def simulate(stable_pool, index, backlog, chunks, periods, rate, want_decimals, max_slippage_in, gas_cost,
+             recovery_time=DEFAULT_RECOVERY_TIME, idle_apr=0, max_steps=DEFAULT_MAX_CHUNKS):
+    """
+    Joins `backlog` want in chunks of `chunks[i]` every `periods[i]` seconds, for all i at once, the way tends
+    would with maxSingleDeposit = chunks[i] and minDepositPeriod = periods[i]. Between joins arbitrage pulls the
+    pool back towards its current composition, recovering exp(-period / recovery_time) of the imbalance left.
+
+    Returns a dict of arrays: "chunks" joins made, "slippage" want lost to them, "gas" spent at `gas_cost` want a
+    tend, "idle" yield forgone at `idle_apr` while want waited, their sum "cost", and "ok", False for schedules a
+    join's BAL#208 guard would stop or that don't finish in `max_steps`.
+    """
+    chunks = np.asarray(chunks, dtype=np.float64)
+    periods = np.asarray(periods, dtype=np.float64)
+    k, n = chunks.size, len(stable_pool.tokens)
+    scale = stable_pool.scales[index]
+    initial = stable_pool.balances
+    initial_invariant = invariant(stable_pool.amp, initial)
+    recovery = 1 - np.exp(-periods / recovery_time)
+
+    balances = np.tile(initial, (k, 1))
+    supply = np.full(k, float(stable_pool.bpt_supply))
+    remaining = np.full(k, float(backlog))
+    steps, slippage, waited = np.zeros(k), np.zeros(k), np.zeros(k)
+    ok = np.ones(k, dtype=bool)
+    for _ in range(max_steps):
+        active = ok & (remaining > 0)
+        if not active.any():
+            break
+        chunk = np.where(active, np.minimum(chunks, remaining), 0)
+        amounts = np.zeros((k, n))
+        amounts[:, index] = chunk * scale
+        bpt_out = bpt_out_given_exact_tokens_in(stable_pool.amp, balances, amounts, supply, stable_pool.swap_fee)
+
+        minimum = tokens_to_bpts(chunk, rate, want_decimals) * (BASIS_ONE - max_slippage_in) / BASIS_ONE
+        ok &= ~active | (bpt_out >= minimum)
+        slippage += np.where(active, chunk - bpt_out * rate / 1e18 / scale, 0)
+        remaining -= chunk
+        waited += remaining * periods
+        steps += active
+
+        balances = balances + amounts
+        supply = supply + bpt_out
+        target = initial * (invariant(stable_pool.amp, balances) / initial_invariant)[:, None]
+        balances = balances - (balances - target) * recovery[:, None]
+
+    ok &= remaining <= 0
+    gas = steps * gas_cost
+    idle = waited * idle_apr / YEAR
+    return {
+        "chunks": steps,
+        "duration": np.maximum(steps - 1, 0) * periods,
+        "slippage": slippage,
+        "gas": gas,
+        "idle": idle,
+        "cost": np.where(ok, slippage + gas + idle, np.inf),
+        "ok": ok,
+    }
+
+
+def best(chunks, periods, results):
+    """
+    The cheapest feasible schedule of a simulate run, or None if none is.
+    """
+    i = int(np.argmin(results["cost"]))
+    if not results["ok"][i]:
+        return None
+    return Plan(int(chunks[i]), int(math.ceil(periods[i])), int(results["chunks"][i]), float(results["duration"][i]),
+                float(results["slippage"][i]), float(results["gas"][i]), float(results["idle"][i]),
+                float(results["cost"][i]))
+
+
+def plan(strategy, pool, balancer_vault, gas_cost, backlog=None, idle_apr=0, recovery_time=DEFAULT_RECOVERY_TIME,
+         max_chunks=DEFAULT_MAX_CHUNKS, periods=DEFAULT_PERIODS):
+    """
+    Plans how `strategy` should join `backlog` want, by default its loose want plus what the vault would lend it.
+    `gas_cost` is what a tend costs in want.
+    """
+    want = strategy.want()
+    decimals = default_resolver().resolve(want).decimals
+    if backlog is None:
+        backlog = strategy.balanceOfWant() + Contract(strategy.vault()).creditAvailable(strategy)
+    if backlog == 0:
+        return None
+    chunks, periods = candidates(backlog, max_chunks, periods)
+    results = simulate(StablePool.from_chain(pool, balancer_vault), strategy.tokenIndex(), backlog, chunks, periods,
+                       pool.getRate(), decimals, strategy.maxSlippageIn(), gas_cost, recovery_time, idle_apr,
+                       max_chunks)
+    return best(chunks, periods, results)
+
+
+def apply(strategy, recommended, account):
+    return strategy.setParams(strategy.maxSlippageIn(), strategy.maxSlippageOut(), recommended.max_single_deposit,
+                              recommended.min_deposit_period, {"from": account})
+
+
+# brownie run deposit_planner main <strategy> <want per eth> [idle_apr] [apply]
+def main(strategy, eth_price, idle_apr=0, apply_params=False):
+    strategy = Contract(strategy)
+    pool = Contract(strategy.bpt())
+    balancer_vault = Contract(strategy.balancerVault())
+    decimals = default_resolver().resolve(strategy.want()).decimals
+    gas_cost = DEFAULT_TEND_GAS * web3.eth.gas_price / 1e18 * float(eth_price) * 10 ** decimals
+
+    recommended = plan(strategy, pool, balancer_vault, gas_cost, idle_apr=float(idle_apr))
+    if recommended is None:
+        print("nothing to deposit, or no schedule clears the slippage guard")
+        return None
+    print(f'maxSingleDeposit {recommended.max_single_deposit / 10 ** decimals} (now '
+          f'{strategy.maxSingleDeposit() / 10 ** decimals}), minDepositPeriod {recommended.min_deposit_period}s '
+          f'(now {strategy.minDepositPeriod()}s)')
+    print(f'{recommended.chunks} joins over {recommended.duration / 3600:.1f}h costing '
+          f'{recommended.slippage / 10 ** decimals} slippage + {recommended.gas / 10 ** decimals} gas + '
+          f'{recommended.idle / 10 ** decimals} idle')
+
+    if flag(apply_params):
+        account = accounts.load(click.prompt("Account", type=click.Choice(accounts.load())))
+        apply(strategy, recommended, account)
+    return recommended
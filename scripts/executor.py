@@ -0,0 +1,110 @@
+import time
+from brownie import web3
+from brownie.network.transaction import Status
+
+
+class Submission:
+    """
+    A transaction handed to a `PipelinedExecutor`. `tx` always points at the latest broadcast, which
+    changes when the transaction gets replaced or resent.
+    """
+
+    def __init__(self, fn, args, tx_params):
+        self.fn = fn
+        self.args = args
+        self.tx_params = tx_params
+        self.tx = None
+        self.sent_at = None
+        self.attempts = 0
+
+    @property
+    def nonce(self):
+        return self.tx_params["nonce"]
+
+    @property
+    def status(self):
+        return Status.Pending if self.tx is None else self.tx.status
+
+
+class PipelinedExecutor:
+    """
+    Sends transactions from one account without waiting on each receipt. Nonces are assigned up front,
+    at most `max_in_flight` transactions are left unconfirmed at a time, and a transaction still pending
+    after `stuck_after` seconds is replaced with a gas price bumped by `gas_bump`, up to `max_replacements`
+    times. Transactions dropped by the node are resent with the same nonce.
+    """
+
+    def __init__(self, account, max_in_flight=8, stuck_after=120, gas_bump=1.125, max_replacements=3,
+                 poll_interval=1):
+        self.account = account
+        self.max_in_flight = max_in_flight
+        self.stuck_after = stuck_after
+        self.gas_bump = gas_bump
+        self.max_replacements = max_replacements
+        self.poll_interval = poll_interval
+        self.nonce = web3.eth.get_transaction_count(account.address, "pending")
+        self.in_flight = []
+        self.submissions = []
+
+    def submit(self, fn, *args, tx_params=None):
+        """
+        Broadcasts `fn(*args)` with the next nonce and returns its `Submission` right away.
+        """
+        while len(self.in_flight) >= self.max_in_flight:
+            self.poll()
+            if len(self.in_flight) >= self.max_in_flight:
+                time.sleep(self.poll_interval)
+
+        params = dict(tx_params or {})
+        params.update({"from": self.account, "nonce": self.nonce, "required_confs": 0})
+        submission = Submission(fn, args, params)
+        self.nonce += 1
+        self._send(submission)
+        self.in_flight.append(submission)
+        self.submissions.append(submission)
+        return submission
+
+    def _send(self, submission):
+        submission.attempts += 1
+        submission.tx = submission.fn(*submission.args, submission.tx_params)
+        submission.sent_at = time.time()
+
+    def poll(self):
+        """
+        Drops confirmed transactions from the in-flight set, and replaces or resends the stuck ones.
+        """
+        still_in_flight = []
+        for submission in self.in_flight:
+            status = submission.status
+            if status in (Status.Confirmed, Status.Reverted):
+                continue
+            if status == Status.Dropped:
+                if submission.attempts > self.max_replacements:
+                    continue
+                self._send(submission)
+            elif (status == Status.Pending and submission.attempts <= self.max_replacements
+                  and time.time() - submission.sent_at > self.stuck_after):
+                try:
+                    submission.tx = submission.tx.replace(increment=self.gas_bump)
+                    submission.attempts += 1
+                    submission.sent_at = time.time()
+                except ValueError:
+                    # confirmed in the meantime
+                    pass
+            still_in_flight.append(submission)
+        self.in_flight = still_in_flight
+
+    def wait(self, timeout=None):
+        """
+        Blocks until every submitted transaction confirmed, reverted or ran out of retries, and returns
+        the submissions in the order they were made.
+        """
+        start = time.time()
+        while self.in_flight:
+            self.poll()
+            if not self.in_flight:
+                break
+            if timeout is not None and time.time() - start > timeout:
+                raise TimeoutError(f"{len(self.in_flight)} transactions still pending")
+            time.sleep(self.poll_interval)
+        return self.submissions
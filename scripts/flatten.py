@@ -1,10 +1,125 @@
-from brownie import Strategy, StrategyFactory, accounts, config, network, project, web3
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from brownie import Strategy, StrategyFactory, config, web3
+from eth_abi import decode_abi
+from scripts.cli import flag
+from scripts.indexer import EventIndexer
 
+BUILD_PATH = Path("build") / "contracts"
+BUNDLE_PATH = Path("build") / "verification"
+CACHE_PATH = Path(".cache") / "flatten.json"
+# bump when what's written changes, so cached artifacts from before get rebuilt
+CACHE_VERSION = 1
+STRATEGY_CONSTRUCTOR = ["address", "address", "address", "address", "address", "uint256", "uint256", "uint256",
+                        "uint256"]
 
-def main():
-    with open('./build/contracts/StrategyFlat.sol', 'w') as f:
-        Strategy.get_verification_info()
-        f.write(Strategy._flattener.flattened_source)
-    with open('./build/contracts/StrategyFactoryFlat.sol', 'w') as f:
-        StrategyFactory.get_verification_info()
-        f.write(StrategyFactory._flattener.flattened_source)
+
+def source_key(container):
+    """
+    Hash of everything a contract's flattened source and standard json depend on: every source file it's built
+    from, its compiler settings and the remappings.
+    """
+    build = container._build
+    digest = hashlib.sha256(f"{CACHE_VERSION}".encode())
+    digest.update(json.dumps(build["compiler"], sort_keys=True).encode())
+    digest.update(json.dumps(config["compiler"]["solc"].get("remappings"), sort_keys=True).encode())
+    for path in sorted(build["allSourcePaths"].values()):
+        digest.update(path.encode())
+        digest.update(_source(path).read_bytes())
+    return digest.hexdigest()
+
+
+def _source(path):
+    # project sources are relative to the project root, dependencies to brownie's packages folder
+    for candidate in (Path(path), Path.home() / ".brownie" / "packages" / path):
+        if candidate.exists():
+            return candidate
+    raise FileNotFoundError(path)
+
+
+def _load_cache(path):
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def build_bundle(container):
+    """
+    Flattened source and standard json verification bundle for `container`.
+    """
+    info = container.get_verification_info()
+    bundle = {key: value for key, value in info.items() if key != "bytecode_len"}
+    return container._flattener.flattened_source, bundle
+
+
+def clone_implementation(factory, start_block, indexer=None):
+    """
+    Verification bundle details for the Strategy a factory deployed as its clones' implementation: where it is, and
+    the constructor arguments it was deployed with. The factory hands its own constructor arguments straight to the
+    Strategy's, so they're read off the end of the factory's deployment transaction, found from its Deployed event.
+    `start_block` is the factory's deployment block, anything earlier is scanned for nothing.
+    """
+    indexer = indexer or EventIndexer()
+    indexer.sync_factory(factory, start_block)
+    deployed = indexer.events(address=factory.address, event="Deployed")
+    if not deployed:
+        raise ValueError(f"no Deployed event of {factory.address} since block {start_block}")
+    tx = web3.eth.get_transaction(deployed[0]["tx"])
+    if tx["to"] is not None:
+        raise ValueError(f"{factory.address} was deployed by a contract, its arguments aren't in the transaction input")
+    arguments = bytes.fromhex(tx["input"][2:])[-32 * len(STRATEGY_CONSTRUCTOR):]
+    original = deployed[0]["args"]["original"]
+    if decode_abi(STRATEGY_CONSTRUCTOR, arguments)[0].lower() != Strategy.at(original).vault().lower():
+        raise ValueError(f"{deployed[0]['tx']} doesn't end in {original}'s constructor arguments")
+    return {"address": original, "constructor_arguments": arguments.hex()}
+
+
+def flatten(containers, build_path=BUILD_PATH, bundle_path=BUNDLE_PATH, cache_path=CACHE_PATH, force=False,
+            workers=1):
+    """
+    Writes <name>Flat.sol and a <name>.json standard json bundle for every contract of `containers` whose sources
+    changed since the last run, all of them when `force`. Returns the names rebuilt.
+
+    Bundles are built one at a time unless `workers` is more than 1, then on up to that many threads. brownie's
+    compiler wrapper isn't known to be thread safe, so that's opt in, worth it once there are several stale contracts.
+    """
+    build_path, bundle_path, cache_path = Path(build_path), Path(bundle_path), Path(cache_path)
+    cache = _load_cache(cache_path)
+    keys = {c._name: source_key(c) for c in containers}
+    stale = [c for c in containers if force or cache.get(c._name) != keys[c._name]
+             or not (build_path / f"{c._name}Flat.sol").exists() or not (bundle_path / f"{c._name}.json").exists()]
+
+    if workers > 1 and len(stale) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(stale))) as executor:
+            built = list(executor.map(build_bundle, stale))
+    else:
+        built = [build_bundle(c) for c in stale]
+
+    build_path.mkdir(parents=True, exist_ok=True)
+    bundle_path.mkdir(parents=True, exist_ok=True)
+    for container, (flattened, bundle) in zip(stale, built):
+        (build_path / f"{container._name}Flat.sol").write_text(flattened)
+        (bundle_path / f"{container._name}.json").write_text(json.dumps(bundle, indent=2))
+        cache[container._name] = keys[container._name]
+    if stale:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps(cache, indent=2, sort_keys=True))
+    return [c._name for c in stale]
+
+
+# brownie run flatten main [factory] [force] [factory's deployment block, needed with a factory] [workers]
+def main(factory=None, force=False, start_block=None, workers=1):
+    if factory is not None and start_block is None:
+        raise SystemExit("give the factory's deployment block to find its Deployed event from")
+    started = time.perf_counter()
+    rebuilt = flatten([Strategy, StrategyFactory], force=flag(force), workers=int(workers))
+    elapsed = time.perf_counter() - started
+    print(f'rebuilt {", ".join(rebuilt)} in {elapsed:.1f}s on {workers} worker(s)' if rebuilt else "nothing changed")
+    if factory is not None:
+        # clones are EIP-1167 proxies, verified by pointing the explorer at this implementation
+        details = clone_implementation(StrategyFactory.at(factory), int(start_block))
+        bundle = json.loads((BUNDLE_PATH / "Strategy.json").read_text())
+        (BUNDLE_PATH / "StrategyClone.json").write_text(json.dumps({**bundle, **details}, indent=2))
+        print(f'clone implementation {details["address"]}')
+    return rebuilt
@@ -0,0 +1,120 @@
+import json
+from brownie import Strategy, StrategyFactory, interface, multicall, web3
+from scripts.indexer import EventIndexer
+from scripts.metadata import default_resolver, unwrap
+from scripts.state_report import snapshots
+
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+# no SSB factory predates the balancer gauges
+DEFAULT_START_BLOCK = 14_000_000
+
+
+def discover(factories, to_block, start_block=DEFAULT_START_BLOCK, indexer=None):
+    """
+    Returns every strategy deployed or cloned by `factories`, from their Deployed and Cloned events.
+    """
+    indexer = indexer or EventIndexer()
+    strategies = []
+    for address in factories:
+        factory = StrategyFactory.at(address)
+        indexer.sync_factory(factory, start_block, to_block)
+        strategies += indexer.strategies(factory.address)
+    return strategies
+
+
+def realized_apr(reports):
+    """
+    Annualized (gain - loss) over the average debt between the first and the last of `reports`.
+    """
+    if len(reports) < 2:
+        return None
+    elapsed = reports[-1]["timestamp"] - reports[0]["timestamp"]
+    pnl = sum(r["args"]["gain"] - r["args"]["loss"] for r in reports[1:])
+    debt = sum(r["args"]["totalDebt"] for r in reports[:-1]) / (len(reports) - 1)
+    if elapsed == 0 or debt == 0:
+        return None
+    return pnl / debt * SECONDS_PER_YEAR / elapsed
+
+
+def fleet(strategies, to_block, start_block=DEFAULT_START_BLOCK, indexer=None):
+    """
+    Returns one report row per strategy: its state, pending rewards, tend backlog and realized APR.
+    """
+    state = snapshots(strategies)
+    strategies = [s for s in strategies if state[s] is not None]
+    contracts = [Strategy.at(s) for s in strategies]
+    with multicall:
+        params = [(s.vault(), s.gauge(), s.minter(), s.maxSingleDeposit(), s.tendTrigger(0)) for s in contracts]
+    params = [tuple(unwrap(p) for p in row) for row in params]
+
+    pending = pending_rewards(strategies, [gauge for _, gauge, _, _, _ in params],
+                              [minter for _, _, minter, _, _ in params], state)
+
+    indexer = indexer or EventIndexer()
+    resolver = default_resolver()
+    metadata = resolver.resolve_many({t for s in strategies for t in [state[s]["want"], *state[s]["rewards"]]})
+    rows = []
+    for strategy, (vault, gauge, minter, max_single_deposit, tend_trigger), rewards in zip(strategies, params, pending):
+        snapshot = state[strategy]
+        indexer.sync_reports(resolver.contract(vault), strategy, start_block, to_block)
+        reports = indexer.reports(strategy, to_block=to_block)
+        want = metadata[snapshot["want"]]
+        backlog = snapshot["balanceOfWant"]
+        rows.append({
+            "strategy": strategy,
+            "want": want.symbol,
+            "estimatedTotalAssets": snapshot["estimatedTotalAssets"] / 10 ** want.decimals,
+            "totalDebt": reports[-1]["args"]["totalDebt"] / 10 ** want.decimals if reports else None,
+            "apr": realized_apr(reports),
+            "harvests": len(reports),
+            "pendingRewards": {metadata[t].symbol: r / 10 ** metadata[t].decimals for t, r in rewards.items()},
+            "backlog": backlog / 10 ** want.decimals,
+            "tendsNeeded": -(-backlog // max_single_deposit) if max_single_deposit else None,
+            "tendTrigger": bool(tend_trigger),
+        })
+    return rows
+
+
+def pending_rewards(strategies, gauges, minters, state):
+    """
+    Returns [{reward token: amount claimable}] for every strategy, given their gauges, minters and snapshots:
+    BAL the minter would mint after a gauge checkpoint, everything else from the gauge.
+    """
+    with multicall:
+        bal_tokens = {minter: interface.IBalancerMinter(minter).getBalancerToken() for minter in set(minters)}
+    bal_tokens = {minter: unwrap(token) for minter, token in bal_tokens.items()}
+
+    with multicall:
+        pending = []
+        for strategy, gauge, minter in zip(strategies, gauges, minters):
+            gauge_contract = interface.IStakingLiquidityGauge(gauge)
+            rewards = {}
+            for token in state[strategy]["rewards"]:
+                if token == bal_tokens[minter]:
+                    # integrate_fraction lags until the strategy's next checkpoint, claimable_tokens checkpoints first
+                    rewards[token] = gauge_contract.claimable_tokens(strategy)
+                else:
+                    rewards[token] = gauge_contract.claimable_rewards(strategy, token)
+            pending.append(rewards)
+    return [{token: unwrap(reward) for token, reward in rewards.items()} for rewards in pending]
+
+
+def print_table(rows):
+    print(f'{"strategy":<44}{"want":<8}{"assets":>16}{"apr":>9}{"backlog":>16}{"tends":>7}  pending rewards')
+    for row in rows:
+        apr = "-" if row["apr"] is None else f'{row["apr"]:.2%}'
+        pending = ", ".join(f'{amount:.2f} {symbol}' for symbol, amount in row["pendingRewards"].items())
+        print(f'{row["strategy"]:<44}{row["want"]:<8}{row["estimatedTotalAssets"]:>16.2f}{apr:>9}'
+              f'{row["backlog"]:>16.2f}{str(row["tendsNeeded"]):>7}  {pending}')
+
+
+# brownie run fleet_report main <factory,factory,...> [table|json]
+def main(factories, output="table"):
+    to_block = web3.eth.block_number
+    indexer = EventIndexer()
+    rows = fleet(discover(factories.split(","), to_block, indexer=indexer), to_block, indexer=indexer)
+    if output == "json":
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows)
+    return rows
@@ -0,0 +1,75 @@
+import json
+from brownie import chain
+
+DEFAULT_TOLERANCE = 0.05
+
+
+def profile_trace(trace):
+    """
+    Returns {function: {"count": calls, "gas": gas}} for every function, internal ones included, executed in
+    `trace`. Gas is inclusive: what a call cost from entry to return, callees included.
+    """
+    calls = {}
+    frames = []
+
+    def close(frame, gas_left):
+        fn, _, _, gas_at_entry = frame
+        entry = calls.setdefault(fn, {"count": 0, "gas": 0})
+        entry["count"] += 1
+        entry["gas"] += gas_at_entry - gas_left
+
+    for step in trace:
+        level = (step["depth"], step["jumpDepth"])
+        # returned from internal or external calls
+        while frames and frames[-1][1:3] > level:
+            close(frames.pop(), step["gas"])
+        # moved on to a sibling call at the same level
+        if frames and frames[-1][1:3] == level and frames[-1][0] != step["fn"]:
+            close(frames.pop(), step["gas"])
+        if not frames or frames[-1][1:3] != level:
+            frames.append((step["fn"], step["depth"], step["jumpDepth"], step["gas"]))
+
+    if trace:
+        gas_left = trace[-1]["gas"] - trace[-1]["gasCost"]
+        while frames:
+            close(frames.pop(), gas_left)
+    return calls
+
+
+def profile(tx):
+    """
+    Gas profile of a brownie TransactionReceipt: its total gas used plus the per-function breakdown of its trace.
+    """
+    return {"total": tx.gas_used, "calls": profile_trace(tx.trace)}
+
+
+def regressions(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Describes every way `current` costs more than `baseline` by over `tolerance`: the total first, then each
+    function whose gas grew.
+    """
+    found = []
+    if current["total"] > baseline["total"] * (1 + tolerance):
+        found.append(f'total: {baseline["total"]} -> {current["total"]}')
+    for fn, call in current["calls"].items():
+        before = baseline["calls"].get(fn)
+        if before is not None and call["gas"] > before["gas"] * (1 + tolerance):
+            found.append(f'{fn}: {before["gas"]} -> {call["gas"]} ({before["count"]} -> {call["count"]} calls)')
+    return found
+
+
+def print_profile(gas_profile, limit=30):
+    print(f'total gas used: {gas_profile["total"]}')
+    calls = sorted(gas_profile["calls"].items(), key=lambda item: item[1]["gas"], reverse=True)
+    for fn, call in calls[:limit]:
+        print(f'{call["gas"]:>10} {call["count"]:>5}  {fn}')
+
+
+# brownie run gas_profile main <txid> [json]
+def main(txid, output="table"):
+    gas_profile = profile(chain.get_transaction(txid))
+    if output == "json":
+        print(json.dumps(gas_profile, indent=2))
+    else:
+        print_profile(gas_profile)
+    return gas_profile
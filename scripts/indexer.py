@@ -0,0 +1,121 @@
+import json
+import sqlite3
+from pathlib import Path
+from brownie import web3
+from scripts.logs import DEFAULT_BLOCK_RANGE, iter_event_windows
+
+DEFAULT_PATH = Path(".cache") / "events.sqlite"
+# blocks behind to_block that a later sync fetches again, in case a reorg replaced or dropped their logs
+DEFAULT_CONFIRMATIONS = 12
+# bump when SCHEMA changes, stores from before are dropped and synced again
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS streams (
+    stream TEXT PRIMARY KEY,
+    next_block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    stream TEXT NOT NULL,
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    address TEXT NOT NULL,
+    event TEXT NOT NULL,
+    subject TEXT,
+    timestamp INTEGER,
+    args TEXT NOT NULL,
+    UNIQUE (block, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_by_subject ON events (event, subject, block);
+CREATE INDEX IF NOT EXISTS events_by_stream ON events (stream, block);
+"""
+
+# the argument naming the strategy each indexed event is about
+SUBJECTS = {"Deployed": "original", "Cloned": "clone", "StrategyReported": "strategy"}
+
+
+class EventIndexer:
+    """
+    Incrementally indexes contract events into a local SQLite store. Each stream (one event of one contract,
+    optionally filtered) remembers the next block to fetch, and is committed window by window, so an
+    interrupted sync resumes where it stopped. The last `confirmations` blocks of a sync are fetched again by the
+    next one, which replaces whatever the stream had stored for them.
+    """
+
+    def __init__(self, path=None, confirmations=DEFAULT_CONFIRMATIONS):
+        self.confirmations = confirmations
+        self.path = Path(path or DEFAULT_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.db.executescript(f"DROP TABLE IF EXISTS events; DROP TABLE IF EXISTS streams; "
+                                  f"PRAGMA user_version = {SCHEMA_VERSION};")
+        self.db.executescript(SCHEMA)
+
+    def next_block(self, stream, start_block=0):
+        row = self.db.execute("SELECT next_block FROM streams WHERE stream = ?", (stream,)).fetchone()
+        return start_block if row is None else row[0]
+
+    def sync(self, stream, event, start_block=0, to_block=None, argument_filters=None, with_timestamps=False,
+             block_range=DEFAULT_BLOCK_RANGE):
+        """
+        Indexes `event` logs from where `stream` stopped (or `start_block`) up to `to_block` (latest by default).
+        """
+        to_block = web3.eth.block_number if to_block is None else to_block
+        from_block = self.next_block(stream, start_block)
+        confirmed = to_block - self.confirmations
+        timestamps = {}
+        windows = iter_event_windows(event, from_block, to_block, block_range, argument_filters)
+        for start, end, logs in windows:
+            rows = []
+            for log in logs:
+                if with_timestamps and log["block"] not in timestamps:
+                    timestamps[log["block"]] = web3.eth.get_block(log["block"])["timestamp"]
+                subject = log["args"].get(SUBJECTS.get(log["event"]))
+                rows.append((stream, log["block"], log["log_index"], log["tx"], log["address"], log["event"], subject,
+                             timestamps.get(log["block"]), json.dumps(log["args"])))
+            # the window's logs replace the stream's, so a log a reorg dropped or moved doesn't linger, and a log is
+            # stored once however many streams fetch it
+            with self.db:
+                self.db.execute("DELETE FROM events WHERE stream = ? AND block BETWEEN ? AND ?", (stream, start, end))
+                self.db.executemany("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self.db.execute("INSERT OR REPLACE INTO streams VALUES (?, ?)",
+                                (stream, max(min(end, confirmed) + 1, from_block)))
+
+    def sync_factory(self, factory, start_block=0, to_block=None):
+        for name in ("Deployed", "Cloned"):
+            self.sync(f"{factory.address}:{name}", getattr(factory.events, name), start_block, to_block)
+
+    def sync_reports(self, vault, strategy, start_block=0, to_block=None):
+        self.sync(f"{vault.address}:StrategyReported:{strategy}", vault.events.StrategyReported, start_block, to_block,
+                  argument_filters={"strategy": strategy}, with_timestamps=True)
+
+    # queries
+
+    def events(self, event=None, subject=None, address=None, from_block=0, to_block=None):
+        """
+        Returns the indexed logs matching every given filter, in chain order.
+        """
+        query = "SELECT event, address, block, tx, log_index, timestamp, args FROM events WHERE block >= ?"
+        params = [from_block]
+        for column, value in (("event", event), ("subject", subject), ("address", address)):
+            if value is not None:
+                query += f" AND {column} = ?"
+                params.append(str(value))
+        if to_block is not None:
+            query += " AND block <= ?"
+            params.append(to_block)
+        query += " ORDER BY block, log_index"
+        return [{"event": e, "address": a, "block": b, "tx": tx, "log_index": i, "timestamp": t, "args": json.loads(args)}
+                for e, a, b, tx, i, t, args in self.db.execute(query, params)]
+
+    def strategies(self, factory):
+        """
+        Returns the original and every clone of `factory`, in deployment order.
+        """
+        deployed = self.events(address=factory, event="Deployed") + self.events(address=factory, event="Cloned")
+        return [e["args"][SUBJECTS[e["event"]]] for e in sorted(deployed, key=lambda e: (e["block"], e["log_index"]))]
+
+    def reports(self, strategy, from_block=0, to_block=None):
+        return self.events(event="StrategyReported", subject=strategy, from_block=from_block, to_block=to_block)
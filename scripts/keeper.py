@@ -0,0 +1,148 @@
+import time
+from collections import namedtuple
+from brownie import Strategy, accounts, interface, multicall, web3
+from brownie.network.transaction import Status
+import click
+from scripts.cli import flag
+from scripts.executor import PipelinedExecutor
+from scripts.fleet_report import pending_rewards
+from scripts.merkle import SSB_STRATEGIES
+from scripts.metadata import unwrap
+from scripts.state_report import snapshots
+
+# what a call is priced at before its gas is estimated, a bit over what tests/gas_baseline.json measures
+DEFAULT_TEND_GAS = 400_000
+DEFAULT_HARVEST_GAS = 1_500_000
+DEFAULT_POLL_INTERVAL = 60
+# setQuotes, sent ahead of each harvest
+QUOTE_BASE_GAS = 50_000
+QUOTE_GAS = 30_000
+
+# `value` and `cost` in want, `gas` estimated for `action` ("tend" or "harvest") or the default before that. `quotes`
+# are what a harvest checks its rewards' pools against, None for strategies that don't take quotes
+Job = namedtuple("Job", ["strategy", "action", "gas", "value", "cost", "quotes"])
+
+
+def quote_rewards(strategy, amounts):
+    """
+    Want per 1e18 of each reward in `amounts` ({token: amount to sell}), for Strategy.setQuotes: what selling that
+    amount along the strategy's route returns, from queryBatchSwap at the latest block rather than inside the sale.
+    Rewards whose route can't be quoted are left out, and are sold against their spot value alone.
+    """
+    balancer_vault = interface.IBalancerVault(strategy.balancerVault())
+    routes = dict(zip([strategy.rewardTokens(i) for i in range(strategy.numRewards())], strategy.getSwapSteps()))
+    funds = (strategy.address, False, strategy.address, False)
+    quotes = {}
+    for token, amount in amounts.items():
+        if amount == 0:
+            continue
+        pool_ids, assets = routes[token]
+        steps = [(pool_id, j, j + 1, amount if j == 0 else 0, b"") for j, pool_id in enumerate(pool_ids)]
+        try:
+            deltas = balancer_vault.queryBatchSwap.call(0, steps, assets, funds)
+        except Exception as e:
+            print(f'{token} can\'t be quoted for {strategy.address}: {e}')
+            continue
+        quotes[token] = -deltas[-1] * 10 ** 18 // amount
+    return quotes
+
+
+def evaluate(strategies, gas_price, tend_gas=DEFAULT_TEND_GAS, harvest_gas=DEFAULT_HARVEST_GAS):
+    """
+    Returns the tends and harvests worth sending at `gas_price` across `strategies`, from a handful of aggregate
+    calls and a quote of each strategy's rewards. A tend is worth it when tendTrigger says so for its cost. A harvest
+    is when harvestTrigger does, or when the rewards it would claim and sell are worth more than its cost times the
+    strategy's profitFactor.
+    """
+    contracts = [Strategy.at(s) for s in strategies]
+    state = snapshots([s.address for s in contracts])
+    contracts = [s for s in contracts if state[s.address] is not None]
+    strategies = [s.address for s in contracts]
+    with multicall:
+        rows = [(s.tendTrigger(tend_gas * gas_price), s.harvestTrigger(harvest_gas * gas_price),
+                 s.ethToWant(harvest_gas * gas_price), s.profitFactor(), s.gauge(), s.minter()) for s in contracts]
+    rows = [tuple(unwrap(r) for r in row) for row in rows]
+    pending = pending_rewards(strategies, [row[4] for row in rows], [row[5] for row in rows], state)
+
+    jobs = []
+    for contract, (tend, harvest, harvest_cost, profit_factor, _, _), rewards in zip(contracts, rows, pending):
+        strategy = contract.address
+        if tend:
+            jobs.append(Job(strategy, "tend", tend_gas, None, None, None))
+        amounts = {token: balance + rewards.get(token, 0) for token, balance in state[strategy]["rewards"].items()}
+        quotes = quote_rewards(contract, amounts)
+        value = sum(amounts[token] * quote // 10 ** 18 for token, quote in quotes.items())
+        # without an ethToWant route rewards can't be weighed against gas, and harvestTrigger alone decides. Strategies
+        # predating setQuotes sell at their own limits
+        if harvest or 0 < profit_factor * harvest_cost < value:
+            jobs.append(Job(strategy, "harvest", harvest_gas, value, harvest_cost,
+                            None if state[strategy].get("legacy") else quotes))
+    return jobs
+
+
+def confirm(job, account, gas_price):
+    """
+    Estimates `job`'s gas, and checks again that it's worth it at that gas. Returns the job with its estimate, or
+    None when it would revert or isn't worth it after all.
+    """
+    strategy = Strategy.at(job.strategy)
+    try:
+        gas = getattr(strategy, job.action).estimate_gas({"from": account})
+    except Exception as e:
+        print(f'{job.action} {job.strategy} would revert: {e}')
+        return None
+    if job.action == "tend":
+        worth = strategy.tendTrigger(gas * gas_price)
+        return job._replace(gas=gas) if worth else None
+    # estimated before the job's quotes land, so without the sales they allow
+    gas = max(gas, DEFAULT_HARVEST_GAS)
+    cost = strategy.ethToWant(gas * gas_price)
+    worth = strategy.harvestTrigger(gas * gas_price) or 0 < strategy.profitFactor() * cost < job.value
+    return job._replace(gas=gas, cost=cost) if worth else None
+
+
+def run_once(strategies, account, executor=None, in_flight=None, gas_price=None):
+    """
+    One keeper round at `gas_price`, the node's if None. Jobs still in flight from an earlier round are left
+    alone. Returns the confirmed jobs, which are only priced and not sent when `executor` is None.
+    """
+    in_flight = {} if in_flight is None else in_flight
+    for key, submission in list(in_flight.items()):
+        if submission.status in (Status.Confirmed, Status.Reverted):
+            del in_flight[key]
+
+    gas_price = web3.eth.gas_price if gas_price is None else gas_price
+    confirmed = []
+    for job in evaluate(strategies, gas_price):
+        if (job.strategy, job.action) in in_flight:
+            continue
+        job = confirm(job, account, gas_price)
+        if job is None:
+            continue
+        confirmed.append(job)
+        print(f'{job.action} {job.strategy}: {job.gas} gas' +
+              (f', rewards worth {job.value} want for {job.cost} want' if job.value is not None else ''))
+        if executor is not None:
+            strategy = Strategy.at(job.strategy)
+            if job.quotes:
+                # nonces are assigned in order, so the quotes land before the harvest selling against them
+                executor.submit(strategy.setQuotes, list(job.quotes), list(job.quotes.values()),
+                                tx_params={"gas_limit": QUOTE_BASE_GAS + QUOTE_GAS * len(job.quotes)})
+            fn = getattr(strategy, job.action)
+            in_flight[(job.strategy, job.action)] = executor.submit(fn, tx_params={"gas_limit": int(job.gas * 1.2)})
+    return confirmed
+
+
+# brownie run keeper main [dry_run] [poll_interval] [strategy,strategy,...]
+def main(dry_run=False, poll_interval=DEFAULT_POLL_INTERVAL, strategies=None):
+    dry_run = flag(dry_run)
+    strategies = strategies.split(",") if strategies else SSB_STRATEGIES
+    account = accounts.load(click.prompt("Account", type=click.Choice(accounts.load())))
+    executor = None if dry_run else PipelinedExecutor(account)
+    in_flight = {}
+    while True:
+        run_once(strategies, account, executor, in_flight)
+        if dry_run:
+            return
+        executor.poll()
+        time.sleep(int(poll_interval))
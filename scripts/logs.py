@@ -0,0 +1,65 @@
+DEFAULT_BLOCK_RANGE = 50_000
+MAX_BLOCK_RANGE = 1_000_000
+
+# how nodes refuse a getLogs query that covers too many blocks or logs
+TOO_MANY_RESULTS = ("too many", "more than", "limit exceeded", "response size", "timeout", "timed out")
+
+
+def _json_safe(value):
+    if isinstance(value, bytes):
+        return "0x" + value.hex()
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    if isinstance(value, int):
+        return value
+    return str(value)
+
+
+def encode_event(event):
+    """
+    Flattens a decoded web3 event into a json friendly dict.
+    """
+    return {
+        "event": event["event"],
+        "address": event["address"],
+        "block": event["blockNumber"],
+        "tx": event["transactionHash"].hex(),
+        "log_index": event["logIndex"],
+        "args": {k: _json_safe(v) for k, v in event["args"].items()},
+    }
+
+
+def _too_many_results(error):
+    message = str(error).lower()
+    return any(pattern in message for pattern in TOO_MANY_RESULTS)
+
+
+def iter_event_windows(event, from_block, to_block, block_range=DEFAULT_BLOCK_RANGE, argument_filters=None):
+    """
+    Yields (start, end, encoded logs) for consecutive block windows covering [from_block, to_block]. A window
+    the node refuses for returning too much is halved and retried, and the window doubles again after each
+    successful query.
+    """
+    start = from_block
+    while start <= to_block:
+        end = min(start + block_range - 1, to_block)
+        try:
+            logs = event.getLogs(fromBlock=start, toBlock=end, argument_filters=argument_filters or {})
+        except Exception as e:
+            if block_range > 1 and _too_many_results(e):
+                block_range //= 2
+                continue
+            raise
+        yield start, end, [encode_event(log) for log in logs]
+        start = end + 1
+        block_range = min(block_range * 2, MAX_BLOCK_RANGE)
+
+
+def fetch_events(event, from_block, to_block, block_range=DEFAULT_BLOCK_RANGE, argument_filters=None):
+    """
+    Returns the encoded `event` logs in [from_block, to_block].
+    """
+    events = []
+    for _, _, logs in iter_event_windows(event, from_block, to_block, block_range, argument_filters):
+        events += logs
+    return events
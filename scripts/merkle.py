@@ -0,0 +1,122 @@
+from collections import namedtuple
+from brownie import multicall, web3
+
+MERKLE_ORCHARD = "0xdAE7e32ADc5d490a43cCba1f0c736033F2b4eFca"
+BAL = "0xba100000625a3754423978a60c9317c58a424e3D"
+LDO = "0x5A98FcBEA516Cf06857215779Fd812CA3beF1B32"
+BAL_DISTRIBUTOR = "0xd2EB7Bd802A7CA68d9AcD209bEc4E664A9abDD7b"
+LDO_DISTRIBUTOR = "0x55c8de1ac17c1a937293416c9bce5789cbbf61d1"
+
+# (report file prefix, reward token, distributor, symbol)
+REWARDS = [
+    ("homestead_", BAL, BAL_DISTRIBUTOR, "BAL"),
+    ("homestead-lido_", LDO, LDO_DISTRIBUTOR, "LDO"),
+]
+
+# dai, usdt, usdc, wbtc, weth
+SSB_STRATEGIES = [
+    "0x3B7c81daa0F7C897b3e09352E1Ca2fBE93Ac234D",
+    "0xf0E5f920F8daf2a01ed473D67e74565e7a4a1979",
+    "0xC7af91cdDDfC7c782671eFb640A4E4C4FB6352B4",
+    "0xf2901406A1743ac032863777c61f1d61b59115fd",
+    "0x1d4439680c489f18ce480e72DeeDc235952AF9C9",
+]
+
+DEFAULT_CHUNK_SIZE = 500
+
+# rough MerkleOrchard.claimDistributions costs, used to size claim batches before any gas estimate
+CLAIM_BASE_GAS = 60_000
+CLAIM_GAS = 35_000
+PROOF_ELEMENT_GAS = 1_500
+DEFAULT_CLAIM_GAS_LIMIT = 3_000_000
+
+ClaimBatch = namedtuple("ClaimBatch", ["claimer", "token", "distributor", "claims", "gas"])
+
+# first distribution ids that can concern the strategies above
+FIRST_DISTRIBUTION_IDS = {BAL: 59, LDO: 0}
+
+
+def next_distribution_ids(orchard, rewards=REWARDS):
+    """
+    Returns {token: next distribution id} for every reward, fetched in one aggregate call.
+    """
+    with multicall:
+        next_ids = {token: orchard.getNextDistributionId(token, distributor) for _, token, distributor, _ in rewards}
+    return {token: int(next_id) for token, next_id in next_ids.items()}
+
+
+def scan_claimed(orchard, claimers, rewards=REWARDS, since=0, chunk_size=DEFAULT_CHUNK_SIZE, next_ids=None,
+                 cache=None):
+    """
+    Returns a {(claimer, token, distribution id): claimed} table for every claimer and every
+    distribution id in [since, next id) of every reward. `since` is either one id for all rewards
+    or a {token: id} watermark. The isClaimed calls are packed into aggregate calls of at most
+    `chunk_size` each.
+    """
+    if next_ids is None:
+        next_ids = next_distribution_ids(orchard, rewards)
+    if not isinstance(since, dict):
+        since = {token: since for _, token, _, _ in rewards}
+
+    keys = [(claimer, token, distributor, i)
+            for _, token, distributor, _ in rewards
+            for claimer in claimers
+            for i in range(since.get(token, 0), next_ids[token])]
+    return is_claimed_many(orchard, keys, chunk_size, cache)
+
+
+def is_claimed_many(orchard, keys, chunk_size=DEFAULT_CHUNK_SIZE, cache=None):
+    """
+    Looks up `orchard.isClaimed` for a list of (claimer, token, distributor, id) keys in aggregate
+    calls of at most `chunk_size` each. Returns {(claimer, token, id): claimed}.
+
+    With a `ClaimCache`, keys already known to be claimed are answered from it, and the newly
+    claimed ones are recorded in it.
+    """
+    table = {}
+    if cache is not None:
+        for claimer, token, distributor, i in keys:
+            if cache.is_claimed(token, distributor, i, claimer):
+                table[(claimer, token, i)] = True
+        keys = [key for key in keys if (key[0], key[1], key[3]) not in table]
+
+    block = web3.eth.block_number
+    for start in range(0, len(keys), chunk_size):
+        chunk = keys[start:start + chunk_size]
+        with multicall(block_identifier=block):
+            results = [orchard.isClaimed(token, distributor, i, claimer) for claimer, token, distributor, i in chunk]
+        results = [bool(claimed) for claimed in results]
+        for (claimer, token, _, i), claimed in zip(chunk, results):
+            table[(claimer, token, i)] = claimed
+        if cache is not None:
+            cache.record_many([key for key, claimed in zip(chunk, results) if claimed], block)
+    return table
+
+
+def claim_gas(claims):
+    """
+    Projected gas of one claimDistributions call over `claims`.
+    """
+    return CLAIM_BASE_GAS + sum(CLAIM_GAS + PROOF_ELEMENT_GAS * len(claim[4]) for claim in claims)
+
+
+def plan_claims(unclaimed, gas_limit=DEFAULT_CLAIM_GAS_LIMIT):
+    """
+    Groups unclaimed (claimer, token, distributor, ReportEntry) tuples into as few claimDistributions
+    calls as possible: one per claimer and reward token, split into batches that stay under `gas_limit`.
+    """
+    groups = {}
+    for claimer, token, distributor, entry in unclaimed:
+        groups.setdefault((claimer, token, distributor), []).append(entry)
+
+    batches = []
+    for (claimer, token, distributor), entries in groups.items():
+        claims = []
+        for entry in sorted(entries, key=lambda e: e.distribution_id):
+            claim = (entry.distribution_id, entry.claim_amount, distributor, 0, entry.hex_proof)
+            if claims and claim_gas(claims + [claim]) > gas_limit:
+                batches.append(ClaimBatch(claimer, token, distributor, claims, claim_gas(claims)))
+                claims = []
+            claims.append(claim)
+        batches.append(ClaimBatch(claimer, token, distributor, claims, claim_gas(claims)))
+    return batches
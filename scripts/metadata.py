@@ -0,0 +1,127 @@
+import json
+import time
+from collections import namedtuple
+from pathlib import Path
+from brownie import Contract, multicall
+
+DEFAULT_PATH = Path(".cache") / "metadata.json"
+DEFAULT_TTL = 7 * 24 * 60 * 60
+
+ERC20_ABI = [
+    {"name": "name", "inputs": [], "outputs": [{"name": "", "type": "string"}], "stateMutability": "view",
+     "type": "function"},
+    {"name": "symbol", "inputs": [], "outputs": [{"name": "", "type": "string"}], "stateMutability": "view",
+     "type": "function"},
+    {"name": "decimals", "inputs": [], "outputs": [{"name": "", "type": "uint8"}], "stateMutability": "view",
+     "type": "function"},
+    {"name": "balanceOf", "inputs": [{"name": "account", "type": "address"}], "outputs": [{"name": "", "type": "uint256"}],
+     "stateMutability": "view", "type": "function"},
+]
+
+TokenMetadata = namedtuple("TokenMetadata", ["address", "name", "symbol", "decimals"])
+
+
+class MetadataResolver:
+    """
+    Memoizes address -> (name, symbol, decimals, ABI) in process and, unless `path` is None, on disk.
+    Entries older than `ttl` seconds are fetched again. Missing entries are fetched together in one
+    aggregate call, and ABIs are only fetched from the explorer the first time a full `contract` is asked for.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL):
+        self.path = None if path is None else Path(path)
+        self.ttl = ttl
+        self._entries = {}
+        self._erc20s = {}
+        if self.path is not None and self.path.exists():
+            with open(self.path) as f:
+                self._entries = json.load(f)
+
+    def _fresh(self, address, field):
+        entry = self._entries.get(str(address).lower())
+        return entry is not None and field in entry and time.time() - entry["fetched_at"] < self.ttl
+
+    def _save(self):
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(self._entries, f)
+
+    def erc20(self, address):
+        """
+        Returns a Contract with a bare ERC20 ABI, which needs no explorer lookup.
+        """
+        key = str(address).lower()
+        if key not in self._erc20s:
+            self._erc20s[key] = Contract.from_abi("ERC20", address, ERC20_ABI, persist=False)
+        return self._erc20s[key]
+
+    def resolve_many(self, addresses):
+        """
+        Returns {address: TokenMetadata}. Fields a contract doesn't implement are None.
+        """
+        missing = list({str(a).lower(): a for a in addresses if not self._fresh(a, "name")}.values())
+        if missing:
+            if len(missing) == 1:
+                erc20 = self.erc20(missing[0])
+                results = [(_try_call(erc20.name), _try_call(erc20.symbol), _try_call(erc20.decimals))]
+            else:
+                with multicall:
+                    results = [(self.erc20(a).name(), self.erc20(a).symbol(), self.erc20(a).decimals()) for a in missing]
+            now = time.time()
+            for address, (name, symbol, decimals) in zip(missing, results):
+                entry = self._entries.setdefault(str(address).lower(), {})
+                entry.update(name=unwrap(name), symbol=unwrap(symbol), decimals=unwrap(decimals), fetched_at=now)
+            self._save()
+
+        metadata = {}
+        for address in addresses:
+            entry = self._entries[str(address).lower()]
+            metadata[address] = TokenMetadata(address, entry["name"], entry["symbol"], entry["decimals"])
+        return metadata
+
+    def resolve(self, address):
+        return self.resolve_many([address])[address]
+
+    def name(self, address):
+        """
+        Returns the name of `address`, or the address itself if it has none.
+        """
+        return self.resolve(address).name or address
+
+    def contract(self, address):
+        """
+        Returns a Contract with the full ABI of `address`, fetching it from the explorer only once.
+        """
+        key = str(address).lower()
+        if not self._fresh(address, "abi"):
+            abi = Contract(address).abi
+            entry = self._entries.setdefault(key, {"fetched_at": time.time()})
+            entry["abi"] = abi
+            self._save()
+        return Contract.from_abi(self._entries[key].get("name") or "Contract", address, self._entries[key]["abi"],
+                                 persist=False)
+
+
+def _try_call(call):
+    try:
+        return call()
+    except Exception:
+        return None
+
+
+def unwrap(result):
+    # aggregate call results are proxies around the decoded value, or around None for failed calls
+    while hasattr(result, "__wrapped__"):
+        result = result.__wrapped__
+    return result
+
+
+_default = None
+
+
+def default_resolver():
+    global _default
+    if _default is None:
+        _default = MetadataResolver()
+    return _default
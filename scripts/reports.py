@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+from collections import namedtuple
+from pathlib import Path
+
+DEFAULT_MANIFEST = Path(".cache") / "reports.json"
+READ_SIZE = 1 << 16
+
+ReportEntry = namedtuple("ReportEntry", ["week", "distribution_id", "claimer", "claim_amount", "hex_proof"])
+
+_decoder = json.JSONDecoder()
+
+
+class _Stream:
+    """
+    Incremental reader over a json file that decodes one value at a time, so only the value being
+    decoded has to be held in memory.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.f.read(READ_SIZE)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                raise ValueError("unexpected end of report")
+            self._fill()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"expected '{char}' in report, found '{self.buf[self.pos]}'")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # a value ending exactly at the buffer end might continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def items(self):
+        """
+        Yields the elements of the array that starts at the current position.
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == "]":
+                self.pos += 1
+                return
+            self.expect(",")
+
+
+def parse_report(path, claimers=None):
+    """
+    Streams a homestead report, returning its config and the claims of `claimers` (all claimers if None).
+    """
+    config = None
+    entries = []
+    with open(path) as f:
+        stream = _Stream(f)
+        stream.expect("{")
+        while stream.peek() != "}":
+            key = stream.value()
+            stream.expect(":")
+            if key == "tokens_data":
+                for token_data in stream.items():
+                    if claimers is None or token_data["address"].lower() in claimers:
+                        entries.append([token_data["address"], token_data["claim_amount"], token_data["hex_proof"]])
+            elif key == "config":
+                config = stream.value()
+            else:
+                stream.value()
+            if stream.peek() == ",":
+                stream.pos += 1
+    return config, entries
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_reports(prefix, directory="./scripts", claimers=None, manifest_path=DEFAULT_MANIFEST):
+    """
+    Returns a {(week, claimer): ReportEntry} index over every `prefix` report in `directory`, keeping only
+    `claimers` if given.
+
+    A manifest of each report's mtime, hash and extracted claims is kept at `manifest_path`, so reports
+    that did not change since the last run are never parsed again.
+    """
+    claimers = None if claimers is None else {c.lower() for c in claimers}
+    claimers_key = None if claimers is None else sorted(claimers)
+    manifest_path = Path(manifest_path)
+    manifest = {}
+    if manifest_path.exists():
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    if manifest.get("claimers") != claimers_key:
+        manifest = {}
+    reports = manifest.get("reports", {})
+
+    index = {}
+    changed = False
+    for dir_entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if not dir_entry.is_file() or not dir_entry.name.startswith(prefix):
+            continue
+        mtime = dir_entry.stat().st_mtime
+        report = reports.get(dir_entry.path)
+        if report is None or report["mtime"] != mtime:
+            sha = _sha256(dir_entry.path)
+            if report is None or report["sha256"] != sha:
+                config, entries = parse_report(dir_entry.path, claimers)
+                report = {"config": config, "entries": entries}
+            report.update(mtime=mtime, sha256=sha)
+            reports[dir_entry.path] = report
+            changed = True
+
+        config = report["config"]
+        if config is None:
+            continue
+        week = config["week"]
+        for claimer, claim_amount, hex_proof in report["entries"]:
+            index[(week, claimer)] = ReportEntry(week, week - config["offset"], claimer, int(claim_amount), hex_proof)
+
+    if changed:
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(manifest_path, "w") as f:
+            json.dump({"claimers": claimers_key, "reports": reports}, f)
+    return index
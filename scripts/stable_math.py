@@ -0,0 +1,245 @@
+# Balancer StableMath (StablePool v1, as in staBAL3) ported to NumPy, so a keeper can price many candidate joins
+# and exits at once before paying for a transaction that would trip BAL#208 or BAL#505. Balances are upscaled to 18
+# decimals floats and the math broadcasts over leading axes: balances of shape (n,) or (k, n) with amounts of shape
+# (k, n) or (k,) evaluate k proposals together. Floats agree with the pool's fixed point to around 1e-12 relative,
+# plenty to tell whether a guard of a few bips trips.
+from collections import namedtuple
+import numpy as np
+from brownie import Contract, multicall
+from scripts.metadata import default_resolver, unwrap
+
+AMP_PRECISION = 1e3
+MAX_ITERATIONS = 255
+BASIS_ONE = 10_000
+
+PROTOCOL_FEES_COLLECTOR_ABI = [{"inputs": [], "name": "getSwapFeePercentage", "outputs": [
+    {"internalType": "uint256", "name": "", "type": "uint256"}], "stateMutability": "view", "type": "function"}]
+
+# predicted amount, the slippage guard's minimum, and whether the transaction would get past it
+Check = namedtuple("Check", ["expected", "minimum", "ok"])
+
+
+def invariant(amp, balances):
+    """
+    StableMath._calculateInvariant: D such that amp * n^n * sum + D = amp * n^n * D + D^(n+1) / (n^n * prod).
+    """
+    balances = np.asarray(balances, dtype=np.float64)
+    n = balances.shape[-1]
+    total = balances.sum(axis=-1)
+    amp_times_total = amp * n
+    d = total
+    for _ in range(MAX_ITERATIONS):
+        d_p = d
+        for j in range(n):
+            d_p = d_p * d / (balances[..., j] * n)
+        previous = d
+        d = ((amp_times_total * total / AMP_PRECISION + d_p * n) * d /
+             ((amp_times_total - AMP_PRECISION) * d / AMP_PRECISION + (n + 1) * d_p))
+        if np.all(np.abs(d - previous) <= 1e-12 * np.maximum(d, 1)):
+            break
+    return np.where(total == 0, 0.0, d)
+
+
+def balance_given_invariant(amp, balances, d, index):
+    """
+    StableMath._getTokenBalanceGivenInvariantAndAllOtherBalances: the balance of token `index` that makes the
+    invariant `d` when every other balance stays put.
+    """
+    balances = np.asarray(balances, dtype=np.float64)
+    n = balances.shape[-1]
+    d = np.asarray(d, dtype=np.float64)
+    amp_times_total = amp * n
+    others = np.delete(balances, index, axis=-1)
+    # d^(n+1) / (amp * n^(n+1) * prod(others)), one factor at a time to stay in range
+    c = d * AMP_PRECISION / amp_times_total * d / n
+    for j in range(n - 1):
+        c = c * d / (others[..., j] * n)
+    b = others.sum(axis=-1) + d / amp_times_total * AMP_PRECISION
+    y = (d * d + c) / (d + b)
+    for _ in range(MAX_ITERATIONS):
+        previous = y
+        y = (y * y + c) / (2 * y + b - d)
+        if np.all(np.abs(y - previous) <= 1e-12 * np.maximum(y, 1)):
+            break
+    return y
+
+
+def due_protocol_fees(amp, balances, last_invariant, protocol_fee):
+    """
+    Swap fees owed to the protocol since the last join or exit, which a v1 stable pool takes out of its largest
+    balance before pricing the next one.
+    """
+    balances = np.asarray(balances, dtype=np.float64)
+    fees = np.zeros_like(balances)
+    if protocol_fee == 0 or last_invariant == 0:
+        return fees
+    index = int(np.argmax(balances))
+    final_balance = balance_given_invariant(amp, balances, last_invariant, index)
+    fees[index] = max(balances[index] - final_balance, 0) * protocol_fee
+    return fees
+
+
+def bpt_out_given_exact_tokens_in(amp, balances, amounts_in, bpt_supply, swap_fee):
+    """
+    StableMath._calcBptOutGivenExactTokensIn. The part of a join that unbalances the pool pays the swap fee.
+    """
+    balances = np.asarray(balances, dtype=np.float64)
+    amounts_in = np.asarray(amounts_in, dtype=np.float64)
+    total = balances.sum(axis=-1, keepdims=True)
+    ratios = (balances + amounts_in) / balances
+    invariant_ratio = (ratios * balances / total).sum(axis=-1, keepdims=True)
+    non_taxable = balances * (invariant_ratio - 1)
+    taxed = non_taxable + (amounts_in - non_taxable) * (1 - swap_fee)
+    amounts_in = np.where(ratios > invariant_ratio, taxed, amounts_in)
+
+    current = invariant(amp, balances)
+    ratio = invariant(amp, balances + amounts_in) / current
+    return np.where(ratio > 1, bpt_supply * (ratio - 1), 0.0)
+
+
+def token_out_given_exact_bpt_in(amp, balances, index, bpt_in, bpt_supply, swap_fee):
+    """
+    StableMath._calcTokenOutGivenExactBptIn. The share of the exit coming out of the other tokens' liquidity pays
+    the swap fee.
+    """
+    balances = np.asarray(balances, dtype=np.float64)
+    bpt_in = np.asarray(bpt_in, dtype=np.float64)
+    current = invariant(amp, balances)
+    new_balance = balance_given_invariant(amp, balances, current * (bpt_supply - bpt_in) / bpt_supply, index)
+    out = balances[..., index] - new_balance
+    taxable = out * (1 - balances[..., index] / balances.sum(axis=-1))
+    return out - taxable + taxable * (1 - swap_fee)
+
+
+class StablePool:
+    """
+    Snapshot of a stable pool's state, with its math in token units. `scales` upscale each token to 18 decimals.
+    """
+
+    def __init__(self, tokens, balances, scales, amp, swap_fee, bpt_supply, last_invariant=0, last_amp=None,
+                 protocol_fee=0):
+        self.tokens = list(tokens)
+        self.scales = np.asarray(scales, dtype=np.float64)
+        self.amp = amp
+        self.swap_fee = swap_fee
+        self.bpt_supply = bpt_supply
+        upscaled = np.asarray(balances, dtype=np.float64) * self.scales
+        # what the pool prices the next join or exit from, once the protocol has had its cut
+        fees = due_protocol_fees(last_amp or amp, upscaled, last_invariant, protocol_fee)
+        self.balances = upscaled - fees
+
+    @classmethod
+    def from_chain(cls, pool, balancer_vault, block_identifier=None, resolver=None):
+        """
+        Reads `pool` at `block_identifier`, latest if None, in one aggregate call.
+        """
+        pool_id = pool.getPoolId()
+        with multicall(block_identifier=block_identifier):
+            pool_tokens = balancer_vault.getPoolTokens(pool_id)
+            amp = pool.getAmplificationParameter()
+            swap_fee = pool.getSwapFeePercentage()
+            bpt_supply = pool.totalSupply()
+            last = pool.getLastInvariant()
+            collector = balancer_vault.getProtocolFeesCollector()
+        collector = Contract.from_abi("ProtocolFeesCollector", unwrap(collector), PROTOCOL_FEES_COLLECTOR_ABI)
+        protocol_fee = collector.getSwapFeePercentage(block_identifier=block_identifier)
+
+        tokens, balances, _ = unwrap(pool_tokens)
+        metadata = (resolver or default_resolver()).resolve_many(tokens)
+        last_invariant, last_amp = unwrap(last)
+        return cls(tokens, balances, [10 ** (18 - metadata[str(t)].decimals) for t in tokens],
+                   unwrap(amp)[0], unwrap(swap_fee) / 1e18, unwrap(bpt_supply) / 1.0, last_invariant / 1.0,
+                   last_amp, protocol_fee / 1e18)
+
+    def index(self, token):
+        return [str(t) for t in self.tokens].index(str(token))
+
+    def join(self, amounts_in):
+        """
+        Bpt minted for joining with `amounts_in`, raw token amounts of shape (n,) or (k, n).
+        """
+        amounts_in = np.asarray(amounts_in, dtype=np.float64) * self.scales
+        return bpt_out_given_exact_tokens_in(self.amp, self.balances, amounts_in, self.bpt_supply, self.swap_fee)
+
+    def join_single(self, index, amounts_in):
+        """
+        Bpt minted for each of `amounts_in`, raw amounts of token `index` alone.
+        """
+        amounts_in = np.atleast_1d(np.asarray(amounts_in, dtype=np.float64))
+        amounts = np.zeros((amounts_in.size, len(self.tokens)))
+        amounts[:, index] = amounts_in
+        return self.join(amounts)
+
+    def exit_single(self, index, bpt_in):
+        """
+        Raw amount of token `index` paid out for each of `bpt_in`.
+        """
+        bpt_in = np.atleast_1d(np.asarray(bpt_in, dtype=np.float64))
+        out = token_out_given_exact_bpt_in(self.amp, self.balances, index, bpt_in, self.bpt_supply, self.swap_fee)
+        return out / self.scales[index]
+
+
+def tokens_to_bpts(amounts, rate, want_decimals):
+    # Strategy.tokensToBpts, bpt having 18 decimals
+    return np.asarray(amounts, dtype=np.float64) * 1e18 / rate * 10 ** (18 - want_decimals)
+
+
+def check_deposits(stable_pool, index, amounts_in, rate, want_decimals, max_slippage_in):
+    """
+    Whether adjustPosition joining with each of `amounts_in` want would clear its BAL#208 guard.
+    """
+    expected = stable_pool.join_single(index, amounts_in)
+    minimum = tokens_to_bpts(amounts_in, rate, want_decimals) * (BASIS_ONE - max_slippage_in) / BASIS_ONE
+    return Check(expected, minimum, expected >= minimum)
+
+
+def check_withdrawals(stable_pool, index, amounts_needed, rate, want_decimals, max_slippage_out):
+    """
+    Whether liquidatePosition raising each of `amounts_needed` want would clear _sellBpt's BAL#505 guard.
+    """
+    bpts = tokens_to_bpts(amounts_needed, rate, want_decimals)
+    expected = stable_pool.exit_single(index, bpts)
+    minimum = np.asarray(amounts_needed, dtype=np.float64) * (BASIS_ONE - max_slippage_out) / BASIS_ONE
+    return Check(expected, minimum, expected >= minimum)
+
+
+def check_strategy(strategy, pool, balancer_vault, deposits=None, withdrawals=None, block_identifier=None):
+    """
+    Prices `deposits` and `withdrawals` (want amounts) for `strategy` against its pool as it is now. Deposits
+    default to the next harvest's join: loose want plus the vault's credit, capped at maxSingleDeposit.
+    """
+    with multicall(block_identifier=block_identifier):
+        want = strategy.want()
+        index = strategy.tokenIndex()
+        rate = pool.getRate()
+        slippage_in = strategy.maxSlippageIn()
+        slippage_out = strategy.maxSlippageOut()
+        max_single_deposit = strategy.maxSingleDeposit()
+        loose = strategy.balanceOfWant()
+        vault = strategy.vault()
+    want, index, rate = unwrap(want), unwrap(index), unwrap(rate)
+    decimals = default_resolver().resolve(want).decimals
+    if deposits is None:
+        credit = Contract(unwrap(vault)).creditAvailable(strategy, block_identifier=block_identifier)
+        deposits = [min(unwrap(max_single_deposit), unwrap(loose) + credit)]
+
+    stable_pool = StablePool.from_chain(pool, balancer_vault, block_identifier)
+    checks = {"deposits": check_deposits(stable_pool, index, deposits, rate, decimals, unwrap(slippage_in))}
+    if withdrawals is not None:
+        checks["withdrawals"] = check_withdrawals(stable_pool, index, withdrawals, rate, decimals,
+                                                  unwrap(slippage_out))
+    return checks
+
+
+# brownie run stable_math main <strategy> [want amount ...]
+def main(strategy, *amounts):
+    strategy = Contract(strategy)
+    pool = Contract(strategy.bpt())
+    balancer_vault = Contract(strategy.balancerVault())
+    amounts = [int(a) for a in amounts] or None
+    checks = check_strategy(strategy, pool, balancer_vault, deposits=amounts, withdrawals=amounts)
+    for kind, check in checks.items():
+        for i, (expected, minimum, ok) in enumerate(zip(*check)):
+            print(f'{kind[:-1]} {amounts[i] if amounts else "next harvest"}: '
+                  f'{expected:.0f} predicted, {minimum:.0f} minimum, {"ok" if ok else "would revert"}')
+    return checks
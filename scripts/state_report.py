@@ -0,0 +1,109 @@
+from brownie import Strategy, interface, multicall
+from scripts.merkle import SSB_STRATEGIES
+from scripts.metadata import default_resolver, unwrap
+
+
+def decode_snapshot(want, snapshot):
+    """
+    Turns a Strategy.getSnapshot() struct into a dict.
+    """
+    (balance_of_want, unstaked_bpt, staked_bpt, pooled, estimated_total_assets, bpt_rate, reward_tokens,
+     reward_balances, last_deposit_time, toggles) = snapshot
+    return {
+        "want": str(want),
+        "balanceOfWant": balance_of_want,
+        "balanceOfUnstakedBpt": unstaked_bpt,
+        "balanceOfStakedBpt": staked_bpt,
+        "balanceOfPooled": pooled,
+        "estimatedTotalAssets": estimated_total_assets,
+        "bptRate": bpt_rate,
+        "rewards": {str(token): balance for token, balance in zip(reward_tokens, reward_balances)},
+        "lastDepositTime": last_deposit_time,
+        "toggles": {"doSellRewards": toggles[0], "doClaimRewards": toggles[1], "doCollectTradingFees": toggles[2]},
+    }
+
+
+def snapshots(strategies):
+    """
+    Returns {address: snapshot dict} for every strategy, fetched in one aggregate call. Strategies that
+    predate getSnapshot are read field by field instead, and map to None if that fails too.
+    """
+    contracts = [Strategy.at(address) for address in strategies]
+    with multicall:
+        results = [(s.want(), s.getSnapshot()) for s in contracts]
+
+    decoded = {}
+    legacy = []
+    for strategy, (want, snapshot) in zip(contracts, results):
+        want, snapshot = unwrap(want), unwrap(snapshot)
+        if snapshot is None:
+            print(f'{strategy.address} predates getSnapshot, reading its fields one by one')
+            legacy.append(strategy)
+        else:
+            decoded[strategy.address] = decode_snapshot(want, snapshot)
+    decoded.update(legacy_snapshots(legacy))
+    return {s.address: decoded.get(s.address) for s in contracts}
+
+
+def legacy_snapshots(contracts):
+    """
+    The getSnapshot fields of strategies deployed before it existed, from their own getters in two aggregate calls.
+    """
+    with multicall:
+        rows = [(s.want(), s.balanceOfWant(), s.balanceOfUnstakedBpt(), s.balanceOfStakedBpt(), s.balanceOfPooled(),
+                 s.estimatedTotalAssets(), s.bpt(), s.numRewards(), s.lastDepositTime(), s.toggles())
+                for s in contracts]
+    rows = [tuple(unwrap(value) for value in row) for row in rows]
+
+    with multicall:
+        extras = [(interface.IBalancerPool(row[6]).getRate(), [(s.rewardTokens(i), s.balanceOfReward(i))
+                                                                for i in range(row[7])])
+                  if None not in row else None for s, row in zip(contracts, rows)]
+
+    decoded = {}
+    for strategy, row, extra in zip(contracts, rows, extras):
+        if extra is None:
+            print(f'{strategy.address} has no readable state, skipped')
+            continue
+        (want, balance_of_want, unstaked_bpt, staked_bpt, pooled, estimated_total_assets, _, _, last_deposit_time,
+         toggles) = row
+        rate, rewards = extra
+        rewards = [(unwrap(token), unwrap(balance)) for token, balance in rewards]
+        decoded[strategy.address] = {**decode_snapshot(want, (
+            balance_of_want, unstaked_bpt, staked_bpt, pooled, estimated_total_assets, unwrap(rate),
+            [token for token, _ in rewards], [balance for _, balance in rewards], last_deposit_time, toggles)),
+            "legacy": True}
+    return decoded
+
+
+def format_snapshot(snapshot, metadata):
+    """
+    Human readable lines for one snapshot, `metadata` being a resolve_many result covering its tokens.
+    """
+    want = metadata[snapshot["want"]]
+    decimals = 10 ** want.decimals
+    lines = [f'Balance of {want.symbol}: {snapshot["balanceOfWant"] / decimals}',
+             f'Balance of Unstaked Bpt: {snapshot["balanceOfUnstakedBpt"] / decimals}',
+             f'Balance of Staked Bpt: {snapshot["balanceOfStakedBpt"] / decimals}']
+    for token, balance in snapshot["rewards"].items():
+        lines.append(f'Balance of {metadata[token].symbol}: {balance}')
+    lines.append(f'Estimated Total Assets: {snapshot["estimatedTotalAssets"] / decimals}')
+    return lines
+
+
+def print_snapshots(decoded, resolver=None):
+    resolver = resolver or default_resolver()
+    tokens = {t for s in decoded.values() if s is not None for t in [s["want"], *s["rewards"]]}
+    metadata = resolver.resolve_many(tokens)
+    for address, snapshot in decoded.items():
+        print(f'\n===={address}====')
+        if snapshot is None:
+            print('getSnapshot not supported')
+            continue
+        for line in format_snapshot(snapshot, metadata):
+            print(line)
+
+
+# brownie run state_report main [strategy ...]
+def main(*strategies):
+    print_snapshots(snapshots(strategies or SSB_STRATEGIES))
@@ -1,81 +1,189 @@
 import pytest, requests
-from brownie import config, chain
+from brownie import config, chain, network, rpc
 from brownie import Contract
+import util
 
+MOCK_LIQUIDITY = 10 ** 12  # of each pool token, in whole tokens
+MOCK_REWARD_RATE = 10 ** 9  # reward wei per second per staked bpt
+HEALTH_CHECK = "0xDDCea799fF1699e98EDF118e0629A974Df7DF012"  # health.ychad.eth, which strategies always report to
 
-@pytest.fixture(autouse=True)
-def isolation(fn_isolation):
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "fork: needs mainnet state, skipped unless running on a mainnet fork")
+
+
+@pytest.fixture(scope="session")
+def is_fork():
+    # against local Balancer mocks by default, against mainnet contracts with --network mainnet-fork
+    yield "fork" in network.show_active()
+
+
+class SnapshotStack:
+    """
+    Chain snapshots in layers: the session deployment at the bottom, then states built on top of it, like
+    "harvested". Reverting to a layer discards the layers above it, which is why tests are grouped by layer.
+    """
+
+    def __init__(self):
+        self.layers = []
+
+    def top(self):
+        return self.layers[-1][0] if self.layers else None
+
+    def push(self, name):
+        self.layers.append((name, rpc.snapshot()))
+
+    def revert_to(self, name):
+        while self.layers[-1][0] != name:
+            self.layers.pop()
+        # a snapshot is used up by reverting to it, so it's taken again
+        self.layers[-1] = (name, chain._revert(self.layers[-1][1]))
+
+    def enter(self, name, build):
+        """
+        Moves the chain to layer `name` on top of the deployment, running `build` first if the layer doesn't exist.
+        """
+        if self.top() == name:
+            return
+        self.revert_to("deployed")
+        build()
+        self.push(name)
+
+
+def pytest_collection_modifyitems(items):
+    # within each module, tests starting from the harvested layer run last, so it's built once per module
+    modules = {}
+    items.sort(key=lambda item: (modules.setdefault(item.fspath, len(modules)), "harvested" in item.fixturenames))
+
+
+@pytest.fixture(scope="session")
+def deployment(strategy, strategyFactory, vault2, swapStepsBal2, swapStepsLdo2, amount, amount2, token_whale,
+               token2_whale, usdc_whale, bal_whale, ldo_whale, health_check):
+    # everything session scoped has to exist before the first snapshot, or a revert would take it away
     pass
 
 
-@pytest.fixture
-def gov(accounts):
-    yield accounts.at("0xFEB4acf3df3cDEA7399794D0869ef76A6EfAff52", force=True)
+@pytest.fixture(scope="session")
+def snapshots(deployment):
+    stack = SnapshotStack()
+    stack.push("deployed")
+    yield stack
 
 
-@pytest.fixture
+def deposit_and_harvest(request):
+    token, vault, strategy, user, strategist, amount = [
+        request.getfixturevalue(name) for name in ("token", "vault", "strategy", "user", "strategist", "amount")]
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": strategist})
+
+
+@pytest.fixture(scope="module")
+def module_isolation(snapshots):
+    # replaces brownie's, whose chain reset would wipe the session deployment. Brownie only runs tests under
+    # xdist if they all use a fixture by this name.
+    yield
+
+
+@pytest.fixture(autouse=True)
+def isolation(request, snapshots, module_isolation):
+    # every test starts from the deployment, or from the layer it asks for, and leaves that layer as it found it.
+    # Being autouse this runs before the test's other function fixtures, which a revert would otherwise undo.
+    if "harvested" in request.fixturenames:
+        snapshots.enter("harvested", lambda: deposit_and_harvest(request))
+    elif snapshots.top() != "deployed":
+        snapshots.revert_to("deployed")
+    yield
+    snapshots.revert_to(snapshots.top())
+
+
+@pytest.fixture(autouse=True)
+def fork_only(request, is_fork):
+    if request.node.get_closest_marker("fork") and not is_fork:
+        pytest.skip("needs a mainnet fork")
+
+
+@pytest.fixture(scope="session")
+def gov(accounts, is_fork):
+    if is_fork:
+        yield accounts.at("0xFEB4acf3df3cDEA7399794D0869ef76A6EfAff52", force=True)
+    else:
+        yield accounts[6]
+
+
+@pytest.fixture(scope="session")
 def user(accounts):
     yield accounts[0]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def rewards(accounts):
     yield accounts[1]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def guardian(accounts):
     yield accounts[2]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def management(accounts):
     yield accounts[3]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def strategist(accounts):
     yield accounts[4]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def keeper(accounts):
     yield accounts[5]
 
 
-@pytest.fixture
-def token():
+@pytest.fixture(scope="session")
+def token(is_fork, request):
     # 0x6B175474E89094C44Da98b954EedeAC495271d0F DAI
     # 0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48 USDC
     # 0xdAC17F958D2ee523a2206206994597C13D831ec7 USDT
     # 0x7f39C581F595B53c5cb19bD0b3f8dA6c935E2Ca0 wSTETH
     # 0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2 WETH
     token_address = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
-    yield Contract(token_address)
+    yield Contract(token_address) if is_fork else request.getfixturevalue("mock_token")
 
 
-@pytest.fixture
-def token2():
+@pytest.fixture(scope="session")
+def token2(is_fork, request):
     # 0x6B175474E89094C44Da98b954EedeAC495271d0F DAI
     # 0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48 USDC
     # 0xdAC17F958D2ee523a2206206994597C13D831ec7 USDT
     # 0x7f39C581F595B53c5cb19bD0b3f8dA6c935E2Ca0 wSTETH
     # 0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2 WETH
     token_address = "0x6B175474E89094C44Da98b954EedeAC495271d0F"
-    yield Contract(token_address)
+    yield Contract(token_address) if is_fork else request.getfixturevalue("mock_token2")
 
 
-@pytest.fixture
-def token_whale(accounts):
+def mock_whale(accounts, token):
+    # on mocks every whale is the same local account, minted whatever it's asked to hold
+    whale = accounts[7]
+    token.mint(whale, MOCK_LIQUIDITY * 10 ** token.decimals(), {"from": whale})
+    return whale
+
+
+@pytest.fixture(scope="session")
+def token_whale(accounts, token, is_fork):
     # 0x5d3a536E4D6DbD6114cc1Ead35777bAB948E3643 DAI
     # 0x0A59649758aa4d66E25f08Dd01271e891fe52199 USDC
     # 0xA929022c9107643515F5c777cE9a910F0D1e490C USDT
     # 0xba12222222228d8ba445958a75a0704d566bf2c8 wSTETH
     # 0x2F0b23f53734252Bda2277357e97e1517d6B042A WETH
-    return accounts.at("0x0A59649758aa4d66E25f08Dd01271e891fe52199", force=True)
+    if is_fork:
+        return accounts.at("0x0A59649758aa4d66E25f08Dd01271e891fe52199", force=True)
+    return mock_whale(accounts, token)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def amount(accounts, token, user, token_whale):
     amount = 10_000_000 * 10 ** token.decimals()
     # In order to get some funds for the token you are about to use,
@@ -83,61 +191,73 @@ def amount(accounts, token, user, token_whale):
     yield amount
 
 
-@pytest.fixture
-def token2_whale(accounts):
+@pytest.fixture(scope="session")
+def token2_whale(accounts, token2, is_fork):
     # In order to get some funds for the token you are about to use,
     # 0x5d3a536E4D6DbD6114cc1Ead35777bAB948E3643 DAI
     # 0x0A59649758aa4d66E25f08Dd01271e891fe52199 USDC
     # 0xA929022c9107643515F5c777cE9a910F0D1e490C USDT
-    reserve = accounts.at("0x5d3a536E4D6DbD6114cc1Ead35777bAB948E3643", force=True)
-    return reserve
+    if is_fork:
+        return accounts.at("0x5d3a536E4D6DbD6114cc1Ead35777bAB948E3643", force=True)
+    return mock_whale(accounts, token2)
 
 
-@pytest.fixture
-def usdc_whale(accounts):
-    reserve = accounts.at("0x47ac0Fb4F2D84898e4D9E7b4DaB3C24507a6D503", force=True)
-    yield reserve
+@pytest.fixture(scope="session")
+def usdc_whale(accounts, token, is_fork):
+    if is_fork:
+        yield accounts.at("0x47ac0Fb4F2D84898e4D9E7b4DaB3C24507a6D503", force=True)
+    else:
+        yield mock_whale(accounts, token)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def amount2(accounts, token2, user, token2_whale):
     amount = 1_000_000 * 10 ** token2.decimals()
     token2.transfer(user, amount, {"from": token2_whale})
     yield amount
 
 
-@pytest.fixture
-def weth():
+@pytest.fixture(scope="session")
+def weth(is_fork, accounts, MockERC20):
     token_address = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
-    yield Contract(token_address)
+    yield Contract(token_address) if is_fork else accounts[0].deploy(MockERC20, "Wrapped Ether", "WETH", 18)
 
 
-@pytest.fixture
-def bal():
+@pytest.fixture(scope="session")
+def bal(is_fork, request):
     token_address = "0xba100000625a3754423978a60c9317c58a424e3D"
-    yield Contract(token_address)
+    yield Contract(token_address) if is_fork else request.getfixturevalue("mock_bal")
 
 
-@pytest.fixture
-def bal_whale(accounts):
-    yield accounts.at("0xBA12222222228d8Ba445958a75a0704d566BF2C8", force=True)
+@pytest.fixture(scope="session")
+def bal_whale(accounts, bal, is_fork):
+    if is_fork:
+        yield accounts.at("0xBA12222222228d8Ba445958a75a0704d566BF2C8", force=True)
+    else:
+        yield mock_whale(accounts, bal)
 
 
-@pytest.fixture
-def ldo():
+@pytest.fixture(scope="session")
+def ldo(is_fork, accounts, MockERC20):
     token_address = "0x5A98FcBEA516Cf06857215779Fd812CA3beF1B32"
-    yield Contract(token_address)
+    yield Contract(token_address) if is_fork else accounts[0].deploy(MockERC20, "Lido DAO Token", "LDO", 18)
 
 
-@pytest.fixture
-def ldo_whale(accounts):
-    yield accounts.at("0x3e40D73EB977Dc6a537aF587D48316feE66E9C8c", force=True)
+@pytest.fixture(scope="session")
+def ldo_whale(accounts, ldo, is_fork):
+    if is_fork:
+        yield accounts.at("0x3e40D73EB977Dc6a537aF587D48316feE66E9C8c", force=True)
+    else:
+        yield mock_whale(accounts, ldo)
 
 
 @pytest.fixture
-def weth_amout(user, weth):
+def weth_amout(user, weth, is_fork):
     weth_amout = 10 ** weth.decimals()
-    user.transfer(weth, weth_amout)
+    if is_fork:
+        user.transfer(weth, weth_amout)
+    else:
+        weth.mint(user, weth_amout, {"from": user})
     yield weth_amout
 
 
@@ -153,7 +273,7 @@ def live_dai_vault():
     yield Contract(vault)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def vault(pm, gov, rewards, guardian, management, token):
     Vault = pm(config["dependencies"][0]).Vault
     vault = guardian.deploy(Vault)
@@ -163,7 +283,7 @@ def vault(pm, gov, rewards, guardian, management, token):
     yield vault
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def vault2(pm, gov, rewards, guardian, management, token2):
     Vault = pm(config["dependencies"][0]).Vault
     vault = guardian.deploy(Vault)
@@ -173,81 +293,107 @@ def vault2(pm, gov, rewards, guardian, management, token2):
     yield vault
 
 
-@pytest.fixture
-def balancer_vault():
-    yield Contract("0xBA12222222228d8Ba445958a75a0704d566BF2C8")
+@pytest.fixture(scope="session")
+def balancer_vault(is_fork, request):
+    yield Contract("0xBA12222222228d8Ba445958a75a0704d566BF2C8") if is_fork else request.getfixturevalue(
+        "mock_balancer_vault")
 
 
-@pytest.fixture
-def pool():
+@pytest.fixture(scope="session")
+def pool(is_fork, request):
     # 0x06Df3b2bbB68adc8B0e302443692037ED9f91b42 stable pool
     # 0x32296969Ef14EB0c6d29669C550D4a0449130230 metastable eth pool
     address = "0x06Df3b2bbB68adc8B0e302443692037ED9f91b42"  # staBAL3
-    yield Contract(address)
+    yield Contract(address) if is_fork else request.getfixturevalue("mock_pool")
 
 
-@pytest.fixture
-def gauge_factory():
+@pytest.fixture(scope="session")
+def gauge_factory(is_fork, request, accounts, bal, ldo):
     address = "0x4E7bBd911cf1EFa442BC1b2e9Ea01ffE785412EC"
-    yield Contract(address)
+    if is_fork:
+        yield Contract(address)
+    else:
+        gauge = request.getfixturevalue("mock_gauge")
+        for reward in (bal, ldo):
+            gauge.setRewardRate(reward, MOCK_REWARD_RATE, {"from": accounts[0]})
+        yield request.getfixturevalue("mock_gauge_factory")
 
-@pytest.fixture
-def balancer_minter():
+
+@pytest.fixture(scope="session")
+def balancer_minter(is_fork, request):
     address = "0x239e55F427D44C3cc793f49bFB507ebe76638a2b"
-    yield Contract(address)
+    yield Contract(address) if is_fork else request.getfixturevalue("mock_minter")
 
 
-@pytest.fixture
-def balWethPoolId():
-    yield 0x5c6ee304399dbdb9c8ef030ab642b10820db8f56000200000000000000000014
+def swap_pool_id(request, mainnet_id, token_in, token_out):
+    if request.getfixturevalue("is_fork"):
+        return mainnet_id
+    return util.mock_swap_pool(request.getfixturevalue("mock_balancer_vault"), [token_in, token_out],
+                               request.getfixturevalue("accounts")[0], request.getfixturevalue("MockERC20"),
+                               request.getfixturevalue("MockBalancerPool"))
 
 
-@pytest.fixture
-def wethTokenPoolId():
+@pytest.fixture(scope="session")
+def balWethPoolId(request, bal, weth):
+    yield swap_pool_id(request, 0x5c6ee304399dbdb9c8ef030ab642b10820db8f56000200000000000000000014, bal, weth)
+
+
+@pytest.fixture(scope="session")
+def wethTokenPoolId(request, weth, token):
     id = 0x96646936b91d6b9d7d0c47c496afbf3d6ec7b6f8000200000000000000000019  # weth-usdc
-    yield id
+    yield swap_pool_id(request, id, weth, token)
 
 
-@pytest.fixture
-def wethToken2PoolId():
+@pytest.fixture(scope="session")
+def wethToken2PoolId(request, weth, token2):
     id = 0x0b09dea16768f0799065c475be02919503cb2a3500020000000000000000001a  # weth-dai
-    yield id
+    yield swap_pool_id(request, id, weth, token2)
 
 
-@pytest.fixture
-def ldoWethPoolId():
+@pytest.fixture(scope="session")
+def ldoWethPoolId(request, ldo, weth):
     id = 0xbf96189eee9357a95c7719f4f5047f76bde804e5000200000000000000000087  # ldo-weth
-    yield id
+    yield swap_pool_id(request, id, ldo, weth)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def swapStepsBal(balWethPoolId, wethTokenPoolId, bal, weth, token):
     yield ([balWethPoolId, wethTokenPoolId], [bal, weth, token])
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def swapStepsLdo(ldoWethPoolId, wethTokenPoolId, ldo, weth, token):
     yield ([ldoWethPoolId, wethTokenPoolId], [ldo, weth, token])
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def swapStepsBal2(balWethPoolId, wethToken2PoolId, bal, weth, token2):
     yield ([balWethPoolId, wethToken2PoolId], [bal, weth, token2])
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def swapStepsLdo2(ldoWethPoolId, wethToken2PoolId, ldo, weth, token2):
     yield ([ldoWethPoolId, wethToken2PoolId], [ldo, weth, token2])
 
 
-@pytest.fixture
-def strategyFactory(strategist, keeper, vault, StrategyFactory, balancer_vault, gov, pool, gauge_factory, balancer_minter):
+@pytest.fixture(scope="session")
+def health_check(is_fork, accounts, web3, MockHealthCheck):
+    # strategies report to health.ychad.eth wherever they're deployed, locally it's given the mock's code
+    if not is_fork:
+        mock = accounts[0].deploy(MockHealthCheck)
+        web3.provider.make_request("evm_setAccountCode", [HEALTH_CHECK, web3.eth.get_code(mock.address).hex()])
+    yield Contract.from_abi("HealthCheck", HEALTH_CHECK, MockHealthCheck.abi)
+
+
+@pytest.fixture(scope="session")
+def strategyFactory(strategist, keeper, vault, StrategyFactory, balancer_vault, gov, pool, gauge_factory, balancer_minter,
+                    health_check):
     factory = strategist.deploy(StrategyFactory, vault, balancer_vault, pool, gauge_factory, balancer_minter, 5, 5, 1_000_000,
                                 2 * 60 * 60)
     yield factory
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def strategy(strategist, keeper, vault, Strategy, strategyFactory, gov, balancer_vault, gauge_factory, pool, bal, ldo,
              management, swapStepsBal,
              swapStepsLdo):
@@ -261,7 +407,140 @@ def strategy(strategist, keeper, vault, Strategy, strategyFactory, gov, balancer
     yield strategy
 
 
+@pytest.fixture
+def harvested():
+    # tests asking for this start with `amount` deposited and invested by a first harvest, see isolation
+    pass
+
+
 @pytest.fixture(scope="session")
 def RELATIVE_APPROX():
     # making this more lenient bc of single sided deposits incurring slippage
     yield 1e-3
+
+
+@pytest.fixture
+def multicall2(accounts):
+    # brownie deploys Multicall2 on first use, but that deployment doesn't survive snapshot reverts
+    from brownie import multicall
+    yield multicall.deploy({"from": accounts[0]})
+
+
+@pytest.fixture
+def orchard(accounts, MockMerkleOrchard):
+    yield accounts[0].deploy(MockMerkleOrchard)
+
+
+@pytest.fixture
+def rpc_counter(web3, monkeypatch):
+    counts = {}
+    make_request = web3.provider.make_request
+
+    def counting_request(method, params):
+        counts[method] = counts.get(method, 0) + 1
+        return make_request(method, params)
+
+    monkeypatch.setattr(web3.provider, "make_request", counting_request)
+    yield counts
+
+
+def pytest_addoption(parser):
+    parser.addoption("--update-gas-baseline", action="store_true",
+                     help="rewrite the gas baseline with the gas measured in this run")
+    parser.addoption("--gas-tolerance", type=float, default=0.05,
+                     help="relative gas increase over the baseline that fails a gas test")
+    parser.addoption("--fuzz-examples", type=int, default=200,
+                     help="examples the strategy state machine runs, each a fresh run of random steps")
+
+
+# local Balancer stand-ins, these need no network
+
+@pytest.fixture(scope="session")
+def local_only(is_fork):
+    # on a fork nothing deploys the mocks before the first snapshot, which would revert them away
+    if is_fork:
+        pytest.skip("runs against the local mocks")
+
+
+@pytest.fixture(scope="session")
+def mock_token(local_only, accounts, MockERC20):
+    yield accounts[0].deploy(MockERC20, "Mock USD Coin", "mUSDC", 6)
+
+
+@pytest.fixture(scope="session")
+def mock_token2(local_only, accounts, MockERC20):
+    yield accounts[0].deploy(MockERC20, "Mock Dai", "mDAI", 18)
+
+
+@pytest.fixture(scope="session")
+def mock_token3(local_only, accounts, MockERC20):
+    yield accounts[0].deploy(MockERC20, "Mock Tether", "mUSDT", 6)
+
+
+@pytest.fixture(scope="session")
+def mock_bal(local_only, accounts, MockERC20):
+    yield accounts[0].deploy(MockERC20, "Balancer", "BAL", 18)
+
+
+@pytest.fixture(scope="session")
+def mock_balancer_vault(local_only, accounts, MockBalancerVault):
+    yield accounts[0].deploy(MockBalancerVault)
+
+
+@pytest.fixture(scope="session")
+def mock_pool(accounts, mock_balancer_vault, mock_token, mock_token2, mock_token3, MockBalancerPool, MockERC20):
+    # laid out like staBAL3: DAI, USDC, USDT
+    tokens = [mock_token2, mock_token, mock_token3]
+    tx = mock_balancer_vault.createPool("Balancer USD Stable Pool", "staBAL3", tokens, {"from": accounts[0]})
+    pool = MockBalancerPool.at(tx.events["PoolCreated"]["pool"])
+    # deep enough that strategy deposits barely move it
+    amounts = [MOCK_LIQUIDITY * 10 ** token.decimals() for token in tokens]
+    util.mock_join(mock_balancer_vault, pool, amounts, accounts[0], MockERC20)
+    yield pool
+
+
+@pytest.fixture(scope="session")
+def mock_gauge_factory(local_only, accounts, MockGaugeFactory):
+    yield accounts[0].deploy(MockGaugeFactory)
+
+
+@pytest.fixture(scope="session")
+def mock_gauge(accounts, mock_gauge_factory, mock_pool, mock_minter, MockGauge):
+    tx = mock_gauge_factory.create(mock_pool, {"from": accounts[0]})
+    gauge = MockGauge.at(tx.events["GaugeCreated"]["gauge"])
+    gauge.setMinter(mock_minter, {"from": accounts[0]})
+    yield gauge
+
+
+@pytest.fixture(scope="session")
+def mock_minter(accounts, mock_bal, MockBalancerMinter):
+    yield accounts[0].deploy(MockBalancerMinter, mock_bal)
+
+
+@pytest.fixture
+def mock_vault(pm, gov, rewards, guardian, management, mock_token):
+    Vault = pm(config["dependencies"][0]).Vault
+    vault = guardian.deploy(Vault)
+    vault.initialize(mock_token, gov, rewards, "", "", guardian, management, {"from": gov})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.setManagement(management, {"from": gov})
+    vault.setManagementFee(0, {"from": gov})
+    yield vault
+
+
+@pytest.fixture
+def mock_amount(mock_token, user):
+    amount = 1_000_000 * 10 ** mock_token.decimals()
+    mock_token.mint(user, amount, {"from": user})
+    yield amount
+
+
+@pytest.fixture
+def mock_strategy(strategist, keeper, gov, mock_vault, mock_balancer_vault, mock_pool, mock_gauge, mock_gauge_factory,
+                  mock_minter, Strategy, health_check):
+    strategy = strategist.deploy(Strategy, mock_vault, mock_balancer_vault, mock_pool, mock_gauge_factory, mock_minter,
+                                 5, 5, 1_000_000, 2 * 60 * 60)
+    strategy.setKeeper(keeper, {"from": strategist})
+    mock_vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+    chain.sleep(1)
+    yield strategy
@@ -0,0 +1,74 @@
+import pytest
+from brownie import chain
+
+BASIS = 10_000
+# the join in front of each test leaves the pool long on want, so exits aren't discounted and only rounding is left
+RELATIVE_APPROX = 1e-5
+
+
+def _invest(mock_vault, mock_strategy, mock_token, user, strategist, mock_amount):
+    mock_token.approve(mock_vault, mock_amount, {"from": user})
+    mock_vault.deposit(mock_amount, {"from": user})
+    mock_strategy.harvest({"from": strategist})
+    chain.sleep(1)
+
+
+def _position(mock_strategy):
+    return mock_strategy.balanceOfStakedBpt() + mock_strategy.balanceOfUnstakedBpt()
+
+
+def test_partial_exit_with_profit(mock_vault, mock_strategy, mock_token, mock_pool, user, strategist, gov,
+                                  mock_amount):
+    _invest(mock_vault, mock_strategy, mock_token, user, strategist, mock_amount)
+    mock_pool.setRate(1_010 * 10 ** 15, {"from": user})
+    fees = mock_strategy.estimatedTotalAssets() - mock_vault.strategies(mock_strategy)["totalDebt"]
+    mock_vault.updateStrategyDebtRatio(mock_strategy, 5_000, {"from": gov})
+    outstanding = mock_vault.debtOutstanding(mock_strategy)
+    assert outstanding > 0
+
+    # the debt payment and the fees leave in one exit, the fees are the profit
+    report = mock_strategy.harvest({"from": strategist}).events["StrategyReported"]
+    assert report["debtPaid"] == outstanding
+    assert report["loss"] == 0
+    assert pytest.approx(report["gain"], rel=RELATIVE_APPROX) == fees
+
+
+def test_loss_with_debt_outstanding(mock_vault, mock_strategy, mock_token, mock_pool, user, strategist, gov,
+                                    mock_amount):
+    _invest(mock_vault, mock_strategy, mock_token, user, strategist, mock_amount)
+    mock_pool.setRate(900 * 10 ** 15, {"from": user})
+    value = mock_strategy.estimatedTotalAssets()
+    mock_vault.updateStrategyDebtRatio(mock_strategy, 0, {"from": gov})
+    outstanding = mock_vault.debtOutstanding(mock_strategy)
+
+    # the whole position can't cover the debt, what it falls short by is the loss and there's no fee to collect
+    report = mock_strategy.harvest({"from": strategist}).events["StrategyReported"]
+    assert report["gain"] == 0
+    assert pytest.approx(report["debtPaid"], rel=RELATIVE_APPROX) == value
+    assert report["debtPaid"] + report["loss"] == outstanding
+    assert _position(mock_strategy) == 0
+
+
+def test_harvest_draws_on_buffer(mock_vault, mock_strategy, mock_token, mock_pool, user, strategist, gov,
+                                 mock_amount):
+    _invest(mock_vault, mock_strategy, mock_token, user, strategist, mock_amount)
+    mock_strategy.setBufferBips(2_000, {"from": gov})
+    assert mock_strategy.balanceOfUnstakedBpt() == _position(mock_strategy) * 2_000 // BASIS
+    mock_pool.setRate(1_010 * 10 ** 15, {"from": user})
+    fees = mock_strategy.estimatedTotalAssets() - mock_vault.strategies(mock_strategy)["totalDebt"]
+    mock_vault.updateStrategyDebtRatio(mock_strategy, 9_000, {"from": gov})
+    outstanding = mock_vault.debtOutstanding(mock_strategy)
+    staked = mock_strategy.balanceOfStakedBpt()
+
+    # the buffer covers the debt payment and the fees, and inside the deposit period it isn't topped back up
+    report = mock_strategy.harvest({"from": strategist}).events["StrategyReported"]
+    assert report["debtPaid"] == outstanding
+    assert report["loss"] == 0
+    assert pytest.approx(report["gain"], rel=RELATIVE_APPROX) == fees
+    assert mock_strategy.balanceOfStakedBpt() == staked
+    assert mock_strategy.balanceOfUnstakedBpt() < _position(mock_strategy) * 2_000 // BASIS
+
+    # the first harvest after it is
+    chain.sleep(mock_strategy.minDepositPeriod() + 1)
+    mock_strategy.harvest({"from": strategist})
+    assert mock_strategy.balanceOfUnstakedBpt() == _position(mock_strategy) * 2_000 // BASIS
@@ -0,0 +1,122 @@
+import json
+from scripts.claim_cache import ClaimCache
+from scripts.merkle import REWARDS, scan_claimed, plan_claims, claim_gas
+from scripts import reports
+from scripts.executor import PipelinedExecutor
+
+
+def test_scan_claimed(accounts, orchard, multicall2, rpc_counter):
+    claimers = [a.address for a in accounts[:5]]
+    next_ids = [120, 40]
+    for (_, token, distributor, _), next_id in zip(REWARDS, next_ids):
+        orchard.setNextDistributionId(token, distributor, next_id)
+    bal_distributor = REWARDS[0][2]
+    bal = REWARDS[0][1]
+    orchard.setClaimed(bal, bal_distributor, 100, claimers[1])
+    orchard.setClaimed(bal, bal_distributor, 119, claimers[4])
+
+    rpc_counter.clear()
+    table = scan_claimed(orchard, claimers, since=60, chunk_size=100)
+
+    # (120 - 60) bal ids + (40 - 0) ldo ids for every claimer
+    assert len(table) == 5 * (60 + 40)
+    assert [key for key, claimed in table.items() if claimed] == [(claimers[1], bal, 100), (claimers[4], bal, 119)]
+    # one call for the next ids, then 500 lookups in chunks of 100 where an isClaimed each would be 500 calls
+    assert rpc_counter["eth_call"] == 1 + 5
+
+
+def test_scan_claimed_since(accounts, orchard, multicall2):
+    claimers = [accounts[0].address]
+    for (_, token, distributor, _) in REWARDS:
+        orchard.setNextDistributionId(token, distributor, 10)
+
+    table = scan_claimed(orchard, claimers, since={REWARDS[0][1]: 8, REWARDS[1][1]: 10})
+    assert sorted(table) == [(claimers[0], REWARDS[0][1], 8), (claimers[0], REWARDS[0][1], 9)]
+
+
+def test_scan_claimed_cache(accounts, orchard, multicall2, rpc_counter, tmp_path):
+    claimers = [a.address for a in accounts[:2]]
+    _, bal, bal_distributor, _ = REWARDS[0]
+    for (_, token, distributor, _) in REWARDS:
+        orchard.setNextDistributionId(token, distributor, 60)
+    for i in range(59):
+        orchard.setClaimed(bal, bal_distributor, i, claimers[0])
+
+    cache = ClaimCache(tmp_path / "claims.jsonl")
+    table = scan_claimed(orchard, claimers, rewards=REWARDS[:1], cache=cache)
+    assert sum(table.values()) == 59
+    assert len(cache) == 59
+
+    # a fresh process only asks about the 61 pairs that are still unclaimed
+    rpc_counter.clear()
+    cache = ClaimCache(tmp_path / "claims.jsonl")
+    assert table == scan_claimed(orchard, claimers, rewards=REWARDS[:1], chunk_size=1000, cache=cache)
+    assert rpc_counter["eth_call"] == 1 + 1
+
+    orchard.setClaimed(bal, bal_distributor, 59, claimers[0])
+    table = scan_claimed(orchard, claimers, rewards=REWARDS[:1], cache=cache)
+    assert table[(claimers[0], bal, 59)]
+    assert ClaimCache(tmp_path / "claims.jsonl").is_claimed(bal, bal_distributor, 59, claimers[0])
+
+
+def test_load_reports(tmp_path, monkeypatch):
+    ours = "0x3B7c81daa0F7C897b3e09352E1Ca2fBE93Ac234D"
+    for week in range(90, 97):
+        tokens_data = [{"address": address, "claim_amount": str(week * 10 ** 18), "hex_proof": ["0x01"]}
+                       for address in [ours, "0x000000000000000000000000000000000000dEaD"]]
+        with open(tmp_path / f"homestead_{week}.json", "w") as f:
+            json.dump({"config": {"offset": 20, "week": week}, "tokens_data": tokens_data}, f)
+
+    manifest = tmp_path / "manifest.json"
+    index = reports.load_reports("homestead_", tmp_path, claimers=[ours], manifest_path=manifest)
+    assert sorted(index) == [(week, ours) for week in range(90, 97)]
+    assert index[(96, ours)].distribution_id == 76
+    assert index[(96, ours)].claim_amount == 96 * 10 ** 18
+
+    def parse_report(path, claimers):
+        raise AssertionError(f"{path} should not be parsed again")
+
+    monkeypatch.setattr(reports, "parse_report", parse_report)
+    assert reports.load_reports("homestead_", tmp_path, claimers=[ours], manifest_path=manifest) == index
+
+
+def test_plan_claims(accounts, orchard):
+    claimers = [a.address for a in accounts[:2]]
+    _, bal, bal_distributor, _ = REWARDS[0]
+    _, ldo, ldo_distributor, _ = REWARDS[1]
+    unclaimed = [(claimer, bal, bal_distributor, reports.ReportEntry(week, week - 20, claimer, 10 ** 18, ["0x01"] * 14))
+                 for claimer in claimers for week in range(80, 100)]
+    unclaimed.append((claimers[0], ldo, ldo_distributor, reports.ReportEntry(96, 33, claimers[0], 10 ** 18, ["0x01"])))
+
+    # one call per claimer and token when the gas limit allows it
+    batches = plan_claims(unclaimed, gas_limit=10 ** 7)
+    assert [(b.claimer, b.token, len(b.claims)) for b in batches] == [(claimers[0], bal, 20), (claimers[1], bal, 20),
+                                                                        (claimers[0], ldo, 1)]
+
+    # split into size bounded batches otherwise
+    gas_limit = claim_gas(batches[0].claims[:8])
+    batches = plan_claims(unclaimed, gas_limit=gas_limit)
+    assert [len(b.claims) for b in batches] == [8, 8, 4, 8, 8, 4, 1]
+    assert all(b.gas <= gas_limit for b in batches)
+
+    for batch in batches:
+        orchard.claimDistributions(batch.claimer, batch.claims, [batch.token], {"from": accounts[0]})
+    assert all(orchard.isClaimed(token, distributor, entry.distribution_id, claimer)
+               for claimer, token, distributor, entry in unclaimed)
+
+
+def test_pipelined_claims(accounts, orchard):
+    claimers = [a.address for a in accounts[:5]]
+    _, bal, bal_distributor, _ = REWARDS[0]
+    unclaimed = [(claimer, bal, bal_distributor, reports.ReportEntry(96, 76, claimer, 10 ** 18, ["0x01"]))
+                 for claimer in claimers]
+
+    executor = PipelinedExecutor(accounts[9], max_in_flight=2, poll_interval=0.1)
+    nonce = accounts[9].nonce
+    for batch in plan_claims(unclaimed):
+        executor.submit(orchard.claimDistributions, batch.claimer, batch.claims, [batch.token])
+    submissions = executor.wait(timeout=60)
+
+    assert [s.nonce for s in submissions] == list(range(nonce, nonce + 5))
+    assert all(s.status == 1 for s in submissions)
+    assert all(orchard.isClaimed(bal, bal_distributor, 76, claimer) for claimer in claimers)
@@ -1,7 +1,10 @@
 import util
 import pytest
 import brownie
+import yaml
 import test_operation
+from scripts import clone_many
+from scripts.executor import PipelinedExecutor
 
 
 def test_clone(accounts, Strategy, strategy, strategist, rewards, keeper, token2, user, vault, vault2, amount2,
@@ -19,6 +22,20 @@ def test_clone(accounts, Strategy, strategy, strategist, rewards, keeper, token2
     with brownie.reverts("Strategy already initialized"):
         cloned_strategy.initialize(vault, strategist, rewards, keeper, balancer_vault, pool, gauge_factory, balancer_minter, 10, 10, 100_000,
                                    2 * 60 * 60, {'from': gov})
+    # the clone caches its own want's decimal scale, not the template's
+    rate = pool.getRate()
+    assert cloned_strategy.bptsToTokens(10 ** 18) == rate // 10 ** (18 - token2.decimals())
+    assert cloned_strategy.tokensToBpts(10 ** token2.decimals()) == 10 ** (18 + token2.decimals()) // rate * 10 ** (
+        18 - token2.decimals())
+    for param in ("maxSlippageIn", "maxSlippageOut", "minDepositPeriod", "toggles", "keepBips", "maxSlippageRewards"):
+        assert getattr(cloned_strategy, param)() == getattr(strategy, param)()
+    # maxSingleDeposit is scaled once, to each clone's want
+    assert cloned_strategy.maxSingleDeposit() == strategyFactory.maxSingleDeposit() * 10 ** token2.decimals()
+    same_want = Strategy.at(strategyFactory.clone(vault, strategist, rewards, keeper, pool).return_value)
+    assert same_want.maxSingleDeposit() == strategy.maxSingleDeposit()
+    # past what params can hold reverts rather than saturating
+    with brownie.reverts("maxSingleDeposit too high"):
+        strategist.deploy(Strategy, vault, balancer_vault, pool, gauge_factory, balancer_minter, 5, 5, 2 ** 96, 7200)
     cloned_strategy.setKeeper(keeper, {'from': gov})
     cloned_strategy.whitelistRewards(bal, swapStepsBal2, {'from': management})
     cloned_strategy.whitelistRewards(ldo, swapStepsLdo2, {'from': management})
@@ -28,3 +45,84 @@ def test_clone(accounts, Strategy, strategy, strategist, rewards, keeper, token2
     test_operation.test_profitable_harvest(
         chain, token2, vault2, cloned_strategy, user, strategist, amount2, RELATIVE_APPROX, bal, bal_whale, ldo,
         ldo_whale, management)
+
+
+def test_clone_many(Strategy, strategyFactory, strategist, rewards, keeper, vault2, pool, gov, bal, ldo,
+                    swapStepsBal2, swapStepsLdo2, tmp_path):
+    routes = [{"token": token.address, "pool_ids": steps[0], "assets": [str(a) for a in steps[1]]}
+              for token, steps in ((bal, swapStepsBal2), (ldo, swapStepsLdo2))]
+    manifest = {
+        "factory": strategyFactory.address,
+        "defaults": {"strategist": strategist.address, "rewards": rewards.address, "keeper": keeper.address},
+        "clones": [
+            {"vault": vault2.address, "pool": pool.address, "reward_routes": routes},
+            {"vault": vault2.address, "pool": pool.address},
+        ],
+    }
+    path = tmp_path / "clones.yml"
+    path.write_text(yaml.safe_dump(manifest))
+
+    clones = [Strategy.at(c) for c in clone_many.clone_many(clone_many.load_manifest(path), strategist)]
+    assert len(clones) == 2
+    assert [clones[0].rewardTokens(i) for i in range(2)] == [bal, ldo]
+    assert clones[1].numRewards() == 0
+    for clone in clones:
+        assert clone.vault() == vault2
+        # the factory listed the rewards and let go of the clone
+        assert clone.creator() == brownie.ZERO_ADDRESS
+
+    # only managers list rewards from then on
+    with brownie.reverts():
+        clones[1].whitelistRewards(bal, swapStepsBal2, {"from": strategist})
+    with brownie.reverts("!creator"):
+        clones[1].renounceCreator({"from": strategist})
+    vault2.addStrategy(clones[1], 0, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+    clones[1].whitelistRewards(bal, swapStepsBal2, {"from": gov})
+    assert clones[1].numRewards() == 1
+
+    del manifest["defaults"]
+    with pytest.raises(ValueError):
+        clone_many.clone_params(manifest)
+
+
+def test_clone_deterministic(Strategy, strategyFactory, strategist, rewards, keeper, vault2, pool, gov, bal, ldo,
+                             swapStepsBal2, swapStepsLdo2):
+    salt = clone_many.salt_bytes("dai-stabal3")
+    predicted = clone_many.predict_clone(strategyFactory.address, strategyFactory.original(), strategist.address,
+                                         "dai-stabal3")
+    assert strategyFactory.predictDeterministicAddress(strategist, salt) == predicted
+    # salts are bound to whoever clones with them
+    assert strategyFactory.predictDeterministicAddress(rewards, salt) != predicted
+
+    tx = strategyFactory.cloneDeterministic(vault2, strategist, rewards, keeper, pool, [bal, ldo],
+                                            [swapStepsBal2, swapStepsLdo2], salt, {"from": strategist})
+    assert tx.return_value == tx.events["Cloned"]["clone"] == predicted
+    assert Strategy.at(predicted).vault() == vault2
+    assert [Strategy.at(predicted).rewardTokens(i) for i in range(2)] == [bal, ldo]
+    with brownie.reverts("salt used"):
+        strategyFactory.cloneDeterministic(vault2, strategist, rewards, keeper, pool, [], [], salt,
+                                           {"from": strategist})
+    with brownie.reverts("!rewards"):
+        strategyFactory.cloneDeterministic(vault2, strategist, rewards, keeper, pool, [bal], [], salt,
+                                           {"from": rewards})
+
+
+def test_rollout(Strategy, strategyFactory, strategist, rewards, keeper, vault2, pool, bal, ldo, swapStepsBal2,
+                 swapStepsLdo2):
+    routes = [{"token": token.address, "pool_ids": steps[0], "assets": [str(a) for a in steps[1]]}
+              for token, steps in ((bal, swapStepsBal2), (ldo, swapStepsLdo2))]
+    manifest = {
+        "factory": strategyFactory.address,
+        "defaults": {"strategist": strategist.address, "rewards": rewards.address, "keeper": keeper.address},
+        "clones": [{"vault": vault2.address, "pool": pool.address, "salt": f"clone-{i}", "reward_routes": routes}
+                   for i in range(2)],
+    }
+
+    # one transaction a clone, its rewards listed by the factory, so any account can roll out
+    executor = PipelinedExecutor(strategist, poll_interval=0.1)
+    clones = clone_many.rollout(manifest, strategist, executor)
+    submissions = executor.wait()
+    assert len(submissions) == 2
+    assert all(s.tx.status == 1 for s in submissions)
+    for address in clones:
+        assert [Strategy.at(address).rewardTokens(i) for i in range(2)] == [bal, ldo]
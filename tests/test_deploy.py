@@ -0,0 +1,62 @@
+from scripts import clone_many, deploy
+
+
+def test_deploy_run(strategyFactory, strategist, rewards, keeper, vault2, token2, pool, gov, bal, ldo, swapStepsBal2,
+                    swapStepsLdo2):
+    routes = [{"token": token.address, "pool_ids": steps[0], "assets": [str(a) for a in steps[1]]}
+              for token, steps in ((bal, swapStepsBal2), (ldo, swapStepsLdo2))]
+    params = {"max_slippage_in": 10, "max_slippage_out": 20, "max_single_deposit": 50_000, "min_deposit_period": 3600}
+    config = {
+        "factory": strategyFactory.address,
+        "defaults": {"strategist": strategist.address, "rewards": rewards.address, "keeper": keeper.address},
+        "clones": [
+            {"vault": vault2.address, "pool": pool.address, "reward_routes": routes, "params": params},
+            {"vault": vault2.address, "pool": pool.address},
+        ],
+    }
+
+    strategies, problems = deploy.run(config, gov)
+    assert problems == {}
+    assert strategies[0].maxSingleDeposit() == 50_000 * 10 ** token2.decimals()
+    assert strategies[0].numRewards() == 2 and strategies[1].numRewards() == 0
+
+    # anything changed after the run shows up on the next verification
+    strategies[0].setParams(10, 20, 1, 3600, {"from": gov})
+    problems = deploy.verify(strategies, clone_many.clone_entries(config))
+    assert list(problems) == [strategies[0].address]
+    assert "params" in problems[strategies[0].address][0]
+
+
+def test_verify_default_routes(strategyFactory, strategist, rewards, keeper, vault2, pool, gov, bal, swapStepsBal2):
+    # reward routes given once for every clone are checked on every clone
+    route = {"token": bal.address, "pool_ids": swapStepsBal2[0], "assets": [str(a) for a in swapStepsBal2[1]]}
+    config = {
+        "factory": strategyFactory.address,
+        "defaults": {"strategist": strategist.address, "rewards": rewards.address, "keeper": keeper.address,
+                     "reward_routes": [route]},
+        "clones": [{"vault": vault2.address, "pool": pool.address}],
+    }
+    strategies, problems = deploy.run(config, gov)
+    assert problems == {} and strategies[0].numRewards() == 1
+
+    del config["defaults"]["reward_routes"]
+    assert "rewards" in deploy.verify(strategies, clone_many.clone_entries(config))[strategies[0].address][0]
+
+
+def test_default_params(strategyFactory, strategist, rewards, keeper, vault2, token2, pool, gov, weth,
+                        wethToken2PoolId):
+    # params and ethToWant routes given once for every clone are set on every clone
+    params = {"max_slippage_in": 10, "max_slippage_out": 20, "max_single_deposit": 50_000, "min_deposit_period": 3600}
+    route = {"pool_ids": [wethToken2PoolId], "assets": [weth.address, token2.address]}
+    config = {
+        "factory": strategyFactory.address,
+        "defaults": {"strategist": strategist.address, "rewards": rewards.address, "keeper": keeper.address,
+                     "params": params, "eth_to_want_route": route},
+        "clones": [{"vault": vault2.address, "pool": pool.address}] * 2,
+    }
+    strategies, problems = deploy.run(config, gov)
+    assert problems == {}
+    for strategy in strategies:
+        assert strategy.maxSingleDeposit() == 50_000 * 10 ** token2.decimals()
+        assert strategy.minDepositPeriod() == 3600
+        assert strategy.ethToWant(10 ** 18) > 0
@@ -0,0 +1,62 @@
+import pytest
+from scripts.deposit_planner import apply, best, candidates, plan, simulate
+from scripts.stable_math import StablePool, invariant
+
+BACKLOG = 5_000_000 * 10 ** 18
+
+
+@pytest.fixture
+def stable_pool():
+    # a balanced 3 token pool holding 30M of each, dai first
+    return StablePool(["dai", "usdc", "usdt"], [30e24, 30e12, 30e12], [1, 1e12, 1e12], 200_000, 0.0001, 89e24)
+
+
+def test_plan_schedules(stable_pool):
+    rate = invariant(stable_pool.amp, stable_pool.balances) / stable_pool.bpt_supply * 1e18
+    chunks, periods = candidates(BACKLOG)
+    assert len(chunks) == 5_000
+
+    plans = {}
+    for gas_cost in (0, 50 * 10 ** 18, 5_000 * 10 ** 18):
+        results = simulate(stable_pool, 0, BACKLOG, chunks, periods, rate, 18, 5, gas_cost)
+        plans[gas_cost] = best(chunks, periods, results)
+    # the dearer a tend, the fewer and larger the joins
+    assert plans[0].chunks > plans[50 * 10 ** 18].chunks > plans[5_000 * 10 ** 18].chunks == 1
+    assert plans[0].slippage < plans[50 * 10 ** 18].slippage < plans[5_000 * 10 ** 18].slippage
+
+    # schedules are independent of the batch they're simulated in
+    some = slice(0, 5_000, 700)
+    batched = simulate(stable_pool, 0, BACKLOG, chunks[some], periods[some], rate, 18, 5, 50 * 10 ** 18)
+    for i, cost in zip(range(*some.indices(5_000)), batched["cost"]):
+        alone = simulate(stable_pool, 0, BACKLOG, chunks[i:i + 1], periods[i:i + 1], rate, 18, 5, 50 * 10 ** 18)
+        assert alone["cost"][0] == pytest.approx(cost)
+
+    # a rate 1% under what joins actually pay trips the guard for any chunk size
+    results = simulate(stable_pool, 0, BACKLOG, chunks, periods, rate / 1.01, 18, 5, 0)
+    assert not results["ok"].any()
+    assert best(chunks, periods, results) is None
+
+
+@pytest.mark.fork
+def test_plan_apply(chain, token, vault, strategy, user, strategist, gov, amount, pool, balancer_vault, multicall2):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": strategist})
+
+    recommended = plan(strategy, pool, balancer_vault, gas_cost=50 * 10 ** token.decimals())
+    assert recommended is not None
+    apply(strategy, recommended, gov)
+    assert strategy.maxSingleDeposit() == recommended.max_single_deposit
+    assert strategy.minDepositPeriod() == recommended.min_deposit_period
+
+    tends = 0
+    chain.sleep(strategy.minDepositPeriod() + 1)
+    chain.mine(1)
+    while strategy.tendTrigger(0):
+        strategy.tend({"from": strategist})
+        tends += 1
+        chain.sleep(strategy.minDepositPeriod() + 1)
+        chain.mine(1)
+    assert tends == recommended.chunks
+    assert strategy.balanceOfWant() == 0
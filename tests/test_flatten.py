@@ -0,0 +1,42 @@
+import json
+from brownie import Strategy, StrategyFactory
+from eth_abi import decode_abi
+from scripts import flatten
+from scripts.indexer import EventIndexer
+
+
+def test_flatten_cached(tmp_path):
+    paths = {"build_path": tmp_path / "contracts", "bundle_path": tmp_path / "verification",
+             "cache_path": tmp_path / "flatten.json"}
+    assert flatten.flatten([Strategy, StrategyFactory], **paths) == ["Strategy", "StrategyFactory"]
+    bundle = json.loads((tmp_path / "verification" / "Strategy.json").read_text())
+    assert bundle["contract_name"] == "Strategy"
+    assert "sources" in bundle["standard_json_input"]
+
+    # nothing changed, nothing rebuilt, until an artifact goes missing or it's forced
+    assert flatten.flatten([Strategy, StrategyFactory], **paths) == []
+    (tmp_path / "contracts" / "StrategyFactoryFlat.sol").unlink()
+    assert flatten.flatten([Strategy, StrategyFactory], **paths) == ["StrategyFactory"]
+    assert flatten.flatten([Strategy], force=True, **paths) == ["Strategy"]
+
+
+def test_flatten_workers(tmp_path):
+    # the same artifacts built on threads as one at a time
+    serial, threaded = tmp_path / "serial", tmp_path / "threaded"
+    for path, workers in ((serial, 1), (threaded, 4)):
+        assert flatten.flatten([Strategy, StrategyFactory], build_path=path / "contracts",
+                               bundle_path=path / "verification", cache_path=path / "flatten.json",
+                               workers=workers) == ["Strategy", "StrategyFactory"]
+    for name in ("contracts/StrategyFlat.sol", "verification/StrategyFactory.json"):
+        assert (serial / name).read_text() == (threaded / name).read_text()
+
+
+def test_clone_implementation(strategyFactory, vault, strategy, gov, tmp_path):
+    # read from the factory's deployment, so changing the template's params doesn't change them
+    strategy.setParams(1, 2, 3, 4, {"from": gov})
+    details = flatten.clone_implementation(strategyFactory, strategyFactory.tx.block_number,
+                                           indexer=EventIndexer(tmp_path / "events.sqlite"))
+    assert details["address"] == strategyFactory.original()
+    arguments = decode_abi(flatten.STRATEGY_CONSTRUCTOR, bytes.fromhex(details["constructor_arguments"]))
+    assert arguments[0].lower() == vault.address.lower()
+    assert arguments[5:] == (5, 5, 1_000_000, 2 * 60 * 60)
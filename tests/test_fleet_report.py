@@ -0,0 +1,113 @@
+import pytest
+from scripts import fleet_report, logs
+from scripts.indexer import EventIndexer
+from scripts.cli import flag
+
+
+def test_fleet_report(chain, token, vault, vault2, strategy, strategyFactory, strategist, rewards, keeper, user, amount,
+                      pool, gov, multicall2, tmp_path, rpc_counter):
+    indexer = EventIndexer(tmp_path / "events.sqlite")
+    start_block = chain.height - 10
+    clone = strategyFactory.clone(vault2, strategist, rewards, keeper, pool).return_value
+
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": strategist})
+    chain.sleep(3600 * 24 * 7)
+    strategy.harvest({"from": strategist})
+
+    strategies = fleet_report.discover([strategyFactory.address], chain.height, start_block, indexer)
+    assert strategies == [strategy.address, clone]
+
+    rows = fleet_report.fleet([strategy.address], chain.height, start_block, indexer)
+    assert rows[0]["harvests"] == 2
+    assert rows[0]["apr"] is not None
+    assert set(rows[0]["pendingRewards"]) == {"BAL", "LDO"}
+    fleet_report.print_table(rows)
+
+    # rerunning, even from a fresh process, only fetches the unconfirmed tail again, one query for each of the
+    # Deployed and Cloned streams
+    rpc_counter.clear()
+    indexer = EventIndexer(tmp_path / "events.sqlite")
+    fleet_report.discover([strategyFactory.address], chain.height, start_block, indexer)
+    assert rpc_counter.get("eth_getLogs", 0) == 2
+    assert fleet_report.discover([strategyFactory.address], chain.height, start_block, indexer) == strategies
+    assert len(indexer.reports(strategy.address)) == 2
+
+
+class _LimitedEvent:
+    # stands in for a web3 event on a node that refuses queries over `limit` blocks
+    def __init__(self, limit):
+        self.limit = limit
+        self.queries = []
+
+    def getLogs(self, fromBlock, toBlock, argument_filters):
+        if toBlock - fromBlock + 1 > self.limit:
+            raise ValueError("query returned more than 10000 results")
+        self.queries.append((fromBlock, toBlock))
+        return []
+
+
+def test_event_windows_shrink():
+    event = _LimitedEvent(1_000)
+    windows = list(logs.iter_event_windows(event, 0, 9_999, block_range=50_000))
+    assert windows[0][:2] == (0, 780)
+    assert windows[-1][1] == 9_999
+    assert all(end - start < 1_000 for start, end, _ in windows)
+    # consecutive windows leave no gaps
+    assert all(a[1] + 1 == b[0] for a, b in zip(windows, windows[1:]))
+
+    with pytest.raises(ValueError):
+        list(logs.iter_event_windows(_LimitedEvent(0), 0, 10))
+
+
+class _ReplayedEvent:
+    # stands in for a web3 event whose logs every query returns again, as an overlapping stream or a refetch would
+    def __init__(self, *logs):
+        self.logs = logs
+
+    def getLogs(self, fromBlock, toBlock, argument_filters):
+        return [{"event": "Cloned", "address": "0xfactory", "blockNumber": block, "transactionHash": tx * 32,
+                 "logIndex": 3, "args": {"clone": clone}} for block, tx, clone in self.logs
+                if fromBlock <= block <= toBlock]
+
+
+def test_indexer_stores_each_log_once(tmp_path):
+    indexer = EventIndexer(tmp_path / "events.sqlite")
+    indexer.sync("a", _ReplayedEvent((5, b"\x01", "0xclone")), 0, 10, block_range=2)
+    indexer.sync("b", _ReplayedEvent((5, b"\x01", "0xclone")), 0, 10)
+    assert indexer.db.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 1
+    assert [e["args"]["clone"] for e in indexer.events(event="Cloned")] == ["0xclone"]
+
+
+def test_indexer_refetches_unconfirmed_blocks(tmp_path):
+    indexer = EventIndexer(tmp_path / "events.sqlite", confirmations=5)
+    indexer.sync("a", _ReplayedEvent((2, b"\x01", "0xold"), (8, b"\x02", "0xorphaned")), 0, 10)
+    assert indexer.next_block("a") == 6
+
+    # a reorg replaced the log at block 8 and added one at 9, confirmed blocks aren't fetched again
+    indexer.sync("a", _ReplayedEvent((8, b"\x03", "0xreplacement"), (9, b"\x04", "0xnew")), 0, 12)
+    assert [e["args"]["clone"] for e in indexer.events(event="Cloned")] == ["0xold", "0xreplacement", "0xnew"]
+    assert indexer.next_block("a") == 8
+
+    # and one that dropped the log at 9 altogether
+    indexer.sync("a", _ReplayedEvent((8, b"\x03", "0xreplacement")), 0, 12)
+    assert [e["args"]["clone"] for e in indexer.events(event="Cloned")] == ["0xold", "0xreplacement"]
+
+
+def test_flag():
+    assert all(flag(v) for v in (True, "true", "True", "1", 1, "yes"))
+    assert not any(flag(v) for v in (False, None, "false", "0", 0, "no", ""))
+
+
+def test_pending_bal(accounts, mock_gauge, mock_minter, mock_bal, multicall2):
+    strategy = accounts[1].address
+    state = {strategy: {"rewards": [mock_bal.address]}}
+    mock_gauge.setIntegrateFraction(strategy, 5 * 10 ** 18, {"from": accounts[0]})
+    assert fleet_report.pending_rewards([strategy], [mock_gauge.address], [mock_minter.address], state) == [
+        {mock_bal.address: 5 * 10 ** 18}]
+
+    mock_minter.mint(mock_gauge, {"from": accounts[1]})
+    assert fleet_report.pending_rewards([strategy], [mock_gauge.address], [mock_minter.address], state) == [
+        {mock_bal.address: 0}]
@@ -0,0 +1,167 @@
+import pytest
+from brownie import chain, rpc
+from brownie.exceptions import VirtualMachineError
+from brownie.test import strategy as st
+import util
+
+BASIS = 10_000
+# want units lost to floor division converting between 6 decimals want and 18 decimals bpt, per conversion chain
+DUST = 10
+# reverts that are the strategy refusing to realize more than its slippage limits allow, not bugs
+SLIPPAGE_REVERTS = ("BAL#208", "BAL#505")
+
+
+class StrategyMachine:
+    """
+    Deposits, withdraws, debt ratio and withdraw buffer changes, pool unbalancing whale swaps, reward airdrops and bpt
+    rate bumps in random order against a strategy on the mock Balancer stack, checking after each step that
+    liquidations never realize more loss than maxSlippageOut allows, and that estimatedTotalAssets stays what the
+    position can be exited for.
+    """
+
+    st_slippage = st("uint256", min_value=1, max_value=500)
+    st_depositor = st("uint256", max_value=1)
+    st_deposit = st("uint256", min_value=1, max_value=5 * 10 ** 16)
+    st_percent = st("uint256", min_value=1, max_value=100)
+    st_debt_ratio = st("uint256", max_value=BASIS)
+    st_token_index = st("uint256", max_value=2)
+    st_swap_bips = st("uint256", min_value=1, max_value=3_000)
+    st_airdrop = st("uint256", min_value=1, max_value=10 ** 24)
+    st_rate_bips = st("uint256", min_value=1, max_value=100)
+    st_amount = st("uint256", max_value=10 ** 24)
+    st_buffer_bips = st("uint256", max_value=BASIS)
+
+    def __init__(cls, vault, strategy, token, mock_balancer_vault, mock_pool, mock_gauge, reward, depositors, whale,
+                 strategist, gov, MockERC20):
+        cls.vault = vault
+        cls.strategy = strategy
+        cls.token = token
+        cls.balancer_vault = mock_balancer_vault
+        cls.pool = mock_pool
+        cls.gauge = mock_gauge
+        cls.reward = reward
+        cls.depositors = depositors
+        cls.whale = whale
+        cls.strategist = strategist
+        cls.gov = gov
+        cls.pool_tokens = [MockERC20.at(address) for address in mock_balancer_vault.getPoolTokens(mock_pool.getPoolId())[0]]
+
+    def initialize_slippage(self, slippage_in="st_slippage", slippage_out="st_slippage"):
+        self.strategy.setParams(slippage_in, slippage_out, 10 ** 24, 0, {"from": self.gov})
+
+    def rule_deposit(self, depositor="st_depositor", amount="st_deposit"):
+        account = self.depositors[depositor]
+        self.token.mint(account, amount, {"from": account})
+        self.token.approve(self.vault, amount, {"from": account})
+        self.vault.deposit(amount, {"from": account})
+
+    def rule_withdraw(self, depositor="st_depositor", percent="st_percent"):
+        account = self.depositors[depositor]
+        shares = self.vault.balanceOf(account) * percent // 100
+        if shares == 0:
+            return
+        price = self.vault.pricePerShare()
+        value = shares * price // 10 ** self.vault.decimals()
+        balance = self.token.balanceOf(account)
+        try:
+            self.vault.withdraw(shares, account, BASIS, {"from": account})
+        except VirtualMachineError as e:
+            assert e.revert_msg in SLIPPAGE_REVERTS
+            return
+
+        # the withdrawer alone pays for liquidating, and never more than maxSlippageOut of what they withdrew
+        received = self.token.balanceOf(account) - balance
+        assert received >= value * (BASIS - self.strategy.maxSlippageOut()) // BASIS - DUST
+        if self.vault.totalSupply() > 0:
+            assert self.vault.pricePerShare() >= price - 1
+
+    def rule_debt_ratio(self, ratio="st_debt_ratio"):
+        self.vault.updateStrategyDebtRatio(self.strategy, ratio, {"from": self.gov})
+
+    def rule_harvest(self):
+        outstanding = self.vault.debtOutstanding(self.strategy)
+        try:
+            tx = self.strategy.harvest({"from": self.strategist})
+        except VirtualMachineError as e:
+            assert e.revert_msg in SLIPPAGE_REVERTS
+            return
+        # paying back debt can't lose more than the slippage allowed on the bpt sold for it
+        loss = tx.events["StrategyReported"]["loss"]
+        assert loss <= outstanding * self.strategy.maxSlippageOut() // BASIS + DUST
+
+    def rule_whale_swap(self, token_in="st_token_index", token_out="st_token_index", bips="st_swap_bips"):
+        if token_in == token_out:
+            return
+        token_in, token_out = self.pool_tokens[token_in], self.pool_tokens[token_out]
+        pool_id = self.pool.getPoolId()
+        balances = dict(zip(*self.balancer_vault.getPoolTokens(pool_id)[:2]))
+        amount_out = balances[token_out.address] * bips // BASIS
+        amount_in = amount_out * 10 ** token_in.decimals() // 10 ** token_out.decimals()
+        if amount_in == 0:
+            return
+        token_in.mint(self.whale, amount_in, {"from": self.whale})
+        token_in.approve(self.balancer_vault, amount_in, {"from": self.whale})
+        self.balancer_vault.swap((pool_id, 0, token_in, token_out, amount_in, b""),
+                                 (self.whale, False, self.whale, False), 0, 2 ** 256 - 1, {"from": self.whale})
+
+    def rule_airdrop(self, amount="st_airdrop"):
+        self.gauge.setClaimable(self.strategy, self.reward, amount, {"from": self.whale})
+        util.quote_rewards(self.strategy, self.gov, amount)
+
+    def rule_trading_fees(self, bips="st_rate_bips"):
+        self.pool.setRate(self.pool.getRate() * (BASIS + bips) // BASIS, {"from": self.whale})
+
+    def rule_buffer(self, bips="st_buffer_bips"):
+        self.strategy.setBufferBips(bips, {"from": self.gov})
+
+    def rule_conversions(self, amount="st_amount"):
+        # converting want to bpt and back rounds down, it never makes value up
+        tokens = self.strategy.bptsToTokens(self.strategy.tokensToBpts(amount))
+        assert amount - DUST <= tokens <= amount
+
+    def rule_exit_everything(self):
+        # exits the whole position in a throwaway snapshot, to hold estimatedTotalAssets to what it's worth
+        total = self.strategy.estimatedTotalAssets()
+        snapshot = rpc.snapshot()
+        try:
+            staked = self.strategy.balanceOfStakedBpt()
+            if staked > 0:
+                self.strategy.unstakeBpt(staked, {"from": self.gov})
+            try:
+                self.strategy.sellBpt(self.strategy.balanceOfUnstakedBpt(), {"from": self.gov})
+            except VirtualMachineError as e:
+                assert e.revert_msg in SLIPPAGE_REVERTS
+                return
+            realized = self.strategy.balanceOfWant()
+            assert realized <= total + DUST
+            assert realized >= total * (BASIS - self.strategy.maxSlippageOut()) // BASIS - DUST
+        finally:
+            chain._revert(snapshot)
+
+    def invariant_accounting(self):
+        strategy = self.strategy
+        bpts = strategy.balanceOfStakedBpt() + strategy.balanceOfUnstakedBpt()
+        assert strategy.estimatedTotalAssets() == strategy.balanceOfWant() + strategy.bptsToTokens(bpts)
+
+    def invariant_staked(self):
+        # every bpt the strategy doesn't sell straight away or keep in its withdraw buffer earns in the gauge
+        strategy = self.strategy
+        unstaked = strategy.balanceOfUnstakedBpt()
+        assert unstaked <= (unstaked + strategy.balanceOfStakedBpt()) * strategy.bufferBips() // BASIS + DUST
+
+
+def test_fuzz_strategy(request, is_fork, accounts, mock_vault, mock_strategy, mock_token, mock_balancer_vault,
+                       mock_pool, mock_gauge, strategist, gov, MockERC20, MockBalancerPool, state_machine):
+    if is_fork:
+        pytest.skip("fuzzes the local mock stack")
+    reward = accounts[0].deploy(MockERC20, "Mock Reward", "mRWD", 18)
+    route = util.mock_swap_pool(mock_balancer_vault, [reward, mock_token], accounts[0], MockERC20, MockBalancerPool)
+    mock_strategy.whitelistRewards(reward, ([route], [reward, mock_token]), {"from": gov})
+
+    settings = {
+        "max_examples": request.config.getoption("--fuzz-examples"),
+        "stateful_step_count": 20,
+        "deadline": None,
+    }
+    state_machine(StrategyMachine, mock_vault, mock_strategy, mock_token, mock_balancer_vault, mock_pool, mock_gauge,
+                  reward, [accounts[0], accounts[8]], accounts[9], strategist, gov, MockERC20, settings=settings)
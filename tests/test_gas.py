@@ -0,0 +1,151 @@
+import json
+from pathlib import Path
+import pytest
+from brownie import chain
+from scripts import gas_profile
+import util
+
+BASELINE_PATH = Path(__file__).parent / "gas_baseline.json"
+REWARD_AMOUNT = 1_000 * 10 ** 18
+
+
+@pytest.fixture(scope="session")
+def gas_baseline(request):
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    measured = {}
+    yield baseline, measured
+    # only rewritten on request, reread so parallel workers don't drop each other's scenarios
+    if request.config.getoption("--update-gas-baseline") and measured:
+        current = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+        BASELINE_PATH.write_text(json.dumps({**current, **measured}, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.fixture
+def check_gas(request, gas_baseline):
+    baseline, measured = gas_baseline
+    tolerance = request.config.getoption("--gas-tolerance")
+    update = request.config.getoption("--update-gas-baseline")
+
+    def check(scenario, tx):
+        current = gas_profile.profile(tx)
+        measured[scenario] = current
+        gas_profile.print_profile(current, limit=10)
+        if update:
+            return
+        if not BASELINE_PATH.exists():
+            pytest.skip(f"no {BASELINE_PATH.name} in this checkout, record one with --update-gas-baseline")
+        assert scenario in baseline, f"{scenario} has no gas baseline, record it with --update-gas-baseline"
+        found = gas_profile.regressions(current, baseline[scenario], tolerance)
+        assert not found, f"{scenario} gas regressed:\n" + "\n".join(found)
+
+    yield check
+
+
+@pytest.fixture
+def mock_routes(accounts, mock_balancer_vault, mock_token, MockERC20, MockBalancerPool):
+    # hop tokens shared by every route, and one pool per pair of tokens that are swapped
+    account = accounts[0]
+    hop_tokens = [account.deploy(MockERC20, f"Mock Hop {i}", f"mHOP{i}", 18) for i in range(3)]
+    pools = {}
+
+    def pool_id(token_in, token_out):
+        if (token_in, token_out) not in pools:
+            pools[(token_in, token_out)] = util.mock_swap_pool(mock_balancer_vault, [token_in, token_out], account,
+                                                               MockERC20, MockBalancerPool)
+        return pools[(token_in, token_out)]
+
+    def route(reward, hops):
+        path = [reward, *hop_tokens[:hops - 1], mock_token]
+        return [pool_id(a, b) for a, b in zip(path, path[1:])], path
+
+    yield route
+
+
+def _invest(mock_vault, mock_strategy, mock_token, user, strategist, gov, mock_amount, staked):
+    mock_token.approve(mock_vault, mock_amount, {"from": user})
+    mock_vault.deposit(mock_amount, {"from": user})
+    mock_strategy.harvest({"from": strategist})
+    if not staked:
+        mock_strategy.unstakeBpt(mock_strategy.balanceOfStakedBpt(), {"from": gov})
+    chain.sleep(mock_strategy.minDepositPeriod() + 1)
+    chain.mine(1)
+
+
+@pytest.mark.parametrize("staked", [True, False])
+@pytest.mark.parametrize("hops", [1, 2, 3, 4])
+@pytest.mark.parametrize("num_rewards", [0, 1, 2, 3, 4, 5])
+def test_harvest_gas(accounts, mock_vault, mock_strategy, mock_token, mock_pool, mock_gauge, mock_routes, user,
+                     strategist, gov, mock_amount, MockERC20, check_gas, num_rewards, hops, staked):
+    for i in range(num_rewards):
+        reward = accounts[0].deploy(MockERC20, f"Mock Reward {i}", f"mRWD{i}", 18)
+        mock_strategy.whitelistRewards(reward, mock_routes(reward, hops), {"from": gov})
+    _invest(mock_vault, mock_strategy, mock_token, user, strategist, gov, mock_amount, staked)
+
+    # rewards to claim and sell, and trading fees to collect
+    for i in range(num_rewards):
+        mock_gauge.setClaimable(mock_strategy, mock_strategy.rewardTokens(i), REWARD_AMOUNT, {"from": user})
+    util.quote_rewards(mock_strategy, gov, REWARD_AMOUNT)
+    mock_pool.setRate(1_001 * 10 ** 15, {"from": user})
+
+    tx = mock_strategy.harvest({"from": strategist})
+    assert tx.events["StrategyReported"]["gain"] > 0
+    check_gas(f"harvest-{num_rewards}rewards-{hops}hops-{'staked' if staked else 'unstaked'}", tx)
+
+
+@pytest.mark.parametrize("staked", [True, False])
+def test_tend_gas(mock_vault, mock_strategy, mock_token, user, strategist, keeper, gov, mock_amount, check_gas,
+                  staked):
+    _invest(mock_vault, mock_strategy, mock_token, user, strategist, gov, mock_amount, staked)
+    mock_token.mint(mock_strategy, mock_amount // 10, {"from": user})
+    assert mock_strategy.tendTrigger(0)
+
+    tx = mock_strategy.tend({"from": keeper})
+    assert mock_strategy.balanceOfWant() == 0
+    check_gas(f"tend-{'staked' if staked else 'unstaked'}", tx)
+
+
+@pytest.mark.parametrize("staked", [True, False])
+def test_withdraw_gas(mock_vault, mock_strategy, mock_token, user, strategist, gov, mock_amount, check_gas, staked):
+    _invest(mock_vault, mock_strategy, mock_token, user, strategist, gov, mock_amount, staked)
+
+    # liquidatePosition runs once the vault's idle want doesn't cover the withdrawal
+    tx = mock_vault.withdraw(mock_vault.balanceOf(user) // 2, user, 10, {"from": user})
+    check_gas(f"withdraw-{'staked' if staked else 'unstaked'}", tx)
+
+
+def test_buffered_withdraw_gas(mock_vault, mock_strategy, mock_token, mock_balancer_vault, mock_gauge, user,
+                               strategist, gov, mock_amount, check_gas):
+    _invest(mock_vault, mock_strategy, mock_token, user, strategist, gov, mock_amount, True)
+    mock_strategy.setBufferBips(2_000, {"from": gov})
+    total = mock_strategy.balanceOfStakedBpt() + mock_strategy.balanceOfUnstakedBpt()
+    assert mock_strategy.balanceOfUnstakedBpt() == total * 2_000 // 10_000
+
+    # a withdraw the buffer covers exits once and never touches the gauge
+    tx = mock_vault.withdraw(mock_vault.balanceOf(user) // 10, user, 10, {"from": user})
+    assert not [c for c in tx.subcalls if c["to"] == mock_gauge]
+    assert len([c for c in tx.subcalls if c["to"] == mock_balancer_vault and "exitPool" in c.get("function", "")]) == 1
+    check_gas("withdraw-buffered", tx)
+
+    # and the next harvest tops it back up
+    mock_strategy.harvest({"from": strategist})
+    total = mock_strategy.balanceOfStakedBpt() + mock_strategy.balanceOfUnstakedBpt()
+    assert mock_strategy.balanceOfUnstakedBpt() == total * 2_000 // 10_000
+
+
+@pytest.mark.parametrize("staked", [True, False])
+def test_migration_gas(accounts, mock_vault, mock_strategy, mock_token, mock_balancer_vault, mock_pool,
+                       mock_gauge_factory, mock_minter, mock_routes, user, strategist, gov, mock_amount, MockERC20,
+                       Strategy, check_gas, staked):
+    for i in range(2):
+        reward = accounts[0].deploy(MockERC20, f"Mock Reward {i}", f"mRWD{i}", 18)
+        mock_strategy.whitelistRewards(reward, mock_routes(reward, 2), {"from": gov})
+    _invest(mock_vault, mock_strategy, mock_token, user, strategist, gov, mock_amount, staked)
+    # unsold rewards move along with the bpt
+    for i in range(2):
+        MockERC20.at(mock_strategy.rewardTokens(i)).mint(mock_strategy, REWARD_AMOUNT, {"from": user})
+    new_strategy = strategist.deploy(Strategy, mock_vault, mock_balancer_vault, mock_pool, mock_gauge_factory,
+                                     mock_minter, 5, 5, 1_000_000, 2 * 60 * 60)
+
+    tx = mock_vault.migrateStrategy(mock_strategy, new_strategy, {"from": gov})
+    assert new_strategy.balanceOfUnstakedBpt() > 0
+    check_gas(f"migration-{'staked' if staked else 'unstaked'}", tx)
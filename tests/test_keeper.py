@@ -0,0 +1,32 @@
+from scripts.executor import PipelinedExecutor
+from scripts.keeper import confirm, evaluate, run_once
+
+GAS_PRICE = 10 ** 9
+
+
+def test_keeper(chain, token, vault, strategy, strategist, gov, amount, ldo, ldo_whale, weth, wethTokenPoolId,
+                multicall2, harvested):
+    strategy.setEthToWantSteps(([wethTokenPoolId], [weth, token]), {"from": gov})
+    chain.sleep(strategy.minDepositPeriod() + 1)
+    chain.mine(1)
+    # a maxSingleDeposit worth of want isn't worth a tend at 1 gwei
+    assert evaluate([strategy.address], GAS_PRICE) == []
+
+    strategy.setParams(strategy.maxSlippageIn(), strategy.maxSlippageOut(), amount, strategy.minDepositPeriod(),
+                       {"from": gov})
+    ldo.transfer(strategy, 1_000 * 10 ** ldo.decimals(), {"from": ldo_whale})
+    jobs = evaluate([strategy.address], GAS_PRICE)
+    assert [job.action for job in jobs] == ["tend", "harvest"]
+    assert jobs[1].value > strategy.profitFactor() * jobs[1].cost
+
+    tend = confirm(jobs[0], strategist, GAS_PRICE)
+    assert tend.gas > 0
+    # priced at its estimate, a tend at an absurd gas price isn't worth it
+    assert confirm(jobs[0], strategist, 10 ** 20) is None
+
+    executor = PipelinedExecutor(strategist)
+    confirmed = run_once([strategy.address], strategist, executor, gas_price=GAS_PRICE)
+    assert [job.action for job in confirmed] == ["tend", "harvest"]
+    assert all(submission.status == 1 for submission in executor.wait(timeout=60))
+    assert strategy.balanceOfStakedBpt() > 0
+    assert ldo.balanceOf(strategy) == 0
@@ -0,0 +1,26 @@
+from scripts.metadata import MetadataResolver
+
+
+def test_resolve_many(token, bal, ldo, multicall2, rpc_counter, tmp_path):
+    resolver = MetadataResolver(tmp_path / "metadata.json")
+    rpc_counter.clear()
+    metadata = resolver.resolve_many([token.address, bal.address, ldo.address])
+    assert rpc_counter["eth_call"] == 1
+    assert metadata[token.address].symbol == token.symbol()
+    assert metadata[bal.address].decimals == 18
+
+    # memoized in process and on disk
+    rpc_counter.clear()
+    assert resolver.resolve_many([token.address, bal.address]) == {a: metadata[a] for a in [token.address, bal.address]}
+    assert MetadataResolver(tmp_path / "metadata.json").resolve(ldo.address) == metadata[ldo.address]
+    assert rpc_counter.get("eth_call", 0) == 0
+
+    # expired entries are fetched again
+    assert MetadataResolver(tmp_path / "metadata.json", ttl=0).resolve(ldo.address) == metadata[ldo.address]
+    assert rpc_counter["eth_call"] == 3
+
+
+def test_resolve_missing_fields(strategy):
+    metadata = MetadataResolver(path=None).resolve(strategy.address)
+    assert metadata.name == strategy.name()
+    assert metadata.symbol is None
@@ -18,13 +18,9 @@ def test_migration(
         balancer_vault,
         pool,
         balancer_minter,
-        gauge_factory
+        gauge_factory,
+        harvested
 ):
-    # Deposit to the vault and harvest
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    chain.sleep(1)
-    strategy.harvest()
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
     # migrate to a new strategy
@@ -33,7 +29,20 @@ def test_migration(
     vault.migrateStrategy(strategy, new_strategy, {"from": gov})
     assert (pytest.approx(new_strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount)
 
+    # packed params read back as set, and the position carries on as before
+    assert (new_strategy.maxSlippageIn(), new_strategy.maxSlippageOut()) == (5, 5)
+    assert new_strategy.maxSingleDeposit() == 100_000 * 10 ** token.decimals()
+    assert new_strategy.minDepositPeriod() == 2 * 60 * 60
+    assert (new_strategy.numTokens(), new_strategy.tokenIndex()) == (strategy.numTokens(), strategy.tokenIndex())
+    assert new_strategy.toggles() == strategy.toggles() == (True, True, True)
+    assert (new_strategy.keep(), new_strategy.keepBips()) == (strategy.keep(), strategy.keepBips())
+    new_strategy.stakeBpt(new_strategy.balanceOfUnstakedBpt(), {"from": gov})
+    chain.sleep(1)
+    new_strategy.harvest({"from": strategist})
+    assert pytest.approx(new_strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
+
 
+@pytest.mark.fork
 def test_real_migration(
         chain,
         token,
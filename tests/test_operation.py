@@ -2,6 +2,11 @@ import brownie
 from brownie import Contract
 import pytest
 import util
+from scripts import state_report
+from scripts.merkle import SSB_STRATEGIES
+
+# Strategy.ClaimSource
+NONE, MINTER, GAUGE = 0, 1, 2
 
 
 def test_operation(
@@ -28,13 +33,8 @@ def test_operation(
 
 
 def test_emergency_exit(
-        chain, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX
+        chain, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, harvested
 ):
-    # Deposit to the vault
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    chain.sleep(1)
-    strategy.harvest({"from": strategist})
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
     # set emergency and exit
@@ -212,14 +212,38 @@ def test_triggers(
 
 
 def test_rewards(
-        strategy, strategist, gov
+        strategy, strategist, gov, bal, ldo, weth, token, wethTokenPoolId, swapStepsLdo
 ):
     # added in setup
     assert strategy.numRewards() == 2
+    assert [strategy.claimSources(i) for i in range(2)] == [MINTER, GAUGE]
+    with brownie.reverts("listed"):
+        strategy.whitelistRewards(ldo, swapStepsLdo, {'from': gov})
+
+    # an airdrop that's only sold, and bal delisted on its own
+    strategy.registerReward(weth, ([wethTokenPoolId], [weth, token]), NONE, {'from': gov})
+    strategy.delistReward(bal, {'from': gov})
+    assert [strategy.rewardTokens(i) for i in range(2)] == [weth, ldo]
+    assert [strategy.claimSources(i) for i in range(2)] == [NONE, GAUGE]
+    assert strategy.getSwapSteps()[0] == ([wethTokenPoolId], [weth, token])
+    assert bal.allowance(strategy, strategy.balancerVault()) == 0
+    with brownie.reverts("!listed"):
+        strategy.delistReward(bal, {'from': gov})
+
     strategy.delistAllRewards({'from': gov})
     assert strategy.numRewards() == 0
 
 
+def test_claim_each_source_once(chain, strategy, gov, weth, token, wethTokenPoolId, balancer_minter, harvested):
+    # a second gauge reward doesn't claim from the gauge a second time
+    strategy.registerReward(weth, ([wethTokenPoolId], [weth, token]), GAUGE, {'from': gov})
+    chain.sleep(3600 * 24)
+    tx = strategy.claimAndSellRewards(False, {'from': gov})
+    claims = [c for c in tx.subcalls if c["to"] == strategy.gauge() and "claim_rewards" in c.get("function", "")]
+    mints = [c for c in tx.subcalls if c["to"] == balancer_minter and "mint" in c.get("function", "")]
+    assert len(claims) == len(mints) == 1
+
+
 def test_unbalance_deposit(chain, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, bal,
                            bal_whale, token2_whale, token2, usdc_whale,
                            ldo, gov, pool, balancer_vault):
@@ -330,6 +354,7 @@ def test_unbalanced_pool_withdraw(chain, token, vault, strategy, user, strategis
     assert strategy.estimatedTotalAssets() >= amount / 2 * (10000 - old_slippage) / 10000
 
 
+@pytest.mark.fork
 def test_ldo_claim(accounts, ldo, chain):
     bpt = Contract("0x32296969Ef14EB0c6d29669C550D4a0449130230")
 
@@ -348,3 +373,102 @@ def test_ldo_claim(accounts, ldo, chain):
     gauge.claim_rewards(whale, {'from': whale})
 
     assert ldo.balanceOf(whale) > ldo_before
+
+
+def test_snapshot(chain, token, vault, strategy, user, strategist, amount, bal, ldo, harvested, multicall2):
+    snapshot = strategy.getSnapshot()
+    assert snapshot["balanceOfWant"] == strategy.balanceOfWant()
+    assert snapshot["balanceOfStakedBpt"] == strategy.balanceOfStakedBpt()
+    assert snapshot["balanceOfUnstakedBpt"] == strategy.balanceOfUnstakedBpt()
+    assert snapshot["estimatedTotalAssets"] == strategy.estimatedTotalAssets()
+    assert snapshot["rewardTokens"] == [bal, ldo]
+    assert snapshot["lastDepositTime"] == strategy.lastDepositTime()
+
+    decoded = state_report.snapshots([strategy.address])[strategy.address]
+    assert decoded["want"] == token.address
+    assert decoded["estimatedTotalAssets"] == strategy.estimatedTotalAssets()
+    assert decoded["rewards"] == {bal.address: bal.balanceOf(strategy), ldo.address: ldo.balanceOf(strategy)}
+    assert decoded["toggles"] == {"doSellRewards": True, "doClaimRewards": True, "doCollectTradingFees": True}
+
+
+@pytest.mark.fork
+def test_legacy_snapshot(Strategy, multicall2):
+    # the deployed SSB strategies predate getSnapshot, and are read field by field
+    decoded = state_report.snapshots(SSB_STRATEGIES)
+    for address in SSB_STRATEGIES:
+        strategy = Strategy.at(address)
+        assert decoded[address]["estimatedTotalAssets"] == strategy.estimatedTotalAssets()
+        assert list(decoded[address]["rewards"]) == [strategy.rewardTokens(i) for i in range(strategy.numRewards())]
+
+
+def test_cost_aware_tend_trigger(chain, token, vault, strategy, user, strategist, gov, amount, weth, wethTokenPoolId,
+                                 harvested):
+    # no route, no price
+    assert strategy.ethToWant(10 ** 18) == 0
+    strategy.setEthToWantSteps(([wethTokenPoolId], [weth, token]), {"from": gov})
+    one_eth = strategy.ethToWant(10 ** 18)
+    assert one_eth > 0
+    # rewards are valued at spot until quoted
+    assert strategy.rewardToWant(0, 10 ** 18) > 0
+    quotes = util.quote_rewards(strategy, gov)
+    assert strategy.rewardToWant(0, 10 ** 18) == quotes[strategy.rewardTokens(0)] > 0
+
+    chain.sleep(strategy.minDepositPeriod() + 1)
+    chain.mine(1)
+    backlog = min(strategy.maxSingleDeposit(), strategy.balanceOfWant())
+    assert strategy.tendTrigger(0)
+    # a call costing more than the profitFactor'th of what the tend would invest isn't worth it
+    expensive = 4 * backlog * 10 ** 18 // (one_eth * strategy.profitFactor()) + 1
+    assert not strategy.tendTrigger(expensive)
+    assert strategy.tendTrigger(expensive // 8)
+
+
+def test_sell_rewards_in_one_batch_swap(chain, token, strategy, gov, user, bal, bal_whale, ldo, ldo_whale,
+                                        balancer_vault, harvested):
+    bal.transfer(strategy, 100 * 10 ** 18, {"from": bal_whale})
+    ldo.transfer(strategy, 100 * 10 ** 18, {"from": ldo_whale})
+    with brownie.reverts("!route"):
+        strategy.whitelistRewards(bal, ([], []), {"from": gov})
+
+    # no quote needed, every route is held to its spot value and sold in one swap
+    before = token.balanceOf(strategy)
+    tx = strategy.claimAndSellRewards(True, {"from": gov})
+    swaps = [c for c in tx.subcalls if c["to"] == balancer_vault and "batchSwap" in c.get("function", "")]
+    assert len(swaps) == 1
+    assert bal.balanceOf(strategy) == 0 and ldo.balanceOf(strategy) == 0
+    assert token.balanceOf(strategy) > before
+
+    # quotes are for keepers, and can't be set further over spot than maxSlippageRewards
+    index = [strategy.rewardTokens(i) for i in range(strategy.numRewards())].index(ldo)
+    spot = strategy.rewardToWant(index, 10 ** 18)
+    with brownie.reverts():
+        strategy.setQuotes([ldo], [spot], {"from": user})
+    with brownie.reverts("quote over spot"):
+        strategy.setQuotes([ldo], [spot * 103 // 100], {"from": gov})
+    with brownie.reverts("!listed"):
+        strategy.setQuotes([token], [1], {"from": gov})
+    strategy.setQuotes([ldo], [spot // 2], {"from": gov})
+    assert strategy.rewardToWant(index, 10 ** 18) == spot // 2
+
+    # and go stale after a day
+    chain.sleep(24 * 60 * 60 + 1)
+    chain.mine(1)
+    assert strategy.rewardToWant(index, 10 ** 18) == spot
+
+
+@pytest.mark.fork
+def test_hold_rewards_under_quote(token, strategy, gov, ldo, ldo_whale, balancer_vault, harvested):
+    ldo.transfer(strategy, 100 * 10 ** 18, {"from": ldo_whale})
+    index = [strategy.rewardTokens(i) for i in range(strategy.numRewards())].index(ldo)
+    strategy.setQuotes([ldo], [strategy.rewardToWant(index, 10 ** 18)], {"from": gov})
+
+    # dumping LDO into the first pool of its route pushes its spot value well under the quote, as a sandwich would
+    pool_ids, assets = strategy.getSwapSteps()[index]
+    tokens, balances, _ = balancer_vault.getPoolTokens(pool_ids[0])
+    dump = min(balances[list(tokens).index(ldo)] // 10, ldo.balanceOf(ldo_whale))
+    ldo.approve(balancer_vault, dump, {"from": ldo_whale})
+    balancer_vault.swap((pool_ids[0], 0, ldo, assets[1], dump, b""), (ldo_whale, False, ldo_whale, False), 0,
+                        2 ** 256 - 1, {"from": ldo_whale})
+
+    strategy.claimAndSellRewards(True, {"from": gov})
+    assert ldo.balanceOf(strategy) >= 100 * 10 ** 18
@@ -0,0 +1,86 @@
+import brownie
+import numpy as np
+import pytest
+from eth_abi import encode_abi
+from scripts.stable_math import StablePool, check_strategy, invariant, bpt_out_given_exact_tokens_in
+
+AMP = 200_000
+
+
+def test_stable_math_vectorized():
+    balances = np.array([1e24, 2e24, 3e24])
+    # a balanced pool's invariant is its sum
+    assert invariant(AMP, [1e24] * 3) == pytest.approx(3e24)
+
+    # k proposals at once give what they give one by one
+    amounts = np.array([[1e22, 0, 0], [0, 5e22, 0], [1e22, 2e22, 3e22]])
+    batched = bpt_out_given_exact_tokens_in(AMP, balances, amounts, 6e24, 0.0004)
+    for row, bpt_out in zip(amounts, batched):
+        assert bpt_out_given_exact_tokens_in(AMP, balances, row, 6e24, 0.0004) == pytest.approx(bpt_out)
+    # a proportional join pays no fee, and gets the same share of the supply
+    assert batched[2] == pytest.approx(6e24 * 0.01)
+
+
+def join_pool(balancer_vault, pool, token, amount, account):
+    tokens = balancer_vault.getPoolTokens(pool.getPoolId())[0]
+    amounts = [amount if t == token.address else 0 for t in tokens]
+    token.approve(balancer_vault, amount, {"from": account})
+    before = pool.balanceOf(account)
+    user_data = encode_abi(["uint256", "uint256[]", "uint256"], [1, amounts, 0])
+    balancer_vault.joinPool(pool.getPoolId(), account, account, (tokens, amounts, user_data, False), {"from": account})
+    return pool.balanceOf(account) - before
+
+
+def exit_pool(balancer_vault, pool, token, bpt_in, index, account):
+    tokens = balancer_vault.getPoolTokens(pool.getPoolId())[0]
+    before = token.balanceOf(account)
+    user_data = encode_abi(["uint256", "uint256", "uint256"], [0, bpt_in, index])
+    balancer_vault.exitPool(pool.getPoolId(), account, account, (tokens, [0] * len(tokens), user_data, False),
+                            {"from": account})
+    return token.balanceOf(account) - before
+
+
+def check_against_pool(chain, balancer_vault, pool, token, whale):
+    stable_pool = StablePool.from_chain(pool, balancer_vault)
+    index = stable_pool.index(token)
+    amounts = [n * 10 ** token.decimals() for n in (1_000, 100_000, 1_000_000)]
+    predicted_bpts = stable_pool.join_single(index, amounts)
+    for amount, predicted_bpt in zip(amounts, predicted_bpts):
+        chain.snapshot()
+        bpt_out = join_pool(balancer_vault, pool, token, amount, whale)
+        assert bpt_out == pytest.approx(predicted_bpt, rel=1e-9)
+
+        # and straight back out, priced from the pool the join left behind
+        predicted_token = StablePool.from_chain(pool, balancer_vault).exit_single(index, bpt_out)[0]
+        assert exit_pool(balancer_vault, pool, token, bpt_out, index, whale) == pytest.approx(predicted_token, rel=1e-9)
+        chain.revert()
+
+
+@pytest.mark.fork
+def test_stable_math_matches_pool(chain, balancer_vault, pool, token, token2, token_whale, usdc_whale, multicall2):
+    check_against_pool(chain, balancer_vault, pool, token, token_whale)
+
+    # a whale dumping token into the pool, as in test_unbalance_deposit
+    pooled = balancer_vault.getPoolTokens(pool.getPoolId())[1][StablePool.from_chain(pool, balancer_vault).index(token)]
+    token.approve(balancer_vault, 2 ** 256 - 1, {"from": usdc_whale})
+    balancer_vault.swap((pool.getPoolId(), 0, token, token2, pooled // 2, b""),
+                        (usdc_whale, False, usdc_whale, False), 0, 2 ** 256 - 1, {"from": usdc_whale})
+    check_against_pool(chain, balancer_vault, pool, token, token_whale)
+
+
+@pytest.mark.fork
+def test_stable_math_predicts_slippage_revert(chain, token, token2, vault, strategy, user, strategist, amount, pool,
+                                              balancer_vault, usdc_whale, multicall2):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    assert check_strategy(strategy, pool, balancer_vault)["deposits"].ok.all()
+
+    pooled = balancer_vault.getPoolTokens(pool.getPoolId())[1][strategy.tokenIndex()]
+    token.approve(balancer_vault, 2 ** 256 - 1, {"from": usdc_whale})
+    balancer_vault.swap((pool.getPoolId(), 0, token, token2, pooled * 2 // 3, b""),
+                        (usdc_whale, False, usdc_whale, False), 0, 2 ** 256 - 1, {"from": usdc_whale})
+
+    # the keeper knows the harvest would trip the join's guard without sending it
+    assert not check_strategy(strategy, pool, balancer_vault)["deposits"].ok.all()
+    with brownie.reverts("BAL#208"):
+        strategy.harvest({"from": strategist})
@@ -1,20 +1,67 @@
-from brownie import Contract, chain
+from brownie import Contract, accounts, chain
+from eth_abi import encode_abi
+from scripts import keeper
+from scripts.metadata import MetadataResolver
+from scripts.state_report import decode_snapshot, format_snapshot
+
+# in process only, contracts deployed by tests get recycled addresses across runs
+metadata = MetadataResolver(path=None)
+
+
+def mock_join(balancer_vault, pool, amounts, account, MockERC20):
+    # mints `amounts` of the pool tokens to `account` and joins the mock pool with them
+    pool_id = pool.getPoolId()
+    tokens = balancer_vault.getPoolTokens(pool_id)[0]
+    for token, amount in zip(tokens, amounts):
+        MockERC20.at(token).mint(account, amount, {"from": account})
+        MockERC20.at(token).approve(balancer_vault, amount, {"from": account})
+    user_data = encode_abi(["uint256", "uint256[]", "uint256"], [1, amounts, 0])
+    balancer_vault.joinPool(pool_id, account, account, (tokens, amounts, user_data, False), {"from": account})
+
+
+def mock_swap_pool(balancer_vault, tokens, account, MockERC20, MockBalancerPool, liquidity=10 ** 12):
+    # creates a mock pool of `tokens` with `liquidity` whole tokens of each, and returns its id
+    tx = balancer_vault.createPool("Mock Weighted Pool", "mWP", tokens, {"from": account})
+    pool = MockBalancerPool.at(tx.events["PoolCreated"]["pool"])
+    mock_join(balancer_vault, pool, [liquidity * 10 ** token.decimals() for token in tokens], account, MockERC20)
+    return pool.getPoolId()
 
 
 def airdrop_rewards(strategy, bal, bal_whale, ldo, ldo_whale):
-    # wait a week
+    # wait a week, and quote what accrued so the next harvest sells it
     chain.sleep(3600 * 24 * 7)
+    quote_rewards(strategy, accounts.at(strategy.keeper(), force=True))
+
+
+def quote_rewards(strategy, account, amount=10 ** 18):
+    # quotes every reward of `strategy` at what selling `amount` of it returns now, as a keeper would
+    tokens = [strategy.rewardTokens(i) for i in range(strategy.numRewards())]
+    quotes = keeper.quote_rewards(strategy, {token: amount for token in tokens})
+    strategy.setQuotes(list(quotes), list(quotes.values()), {"from": account})
+    return quotes
 
 
 def stateOfStrat(msg, strategy, token):
+    if not hasattr(strategy, "getSnapshot"):
+        # live strategies deployed before getSnapshot existed
+        return stateOfLiveStrat(msg, strategy, token)
+    print(f'\n===={msg}====')
+    snapshot = decode_snapshot(token.address, strategy.getSnapshot())
+    # resolved one by one, a multicall deployed by an earlier test may have been reverted away
+    tokens = {address: metadata.resolve(address) for address in [token.address, *snapshot["rewards"]]}
+    for line in format_snapshot(snapshot, tokens):
+        print(line)
+
+
+def stateOfLiveStrat(msg, strategy, token):
     print(f'\n===={msg}====')
     wantDec = 10 ** token.decimals()
     print(f'Balance of {token.symbol()}: {strategy.balanceOfWant() / wantDec}')
     print(f'Balance of Unstaked Bpt: {strategy.balanceOfUnstakedBpt() / wantDec}')
     print(f'Balance of Staked Bpt: {strategy.balanceOfStakedBpt() / wantDec}')
     for i in range(strategy.numRewards()):
-        print(
-            f'Balance of {Contract(strategy.rewardTokens(i)).symbol()}: {Contract(strategy.rewardTokens(i)).balanceOf(strategy.address)}')
+        reward = strategy.rewardTokens(i)
+        print(f'Balance of {metadata.resolve(reward).symbol}: {metadata.erc20(reward).balanceOf(strategy.address)}')
     print(f'Estimated Total Assets: {strategy.estimatedTotalAssets() / wantDec}')
 
 
@@ -24,6 +71,6 @@ def stateOfOldStrat(msg, strategy, token):
     print(f'Balance of {token.symbol()}: {strategy.balanceOfWant() / wantDec}')
     print(f'Balance of Bpt: {strategy.balanceOfBpt() / wantDec}')
     for i in range(strategy.numRewards()):
-        print(
-            f'Balance of {Contract(strategy.rewardTokens(i)).symbol()}: {Contract(strategy.rewardTokens(i)).balanceOf(strategy.address)}')
+        reward = strategy.rewardTokens(i)
+        print(f'Balance of {metadata.resolve(reward).symbol}: {metadata.erc20(reward).balanceOf(strategy.address)}')
     print(f'Estimated Total Assets: {strategy.estimatedTotalAssets() / wantDec}')